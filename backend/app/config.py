@@ -1,18 +1,123 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 from pathlib import Path
+from typing import Dict, List, Optional
 
 class Settings(BaseSettings):
     ENV: str = "dev"
     PORT: int = 8000
-    DATABASE_URL: str = "sqlite:///./DS.sqlite3"
+    DATABASE_URL: str = "sqlite+aiosqlite:///./DS.sqlite3"
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_BUSY_TIMEOUT: float = 5.0
     MEDIA_ROOT: Path = Path("./media")
+    MEDIA_STORE: str = "local"  # local or s3
+    S3_BUCKET: str = ""
+    S3_PREFIX: str = ""
+    S3_ENDPOINT_URL: Optional[str] = None  # e.g. a local MinIO for testing
     RAW_TTL_HOURS: int = 48
-    LLM_API_KEY: str
-    LLM_MODEL: str
+    THUMB_TTL_HOURS: int = 24 * 90
+    PURGE_INTERVAL_SECONDS: float = 900.0
+    PURGE_BATCH_SIZE: int = 100
+    # Required for verification, but not to import or start the app
+    LLM_API_KEY: str = ""
+    LLM_MODEL: str = ""
     DEFAULT_CALLBACK_URL: str = "http://localhost:3000/callback"
     ALLOWED_ORIGINS: str = "http://localhost:3000"
 
+    # Startup warm-up: media pool workers, face detector, LLM client and DB
+    # pool are readied before the app starts serving
+    WARMUP_ENABLED: bool = True
+    WARMUP_DB_CONNECTIONS: int = 4
+
+    # Audit thumbnails: one downscaled master per image is kept for
+    # THUMB_TTL_HOURS; the served sizes are rendered from it on first request
+    # and kept on disk beside it. THUMB_CACHE_ENTRIES render paths are cached
+    THUMB_MASTER_MAX_SIDE: int = 640
+    THUMB_MASTER_QUALITY: int = 90
+    THUMB_SIZES: List[int] = [128, 256, 512]
+    THUMB_DEFAULT_SIZE: int = 256
+    THUMB_WEBP_QUALITY: int = 80
+    THUMB_JPEG_QUALITY: int = 85
+    THUMB_CACHE_ENTRIES: int = 4096
+
+    # Uploads
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    MAX_UPLOAD_BYTES: Dict[str, int] = {
+        "doc_front": 15 * 1024 * 1024,
+        "doc_back": 15 * 1024 * 1024,
+        "selfie": 15 * 1024 * 1024,
+        "phrase_audio": 25 * 1024 * 1024,
+        "av_clip": 150 * 1024 * 1024,
+    }
+
+    # Media processing pool (0 = one worker per CPU core)
+    MEDIA_WORKERS: int = 0
+    MEDIA_QUEUE_DEPTH: int = 64
+    MEDIA_QUEUE_TIMEOUT: float = 5.0
+
+    # LLM payload shrinking, per image role (document, face, keyframe)
+    LLM_IMAGE_MAX_SIDE: Dict[str, int] = {"document": 1600, "face": 768, "keyframe": 512}
+    LLM_JPEG_QUALITY: Dict[str, int] = {"document": 88, "face": 85, "keyframe": 75}
+    KEYFRAME_DEDUPE_DISTANCE: int = 6
+    # Also send the best face crop (from the selfie or a clip frame) for face matching
+    FACE_CROP_ENABLED: bool = True
+
+    # Local pre-screen before the LLM call (rules in config/prescreen.yaml)
+    PRESCREEN_ENABLED: bool = True
+
+    # Upload-time preprocessing; verify waits this long for in-flight jobs
+    PREPROCESS_ENABLED: bool = True
+    PREPROCESS_WAIT_SECONDS: float = 30.0
+
+    # Local lip-sync scorer for av_clip: "llm" ignores it, "local" replaces the
+    # LLM's av_sync score, "blend" averages both when the local estimate is confident.
+    # "local" and "blend" need the optional PyAV package (`pip install av`)
+    AV_SYNC_MODE: str = "llm"
+    AV_SYNC_MIN_CONFIDENCE: float = 0.3
+    AV_SYNC_MAX_SECONDS: float = 10.0
+    AV_SYNC_CPU_BUDGET_MS: float = 1500.0
+
+    # LLM client limits (LLM_HEDGE_AFTER = 0 disables hedged requests)
+    LLM_MAX_CONCURRENCY: int = 8
+    LLM_RATE_PER_MINUTE: float = 60.0
+    LLM_RATE_BURST: int = 10
+    LLM_CALL_TIMEOUT: float = 30.0
+    LLM_DEADLINE: float = 60.0
+    LLM_MAX_RETRIES: int = 2
+    LLM_RETRY_BACKOFF: float = 0.5
+    LLM_BREAKER_FAILURES: int = 5
+    LLM_BREAKER_RESET_SECONDS: float = 30.0
+    LLM_HEDGE_AFTER: float = 0.0
+
+    # LLM result cache (entries expire after RAW_TTL_HOURS)
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_MAX_ENTRIES: int = 1024
+
+    # Background verification jobs
+    VERIFY_WORKERS: int = 4
+    VERIFY_QUEUE_DEPTH: int = 1000
+    VERIFY_POLL_INTERVAL: float = 1.0
+    VERIFY_JOB_STALE_SECONDS: float = 900.0
+    # Jobs hit by a busy session or a transient LLM error are retried after
+    # RETRY_BACKOFF * 2^(attempt - 1) seconds, and fail after MAX_ATTEMPTS runs
+    VERIFY_JOB_MAX_ATTEMPTS: int = 5
+    VERIFY_JOB_RETRY_BACKOFF: float = 10.0
+    # A "verifying" claim older than this (its process died) can be taken over
+    VERIFY_CLAIM_STALE_SECONDS: float = 900.0
+
+    # Batch verification: sessions per request and how many run at once
+    VERIFY_BATCH_MAX_SESSIONS: int = 5000
+    VERIFY_BATCH_CONCURRENCY: int = 4
+
+    # Callback delivery
+    CALLBACK_TIMEOUT: float = 10.0
+    CALLBACK_MAX_RETRIES: int = 5
+    CALLBACK_BACKOFF_BASE: float = 0.5
+
     class Config:
         env_file = ".env"
 
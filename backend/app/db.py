@@ -1,17 +1,61 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker, declarative_base
+import asyncio
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import declarative_base
 from .config import get_settings
 
 settings = get_settings()
 
+# Sync-style URLs (as in older .env files) are mapped to their async drivers
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+def async_database_url(url: str):
+    parsed = make_url(url)
+    if parsed.drivername in ASYNC_DRIVERS:
+        parsed = parsed.set(drivername=ASYNC_DRIVERS[parsed.drivername])
+    return parsed
+
+def engine_options(url) -> dict:
+    options = {"echo": settings.DB_ECHO, "pool_pre_ping": True}
+    if url.get_backend_name() == "sqlite":
+        options["connect_args"] = {"timeout": settings.DB_BUSY_TIMEOUT}
+        # In-memory databases use a single static connection; no pool tuning
+        if url.database in (None, "", ":memory:"):
+            return options
+        # aiosqlite defaults to NullPool (a new connection per checkout)
+        options["poolclass"] = AsyncAdaptedQueuePool
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+    )
+    return options
+
 # Create async engine
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=settings.ENV == "dev",
-)
+database_url = async_database_url(settings.DATABASE_URL)
+engine = create_async_engine(database_url, **engine_options(database_url))
+
+if database_url.get_backend_name() == "sqlite":
+    @event.listens_for(engine.sync_engine, "connect")
+    def _sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL lets readers proceed while a writer commits
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.DB_BUSY_TIMEOUT * 1000)}")
+        cursor.close()
 
 # Create async session factory
-async_session = sessionmaker(
+async_session = async_sessionmaker(
     engine, 
     class_=AsyncSession, 
     expire_on_commit=False
@@ -33,3 +77,10 @@ async def get_db():
 async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+
+async def prime_pool(connections: int):
+    """Open `connections` pooled connections up front so early requests skip the connect"""
+    async def touch():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    await asyncio.gather(*(touch() for _ in range(connections)))
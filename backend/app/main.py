@@ -1,14 +1,83 @@
+import time
+
+_import_started = time.perf_counter()
+
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from loguru import logger
 from .config import get_settings
-from .db import init_db
-from .routers import health, sessions, verify, risk
+from .db import init_db, engine
+from .services.executor import get_media_executor
+from .services.jobs import get_job_queue
+from .services.callbacks import get_callback_client
+from .services.risk import get_risk_engine
+from .services.avsync import pyav_available
+from .services.purge import scheduled_purge
+from .services.metrics import TimingMiddleware
+from .services.warmup import warm_up
+from .routers import health, metrics, review, sessions, verify, risk
 import asyncio
 from pathlib import Path
 
+# Heavy SDKs (Gemini, google.api_core) are imported on first use or at warm-up
+IMPORT_MS = (time.perf_counter() - _import_started) * 1000
+
 settings = get_settings()
 
-app = FastAPI(title="DS API", version="0.1.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logger.info(f"App modules imported in {IMPORT_MS:.0f} ms")
+    started = time.perf_counter()
+
+    # Create media directories if they don't exist
+    Path(settings.MEDIA_ROOT / "raw").mkdir(parents=True, exist_ok=True)
+    Path(settings.MEDIA_ROOT / "thumbs").mkdir(parents=True, exist_ok=True)
+
+    # Spin up the media processing pool
+    get_media_executor().start()
+
+    # Compile the risk model once, up front
+    get_risk_engine()
+
+    # The local lip-sync scorer silently measures nothing without PyAV
+    if settings.AV_SYNC_MODE != "llm" and not pyav_available():
+        logger.warning(f"AV_SYNC_MODE={settings.AV_SYNC_MODE} needs PyAV (pip install av); "
+                       "only the LLM will judge lip sync")
+
+    # Initialize database
+    await init_db()
+
+    # Ready the slow services before the first request instead of during it
+    if settings.WARMUP_ENABLED:
+        app.state.warmup_ms = await warm_up()
+        logger.info(f"Warm-up: {app.state.warmup_ms}")
+
+    # Start background verification workers
+    await get_job_queue().start()
+
+    # Schedule media purge job
+    purge_task = asyncio.create_task(scheduled_purge())
+
+    app.state.ready = True
+    logger.info(f"Startup finished in {(time.perf_counter() - started) * 1000:.0f} ms")
+    try:
+        yield
+    finally:
+        # Fail readiness first so load balancers stop sending traffic
+        app.state.ready = False
+        purge_task.cancel()
+        await get_job_queue().stop()
+        await get_callback_client().close()
+        get_media_executor().shutdown()
+        # Close pooled connections (aiosqlite keeps a thread per connection)
+        await engine.dispose()
+
+
+app = FastAPI(title="DS API", version="0.1.0", lifespan=lifespan)
+app.state.ready = False
+app.state.warmup_ms = {}
 
 # Configure CORS
 app.add_middleware(
@@ -17,22 +86,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+# Stage timings per request (Server-Timing header) and latency histograms
+app.add_middleware(TimingMiddleware)
+
 # Include routers
 app.include_router(health.router, tags=["health"])
+app.include_router(metrics.router, tags=["metrics"])
 app.include_router(sessions.router, prefix="/api/v1", tags=["sessions"])
 app.include_router(verify.router, prefix="/api/v1", tags=["verify"])
+app.include_router(review.router, prefix="/api/v1", tags=["review"])
 app.include_router(risk.router, prefix="/api/v1", tags=["risk"])
-
-@app.on_event("startup")
-async def startup_event():
-    # Create media directories if they don't exist
-    Path(settings.MEDIA_ROOT / "raw").mkdir(parents=True, exist_ok=True)
-    Path(settings.MEDIA_ROOT / "thumbs").mkdir(parents=True, exist_ok=True)
-    
-    # Initialize database
-    await init_db()
-    
-    # Schedule media purge job
-    asyncio.create_task(scheduled_purge())
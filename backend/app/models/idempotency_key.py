@@ -0,0 +1,9 @@
+from sqlalchemy import Column, Integer, String, ForeignKey
+from .base import BaseModel
+
+class IdempotencyKey(BaseModel):
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(255), unique=True, index=True)  # client-chosen Idempotency-Key header
+    session_id = Column(String(36), ForeignKey("sessions.id"), index=True)
+    result_id = Column(Integer, ForeignKey("verification_results.id"))
@@ -0,0 +1,10 @@
+from sqlalchemy import Column, String, JSON, DateTime
+from .base import BaseModel
+
+class LLMCacheEntry(BaseModel):
+    __tablename__ = "llm_cache_entries"
+
+    key = Column(String(64), unique=True, index=True)
+    prompt_version = Column(String(16), index=True)
+    value = Column(JSON)
+    expires_at = Column(DateTime, index=True)
@@ -1,14 +1,22 @@
-from sqlalchemy import Column, String, ForeignKey
+from sqlalchemy import Column, String, Integer, ForeignKey, JSON
 from sqlalchemy.orm import relationship
 from .base import BaseModel
 
 class Media(BaseModel):
     __tablename__ = "media"
 
-    session_id = Column(Integer, ForeignKey("sessions.id"))
+    session_id = Column(String(36), ForeignKey("sessions.id"), index=True)
     kind = Column(String)  # doc_front, doc_back, selfie, phrase_audio, av_clip
     path = Column(String)
     mime_type = Column(String)
+    size = Column(Integer)
+    sha256 = Column(String(64))
+    storage_key = Column(String)  # key in the content-addressed media store
+    
+    # Upload-time preprocessing: pending, done, failed
+    preprocess_status = Column(String)
+    thumbnail_path = Column(String)
+    derived = Column(JSON)  # LLM-ready artifacts and metrics
     
     # Relationships
     session = relationship("Session", back_populates="media")
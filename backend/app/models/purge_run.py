@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, BigInteger, DateTime
+from .base import BaseModel
+
+class PurgeRun(BaseModel):
+    __tablename__ = "purge_runs"
+
+    finished_at = Column(DateTime)
+    sessions_purged = Column(Integer, default=0)
+    thumbnails_purged = Column(Integer, default=0)
+    cache_entries_purged = Column(Integer, default=0)
+    bytes_reclaimed = Column(BigInteger, default=0)
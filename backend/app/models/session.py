@@ -1,13 +1,26 @@
-from sqlalchemy import Column, String, JSON
+from sqlalchemy import Column, String, JSON, Boolean, Index
+from sqlalchemy.orm import relationship
 from .base import BaseModel
 
 class Session(BaseModel):
     __tablename__ = "sessions"
 
-    status = Column(String, default="created")  # created, media_complete, verified, rejected
+    id = Column(String(36), primary_key=True)  # uuid4
+    status = Column(String, default="created")  # created, media_complete, verifying, verified, rejected, purging, expired
     callback_url = Column(String)
-    metadata = Column(JSON)
+    # "metadata" is reserved on declarative classes, so map it under another attribute
+    session_metadata = Column("metadata", JSON)
+    thumbs_purged = Column(Boolean, default=False)
 
     # Relationships
     media = relationship("Media", back_populates="session")
     verification_result = relationship("VerificationResult", back_populates="session", uselist=False)
+
+    __table_args__ = (
+        # Drives the TTL purge's "expired sessions in state X" scans and
+        # doubles as the status index (leading column); id makes them cover
+        # the (created_at, id) keyset of the session listing
+        Index("ix_sessions_status_created_at", "status", "created_at", "id"),
+        Index("ix_sessions_created_at", "created_at", "id"),
+        Index("ix_sessions_thumbs_purged_created_at", "thumbs_purged", "created_at"),
+    )
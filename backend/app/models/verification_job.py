@@ -0,0 +1,19 @@
+from sqlalchemy import Column, DateTime, Integer, String, JSON, ForeignKey, Index
+from .base import BaseModel
+
+class VerificationJob(BaseModel):
+    __tablename__ = "verification_jobs"
+
+    session_id = Column(String(36), ForeignKey("sessions.id"), index=True)
+    status = Column(String, default="queued")  # queued, running, succeeded, failed
+    expected_phrase = Column(String)
+    attempts = Column(Integer, default=0)
+    not_before = Column(DateTime)  # retry backoff: not claimed again until then
+    result = Column(JSON)
+    error = Column(String)
+    callback_url = Column(String)
+    callback_status = Column(String)  # pending, delivered, failed, skipped
+
+    __table_args__ = (
+        Index("ix_verification_jobs_status_id", "status", "id"),
+    )
@@ -5,7 +5,7 @@ from .base import BaseModel
 class VerificationResult(BaseModel):
     __tablename__ = "verification_results"
 
-    session_id = Column(Integer, ForeignKey("sessions.id"))
+    session_id = Column(String(36), ForeignKey("sessions.id"), index=True)
     status = Column(String)  # verified, review, rejected
     score = Column(Float)
     ocr_data = Column(JSON)
@@ -14,6 +14,7 @@ class VerificationResult(BaseModel):
     av_sync_score = Column(Float)
     audio_spoof_score = Column(Float)
     explanations = Column(JSON)
+    audio_analysis = Column(JSON)  # local speech timings and spoof features
     
     # Relationships
     session = relationship("Session", back_populates="verification_result")
@@ -0,0 +1,104 @@
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+
+from .models.session import Session
+from .models.media import Media
+from .models.verification_result import VerificationResult
+
+
+async def get_session_with_media(db: AsyncSession, session_id: str) -> Optional[Session]:
+    """Session plus its media rows in a single round trip (LEFT OUTER JOIN)"""
+    result = await db.execute(
+        select(Session)
+        .options(joinedload(Session.media))
+        .where(Session.id == session_id)
+    )
+    return result.unique().scalar_one_or_none()
+
+
+async def get_sessions_with_details(db: AsyncSession, session_ids: List[str]) -> List[Session]:
+    """Several sessions with media and results, batch-loaded with one IN query per relation"""
+    result = await db.execute(
+        select(Session)
+        .options(selectinload(Session.media), selectinload(Session.verification_result))
+        .where(Session.id.in_(session_ids))
+    )
+    return list(result.scalars().all())
+
+
+async def get_session_media(db: AsyncSession, session_id: str) -> List[Media]:
+    result = await db.execute(select(Media).where(Media.session_id == session_id))
+    return list(result.scalars().all())
+
+
+async def list_sessions(
+    db: AsyncSession,
+    limit: int,
+    statuses: Sequence[str] = (),
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    after: Optional[Tuple[datetime, str]] = None,
+) -> list:
+    """One page of sessions, newest first, as plain rows (no ORM objects).
+
+    Keyset pagination: `after` is the (created_at, id) of the previous page's
+    last row, so every page is an index range scan however deep it is. Only
+    the latest result is joined, so re-verified sessions appear once.
+    """
+    latest = (
+        select(func.max(VerificationResult.id))
+        .where(VerificationResult.session_id == Session.id)
+        .correlate(Session)
+        .scalar_subquery()
+    )
+    query = (
+        select(
+            Session.id, Session.status, Session.created_at, Session.updated_at,
+            VerificationResult.status.label("result_status"), VerificationResult.score,
+        )
+        .outerjoin(VerificationResult, VerificationResult.id == latest)
+        .order_by(Session.created_at.desc(), Session.id.desc())
+        .limit(limit)
+    )
+    if statuses:
+        query = query.where(Session.status.in_(statuses))
+    if created_after is not None:
+        query = query.where(Session.created_at >= created_after)
+    if created_before is not None:
+        query = query.where(Session.created_at < created_before)
+    if after is not None:
+        created_at, session_id = after
+        query = query.where(or_(
+            Session.created_at < created_at,
+            and_(Session.created_at == created_at, Session.id < session_id),
+        ))
+    return (await db.execute(query)).all()
+
+
+async def get_thumbnail_media_id(db: AsyncSession, session_id: str, kind: str) -> Optional[int]:
+    """Id of the session's latest upload of `kind`, or None if there is none or
+    the session's thumbnails were purged"""
+    result = await db.execute(
+        select(Media.id)
+        .join(Session, Session.id == Media.session_id)
+        .where(Media.session_id == session_id, Media.kind == kind)
+        .where(Session.thumbs_purged.is_not(True))
+        .order_by(Media.id.desc())
+        .limit(1)
+    )
+    return result.scalar_one_or_none()
+
+
+async def get_session_result(db: AsyncSession, session_id: str) -> Optional[VerificationResult]:
+    """The session's latest verification result"""
+    result = await db.execute(
+        select(VerificationResult)
+        .where(VerificationResult.session_id == session_id)
+        .order_by(VerificationResult.id.desc())
+        .limit(1)
+    )
+    return result.scalar_one_or_none()
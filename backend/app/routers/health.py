@@ -1,7 +1,31 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+
+from ..services.llm_cache import get_llm_cache
+from ..services.llm import get_llm_service
 
 router = APIRouter()
 
 @router.get("/health")
 async def health_check():
     return {"status": "ok"}
+
+@router.get("/health/ready")
+async def readiness(request: Request):
+    """503 until startup (and warm-up) finished, and again once shutdown begins"""
+    ready = request.app.state.ready
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"ready": ready, "warmup_ms": request.app.state.warmup_ms},
+    )
+
+@router.get("/health/cache")
+async def cache_stats():
+    cache = get_llm_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.snapshot()}
+
+@router.get("/health/llm")
+async def llm_state():
+    return get_llm_service().snapshot()
@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db import engine, get_db
+from ..services import metrics
+from ..services.executor import get_media_executor
+from ..services.jobs import get_job_queue
+from ..services.preprocess import get_preprocessor
+from ..services.llm import get_llm_service
+from ..services.thumbnails import get_thumbnail_service
+
+router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def pool_stats(pool) -> dict:
+    """Connection counts of a queue pool; other pool classes keep none"""
+    if not hasattr(pool, "checkedout"):
+        return {}
+    # overflow() counts down from zero while the overflow allowance is unused
+    return {"in_use": pool.checkedout(), "idle": pool.checkedin(), "overflow": max(0, pool.overflow())}
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics(db: AsyncSession = Depends(get_db)):
+    executor = get_media_executor()
+    metrics.MEDIA_PENDING.set(executor.pending)
+    metrics.MEDIA_WORKERS.set(executor.workers)
+    metrics.MEDIA_QUEUE_DEPTH.set(executor.queue_depth)
+    metrics.MEDIA_UTILIZATION.set(min(executor.pending, executor.workers) / executor.workers)
+    metrics.PREPROCESS_PENDING.set(get_preprocessor().in_flight())
+
+    job_queue = get_job_queue()
+    metrics.JOBS.set(job_queue.running, "running")
+    metrics.JOBS.set(await job_queue.queued_count(db), "queued")
+
+    llm = get_llm_service()
+    metrics.LLM_IN_FLIGHT.set(llm.in_flight)
+    metrics.LLM_MAX_CONCURRENCY.set(llm.max_concurrency)
+    for event, count in llm.counters.items():
+        metrics.LLM_EVENTS.set(count, event)
+
+    metrics.THUMB_CACHE_ENTRIES.set(get_thumbnail_service().cached_entries)
+
+    for state, count in pool_stats(engine.pool).items():
+        metrics.DB_POOL.set(count, state)
+    if hasattr(engine.pool, "size"):
+        metrics.DB_POOL_SIZE.set(engine.pool.size())
+
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
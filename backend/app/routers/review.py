@@ -0,0 +1,175 @@
+import base64
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings
+from ..db import get_db
+from ..queries import get_session_result, get_session_with_media, get_thumbnail_media_id, list_sessions
+from ..services.thumbnails import ThumbnailNotFound, get_thumbnail_service
+
+try:
+    # orjson (optional) serializes large listings several times faster
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+except ImportError:
+    FastJSONResponse = JSONResponse
+
+router = APIRouter()
+
+THUMBNAIL_KINDS = ("doc_front", "doc_back", "selfie")
+# /result is the session's latest result, which a re-verification replaces:
+# clients keep it but revalidate with the ETag (the result id) on every use.
+# Thumbnails only go away (purge). Both carry PII.
+RESULT_CACHE_CONTROL = "private, no-cache"
+THUMBNAIL_CACHE_CONTROL = "private, max-age=86400"
+
+
+def encode_cursor(created_at: datetime, session_id: str) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{session_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        created_at, session_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), session_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    """True when the client's If-None-Match already names this ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+def iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+@router.get("/sessions")
+async def get_sessions(
+    status: Optional[List[str]] = Query(None),
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_db)
+):
+    """Sessions newest first; pass `next_cursor` back as `cursor` for the next page"""
+    rows = await list_sessions(
+        db, limit, statuses=status or (), created_after=created_after, created_before=created_before,
+        after=decode_cursor(cursor) if cursor else None,
+    )
+    items = [
+        {
+            "session_id": row.id,
+            "status": row.status,
+            "created_at": iso(row.created_at),
+            "updated_at": iso(row.updated_at),
+            "result": {"status": row.result_status, "score": row.score} if row.result_status else None,
+        }
+        for row in rows
+    ]
+    next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id) if len(rows) == limit else None
+    return FastJSONResponse({"items": items, "next_cursor": next_cursor})
+
+
+@router.get("/sessions/{session_id}")
+async def get_session(
+    session_id: str,
+    db: AsyncSession = Depends(get_db)
+):
+    session = await get_session_with_media(db, session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return FastJSONResponse({
+        "session_id": session.id,
+        "status": session.status,
+        "created_at": iso(session.created_at),
+        "updated_at": iso(session.updated_at),
+        "metadata": session.session_metadata,
+        "media": [
+            {
+                "kind": m.kind,
+                "mime_type": m.mime_type,
+                "size": m.size,
+                "sha256": m.sha256,
+                "preprocess_status": m.preprocess_status,
+                "uploaded_at": iso(m.created_at),
+            }
+            for m in sorted(session.media, key=lambda m: m.id)
+        ],
+        "result_url": f"/api/v1/sessions/{session.id}/result",
+        "thumbnail_urls": {
+            m.kind: f"/api/v1/sessions/{session.id}/thumbnails/{m.kind}"
+            for m in session.media if m.kind in THUMBNAIL_KINDS and not session.thumbs_purged
+        },
+    })
+
+
+@router.get("/sessions/{session_id}/result")
+async def get_result(
+    session_id: str,
+    request: Request,
+    db: AsyncSession = Depends(get_db)
+):
+    result = await get_session_result(db, session_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="No verification result")
+
+    etag = f'"result-{result.id}"'
+    headers = {"ETag": etag, "Cache-Control": RESULT_CACHE_CONTROL}
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return FastJSONResponse({
+        "session_id": result.session_id,
+        "status": result.status,
+        "score": result.score,
+        "ocr_data": result.ocr_data,
+        "face_match_score": result.face_match_score,
+        "liveness_score": result.liveness_score,
+        "av_sync_score": result.av_sync_score,
+        "audio_spoof_score": result.audio_spoof_score,
+        "explanations": result.explanations,
+        "audio_analysis": result.audio_analysis,
+        "created_at": iso(result.created_at),
+    }, headers=headers)
+
+
+@router.get("/sessions/{session_id}/thumbnails/{kind}")
+async def get_thumbnail(
+    session_id: str,
+    kind: str,
+    request: Request,
+    size: Optional[int] = None,
+    format: str = Query("webp", pattern="^(webp|jpeg)$"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Audit thumbnail of the latest upload of `kind`, rendered from its retained master"""
+    if kind not in THUMBNAIL_KINDS:
+        raise HTTPException(status_code=404, detail="No thumbnail for this media kind")
+    media_id = await get_thumbnail_media_id(db, session_id, kind)
+    if media_id is None:
+        raise HTTPException(status_code=404, detail="Thumbnail not found")
+    thumbnails = get_thumbnail_service()
+    size = size or get_settings().THUMB_DEFAULT_SIZE
+    if size not in thumbnails.sizes:
+        raise HTTPException(status_code=400, detail=f"size must be one of {list(thumbnails.sizes)}")
+
+    try:
+        # The ETag comes from the master's stat, so a revalidation renders nothing
+        _, etag = await thumbnails.locate(session_id, kind, media_id, size, format)
+        headers = {"ETag": etag, "Cache-Control": THUMBNAIL_CACHE_CONTROL}
+        if not_modified(request, etag):
+            return Response(status_code=304, headers=headers)
+        thumb = await thumbnails.get(session_id, kind, media_id, size, format)
+    except ThumbnailNotFound:
+        raise HTTPException(status_code=404, detail="Thumbnail not found")
+    return FileResponse(thumb.path, media_type=thumb.mime_type, headers=headers)
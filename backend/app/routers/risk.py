@@ -0,0 +1,29 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from ..schemas import RiskSignals, RiskDecision, RiskBatchRequest, RiskBatchResponse
+from ..services.risk import get_risk_engine, FEATURES
+
+router = APIRouter()
+
+@router.post("/risk/evaluate", response_model=RiskDecision)
+async def evaluate_risk(signals: RiskSignals):
+    return get_risk_engine().current().decide(signals)
+
+@router.post("/risk/evaluate/batch", response_model=RiskBatchResponse)
+async def evaluate_risk_batch(request: RiskBatchRequest):
+    decisions = get_risk_engine().current().decide_batch(request.signals)
+    # Decisions are already plain dicts; skip re-validating thousands of them
+    return JSONResponse({"count": len(decisions), "decisions": decisions})
+
+@router.get("/risk/model")
+async def risk_model():
+    engine = get_risk_engine()
+    model = engine.current()
+    return {
+        "path": str(engine.path),
+        "loaded_at": engine.loaded_at,
+        "weights": dict(zip(FEATURES, model.weight_list)),
+        "bounds": model.bounds.tolist(),
+        "actions": list(model.actions),
+    }
@@ -1,19 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Optional
+from typing import Dict, Optional
+import asyncio
 import uuid
 
 from ..db import get_db
+from ..queries import get_session_with_media
 from ..config import get_settings
 from ..models.session import Session
 from ..models.media import Media
 from ..schemas import SessionCreate, MediaUpload
-from ..services.artifact import ArtifactService
-from pathlib import Path
+from ..services.artifact import (
+    UploadInProgress, UploadResult, UploadTooLarge, UploadOffsetMismatch, get_artifact_service
+)
+from ..services.preprocess import get_preprocessor
+from ..services.metrics import span
+from ..services.multipart import MultipartError, MultipartReader
 
 router = APIRouter()
 settings = get_settings()
-artifact_service = ArtifactService(Path(settings.MEDIA_ROOT))
 
 ALLOWED_MIME_TYPES = {
     "doc_front": ["image/jpeg", "image/png"],
@@ -22,6 +27,21 @@ ALLOWED_MIME_TYPES = {
     "av_clip": ["video/mp4"],
     "phrase_audio": ["audio/wav", "audio/wave"]
 }
+REQUIRED_KINDS = {"doc_front", "selfie", "av_clip"}  # Minimum required media
+
+
+def media_row(session_id: str, kind: str, mime_type: str, result: UploadResult) -> Media:
+    return Media(
+        session_id=session_id,
+        kind=kind,
+        path=str(result.path),
+        mime_type=mime_type,
+        size=result.size,
+        sha256=result.sha256,
+        storage_key=result.storage_key,
+        preprocess_status="pending" if get_preprocessor().handles(kind) else None
+    )
+
 
 @router.post("/sessions")
 async def create_session(
@@ -32,7 +52,7 @@ async def create_session(
         id=str(uuid.uuid4()),
         status="created",
         callback_url=request.callback_url,
-        metadata=request.metadata
+        session_metadata=request.metadata
     )
     db.add(session)
     await db.commit()
@@ -43,18 +63,41 @@ async def create_session(
         "upload_urls": {
             kind: f"/api/v1/sessions/{session.id}/upload?kind={kind}"
             for kind in ALLOWED_MIME_TYPES.keys()
-        }
+        },
+        "bulk_upload_url": f"/api/v1/sessions/{session.id}/media",
+    }
+
+@router.get("/sessions/{session_id}/upload")
+async def upload_status(
+    session_id: str,
+    kind: str,
+    db: AsyncSession = Depends(get_db)
+):
+    """Report how many bytes of an interrupted upload are stored, for resuming"""
+    session = await db.get(Session, session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    if kind not in ALLOWED_MIME_TYPES:
+        raise HTTPException(status_code=400, detail="Invalid media kind")
+
+    return {
+        "kind": kind,
+        "offset": await asyncio.to_thread(get_artifact_service().partial_upload_size, session_id, kind),
+        "max_bytes": settings.MAX_UPLOAD_BYTES.get(kind),
     }
 
 @router.post("/sessions/{session_id}/upload")
 async def upload_media(
     session_id: str,
     kind: str,
+    offset: int = 0,
+    final: bool = True,
     file: UploadFile = File(...),
     db: AsyncSession = Depends(get_db)
 ):
     # Validate session exists and is in correct state
-    session = await db.get(Session, session_id)
+    with span("db_lookup"):
+        session = await db.get(Session, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     if session.status not in ["created", "uploading"]:
@@ -65,44 +108,166 @@ async def upload_media(
         raise HTTPException(status_code=400, detail="Invalid media kind")
     if file.content_type not in ALLOWED_MIME_TYPES[kind]:
         raise HTTPException(status_code=400, detail=f"Invalid mime type for {kind}")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="Offset must be non-negative")
+    
+    # Stream file to disk
+    try:
+        with span("store_upload"):
+            result = await get_artifact_service().save_upload_stream(
+                file,
+                session_id,
+                kind,
+                offset=offset,
+                final=final,
+                max_bytes=settings.MAX_UPLOAD_BYTES.get(kind),
+                chunk_size=settings.UPLOAD_CHUNK_SIZE,
+                mime_type=file.content_type,
+            )
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UploadOffsetMismatch as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), "offset": e.expected})
+    except UploadInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
     
-    # Read and save file
-    contents = await file.read()
-    file_path = artifact_service.save_upload(contents, session_id, kind)
+    if not result.complete:
+        session.status = "uploading"
+        with span("db_commit"):
+            await db.commit()
+        return {"status": "partial", "kind": kind, "offset": result.size}
     
     # Create media record
-    media = Media(
-        session_id=session_id,
-        kind=kind,
-        path=str(file_path),
-        mime_type=file.content_type
-    )
+    media = media_row(session_id, kind, file.content_type, result)
     db.add(media)
     
     # Update session status
     session.status = "uploading"
     
-    await db.commit()
+    with span("db_commit"):
+        await db.commit()
+    
+    # Thumbnail, metrics and LLM-ready bytes are made in the background while
+    # the user captures the rest; verify picks them up from the Media row
+    if settings.PREPROCESS_ENABLED:
+        get_preprocessor().schedule(media)
     
-    return {"status": "success", "kind": kind}
+    return {
+        "status": "success",
+        "kind": kind,
+        "size": result.size,
+        "sha256": result.sha256,
+        "deduplicated": result.deduped,
+    }
+
+@router.post("/sessions/{session_id}/media")
+async def upload_media_bulk(
+    session_id: str,
+    request: Request,
+    complete: bool = False,
+    db: AsyncSession = Depends(get_db)
+):
+    """Upload several media kinds in one multipart request, one file field per kind.
+
+    The body is parsed as it streams in: each file goes straight to the
+    store and is held to its kind's size limit while it is received. Media
+    rows are written in a single commit, and only if every file stored; with
+    `complete=true` the session is also marked media_complete.
+    """
+    with span("db_lookup"):
+        session = await get_session_with_media(db, session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    if session.status not in ["created", "uploading"]:
+        raise HTTPException(status_code=400, detail="Session not in valid state for upload")
+
+    try:
+        parts = MultipartReader(request.headers.get("content-type", ""), request.stream())
+    except MultipartError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Each file is staged under a name of this request's own, so a failure
+    # (or a concurrent upload of the same kind) leaves current uploads intact
+    artifact_service = get_artifact_service()
+    staging = uuid.uuid4().hex
+    stored: Dict[str, UploadResult] = {}
+    mime_types: Dict[str, str] = {}
+    try:
+        with span("store_upload"):
+            async for part in parts:
+                kind = part.name
+                if kind not in ALLOWED_MIME_TYPES or part.filename is None:
+                    raise HTTPException(status_code=400, detail=f"Invalid media kind: {kind}")
+                if kind in stored:
+                    raise HTTPException(status_code=400, detail=f"Duplicate media kind: {kind}")
+                if part.content_type not in ALLOWED_MIME_TYPES[kind]:
+                    raise HTTPException(status_code=400, detail=f"Invalid mime type for {kind}")
+                stored[kind] = await artifact_service.save_upload_stream(
+                    part, session_id, kind,
+                    max_bytes=settings.MAX_UPLOAD_BYTES.get(kind),
+                    chunk_size=settings.UPLOAD_CHUNK_SIZE,
+                    staging=staging,
+                    mime_type=part.content_type,
+                )
+                mime_types[kind] = part.content_type
+        if not stored:
+            raise HTTPException(status_code=400, detail="No media files")
+
+        previous_kinds = {m.kind for m in session.media}
+        if complete and not REQUIRED_KINDS.issubset(previous_kinds | stored.keys()):
+            missing = REQUIRED_KINDS - previous_kinds - stored.keys()
+            raise HTTPException(status_code=400, detail=f"Missing required media: {', '.join(missing)}")
+    except BaseException as e:
+        # All or nothing: release what did get stored (even if the client went away)
+        def release():
+            for result in stored.values():
+                artifact_service.store.unlink(result.storage_key, result.path)
+        await asyncio.shield(asyncio.to_thread(release))
+        if isinstance(e, UploadTooLarge):
+            raise HTTPException(status_code=413, detail=str(e))
+        if isinstance(e, MultipartError):
+            raise HTTPException(status_code=400, detail=str(e))
+        raise
+
+    stored = await asyncio.to_thread(lambda: {
+        kind: artifact_service.publish_staged(result, session_id, kind) for kind, result in stored.items()
+    })
+    media = [media_row(session_id, kind, mime_types[kind], result) for kind, result in stored.items()]
+    db.add_all(media)
+    session.status = "media_complete" if complete else "uploading"
+    with span("db_commit"):
+        await db.commit()
+
+    if settings.PREPROCESS_ENABLED:
+        for row in media:
+            get_preprocessor().schedule(row)
+
+    return {
+        "status": "success",
+        "session_id": session_id,
+        "session_status": session.status,
+        "media": {
+            row.kind: {"size": row.size, "sha256": row.sha256, "deduplicated": stored[row.kind].deduped}
+            for row in media
+        },
+        "preprocessing": {row.kind: row.preprocess_status for row in media if row.preprocess_status},
+    }
 
 @router.post("/sessions/{session_id}/media/complete")
 async def complete_media(
     session_id: str,
     db: AsyncSession = Depends(get_db)
 ):
-    # Get session
-    session = await db.get(Session, session_id)
+    # Get session and its media in one query
+    session = await get_session_with_media(db, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
     # Verify all required media is present
-    media = await db.query(Media).filter(Media.session_id == session_id).all()
-    media_kinds = {m.kind for m in media}
+    media_kinds = {m.kind for m in session.media}
     
-    required_kinds = {"doc_front", "selfie", "av_clip"}  # Minimum required media
-    if not required_kinds.issubset(media_kinds):
-        missing = required_kinds - media_kinds
+    if not REQUIRED_KINDS.issubset(media_kinds):
+        missing = REQUIRED_KINDS - media_kinds
         raise HTTPException(
             status_code=400,
             detail=f"Missing required media: {', '.join(missing)}"
@@ -112,4 +277,8 @@ async def complete_media(
     session.status = "media_complete"
     await db.commit()
     
-    return {"status": "success", "session_id": session_id}
+    return {
+        "status": "success",
+        "session_id": session_id,
+        "preprocessing": {m.kind: m.preprocess_status for m in session.media if m.preprocess_status},
+    }
@@ -1,99 +1,120 @@
-from fastapi import APIRouter, Depends, HTTPException
+import json
+import time
+from contextlib import aclosing
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from pathlib import Path
-from typing import List
 
-from ..db import get_db
 from ..config import get_settings
-from ..models.session import Session
-from ..models.media import Media
-from ..models.verification_result import VerificationResult as DBVerificationResult
-from ..schemas import VerificationRequest, VerificationResult
-from ..services.llm import LLMService
-from ..services.artifact import ArtifactService
+from ..db import get_db
+from ..models.verification_job import VerificationJob
+from ..schemas import VerificationBatchRequest, VerificationRequest, VerificationResult
+from ..services.executor import ExecutorBusy
+from ..services.jobs import get_job_queue, job_payload, QueueFull
+from ..services.resilience import CircuitOpen, RateLimited
+from ..services.verification import (
+    get_verification_service, IdempotencyKeyReused, SessionNotFound, SessionNotReady, VerificationInProgress,
+)
 
 router = APIRouter()
-settings = get_settings()
 
-# Initialize services
-llm_service = LLMService()
-artifact_service = ArtifactService(Path(settings.MEDIA_ROOT))
+def error_status(e: Exception) -> int:
+    """HTTP status code for a failed verification"""
+    if isinstance(e, SessionNotFound):
+        return 404
+    if isinstance(e, SessionNotReady):
+        return 400
+    if isinstance(e, VerificationInProgress):
+        return 409
+    if isinstance(e, IdempotencyKeyReused):
+        return 422
+    if isinstance(e, (ExecutorBusy, QueueFull, CircuitOpen, RateLimited)):
+        return 503
+    return 500
 
 @router.post("/sessions/{session_id}/verify", response_model=VerificationResult)
 async def verify_session(
     session_id: str,
     request: VerificationRequest,
+    mode: str = "sync",
+    idempotency_key: Optional[str] = Header(None, max_length=255),
     db: AsyncSession = Depends(get_db)
 ):
-    # 1. Get session and validate media is complete
-    session = await db.get(Session, session_id)
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found")
-    if session.status != "media_complete":
-        raise HTTPException(status_code=400, detail="Session media not complete")
-    
-    # 2. Get media files
-    media_files = await db.query(Media).filter(Media.session_id == session_id).all()
-    media_dict = {m.kind: Path(m.path) for m in media_files}
-    
-    # 3. Process media files
+    if mode not in ("sync", "job"):
+        raise HTTPException(status_code=400, detail="mode must be 'sync' or 'job'")
+
     try:
-        # Process selfie
-        selfie_path, selfie_score = artifact_service.get_best_selfie(media_dict["selfie"])
-        
-        # Extract video keyframes
-        keyframes = artifact_service.extract_keyframes(media_dict["av_clip"])
-        
-        # Generate thumbnails for audit
-        thumbnails = {
-            "doc_front": artifact_service.generate_thumbnail(media_dict["doc_front"]),
-            "selfie": artifact_service.generate_thumbnail(selfie_path)
-        }
-        if "doc_back" in media_dict:
-            thumbnails["doc_back"] = artifact_service.generate_thumbnail(media_dict["doc_back"])
-        
-        # 4. Call LLM for verification
-        verification_result = await llm_service.verify_session(
-            session_id=session_id,
-            images={
-                "doc_front": media_dict["doc_front"],
-                "doc_back": media_dict.get("doc_back"),
-                "selfie": selfie_path,
-                **{f"keyframe_{i}": kf for i, kf in enumerate(keyframes)}
-            },
-            transcript="",  # TODO: Implement speech-to-text
-            expected_phrase=request.expected_phrase or "",
-            timings={
-                "prompt_shown": "2023-09-27T10:00:00Z",  # TODO: Get real timings
-                "speech_start": "2023-09-27T10:00:02Z",
-                "speech_end": "2023-09-27T10:00:05Z"
-            }
-        )
-        
-        # 5. Save results to database
-        db_result = DBVerificationResult(
-            session_id=session_id,
-            status=verification_result.status,
-            score=verification_result.score,
-            ocr_data=verification_result.ocr_data,
-            face_match_score=verification_result.face_match_score,
-            liveness_score=verification_result.liveness_score,
-            av_sync_score=verification_result.av_sync_score,
-            audio_spoof_score=verification_result.audio_spoof_score,
-            explanations=verification_result.explanations
+        if mode == "job":
+            # Queue the work and return immediately; the result is polled or
+            # delivered to the session's callback URL
+            session = await get_verification_service().get_ready_session(db, session_id)
+            job = await get_job_queue().enqueue(db, session, request.expected_phrase or "")
+            return JSONResponse(
+                status_code=202,
+                content={
+                    "job_id": job.id,
+                    "status": job.status,
+                    "status_url": f"/api/v1/verify/jobs/{job.id}",
+                },
+            )
+
+        return await get_verification_service().verify(
+            db, session_id, request.expected_phrase or "", idempotency_key=idempotency_key
         )
-        db.add(db_result)
-        
-        # Update session status
-        session.status = "verified" if verification_result.status == "verified" else "rejected"
-        
-        await db.commit()
-        
-        # 6. Cleanup raw files (keep thumbnails)
-        artifact_service.cleanup_session(session_id)
-        
-        return verification_result
         
     except Exception as e:
-        await db.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=error_status(e), detail=str(e))
+
+@router.post("/verify/batch")
+async def verify_batch(request: VerificationBatchRequest):
+    """Verify many sessions, streaming one NDJSON line per session as each finishes.
+
+    Every line carries the batch progress; a final `summary` line closes the
+    stream. Failed sessions are reported in their line and do not stop the batch.
+    """
+    settings = get_settings()
+    session_ids = list(dict.fromkeys(request.session_ids))
+    if len(session_ids) > settings.VERIFY_BATCH_MAX_SESSIONS:
+        raise HTTPException(
+            status_code=400, detail=f"At most {settings.VERIFY_BATCH_MAX_SESSIONS} sessions per batch"
+        )
+    concurrency = min(request.concurrency or settings.VERIFY_BATCH_CONCURRENCY, settings.VERIFY_BATCH_CONCURRENCY)
+    results = get_verification_service().verify_many(session_ids, request.expected_phrase or "", concurrency)
+
+    async def lines():
+        started = time.perf_counter()
+        done, failed, statuses = 0, 0, {}
+        async with aclosing(results):
+            async for session_id, outcome in results:
+                done += 1
+                if isinstance(outcome, Exception):
+                    failed += 1
+                    line = {"session_id": session_id, "ok": False,
+                            "status_code": error_status(outcome), "error": str(outcome)}
+                else:
+                    statuses[outcome.status] = statuses.get(outcome.status, 0) + 1
+                    line = {"session_id": session_id, "ok": True, "result": outcome.model_dump()}
+                line["progress"] = {"done": done, "total": len(session_ids), "failed": failed}
+                yield json.dumps(line) + "\n"
+        yield json.dumps({"summary": {
+            "total": len(session_ids),
+            "succeeded": done - failed,
+            "failed": failed,
+            "statuses": statuses,
+            "elapsed_s": round(time.perf_counter() - started, 3),
+        }}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@router.get("/verify/jobs/{job_id}")
+async def get_verification_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db)
+):
+    job = await db.get(VerificationJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_payload(job)
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from typing import Optional, List
 from datetime import datetime
 
@@ -14,6 +14,20 @@ class VerificationRequest(BaseModel):
     expected_phrase: Optional[str] = None
     metadata: Optional[dict] = None
 
+class VerificationBatchRequest(BaseModel):
+    session_ids: List[str] = Field(..., min_length=1)
+    expected_phrase: Optional[str] = None
+    concurrency: Optional[int] = Field(None, ge=1, description="Capped at VERIFY_BATCH_CONCURRENCY")
+
+# Numeric RiskSignals fields: (group, key, null allowed). A null KYC score
+# counts as failed KYC; the others are optional but must be numbers when sent
+RISK_NUMERIC_FIELDS = (
+    ("geo", "mins_since_prev", False),
+    ("kyc", "score", True),
+    ("kyc", "age_days", True),
+    ("recentSignals", "failedLogins", True),
+)
+
 class RiskSignals(BaseModel):
     userId: str
     geo: dict = Field(..., example={"prev": "US", "now": "UK", "mins_since_prev": 30})
@@ -21,11 +35,30 @@ class RiskSignals(BaseModel):
     kyc: dict = Field(..., example={"score": 0.82, "age_days": 10})
     recentSignals: dict = Field(..., example={"failedLogins": 2, "newIp": True})
 
+    @model_validator(mode="after")
+    def numeric_signals(self):
+        for group, key, nullable in RISK_NUMERIC_FIELDS:
+            values = getattr(self, group)
+            if key not in values or (values[key] is None and nullable):
+                continue
+            value = values[key]
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f"{group}.{key} must be a number")
+        return self
+
 class RiskDecision(BaseModel):
     action: str = Field(..., example="ALLOW")
     reason: str
+    reason_codes: List[str] = Field(default_factory=list, example=["NEW_IP"])
     score: Optional[float] = None
 
+class RiskBatchRequest(BaseModel):
+    signals: List[RiskSignals]
+
+class RiskBatchResponse(BaseModel):
+    count: int
+    decisions: List[RiskDecision]
+
 class VerificationResult(BaseModel):
     status: str
     score: float
@@ -35,6 +68,7 @@ class VerificationResult(BaseModel):
     av_sync_score: float
     audio_spoof_score: float
     explanations: List[str]
+    audio_analysis: Optional[dict] = None
 
     class Config:
         schema_extra = {
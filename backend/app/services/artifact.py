@@ -1,110 +1,680 @@
 import cv2
 import numpy as np
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, Iterable, List, Tuple, Optional
+from dataclasses import dataclass, field, replace
+import asyncio
+import fcntl
+import glob
+import hashlib
+import os
 import shutil
+import uuid
+
+from ..config import get_settings
+from .audio import analyse_wav
+from .avsync import score_av_sync
+from .metrics import span
+from .payload import estimate_image_tokens, fit_within, dedupe_frames
+from .storage import MediaStore, LocalMediaStore, get_media_store, shard_path
+
+
+class UploadTooLarge(ValueError):
+    """Raised when an upload exceeds the size limit for its kind"""
+
+
+class UploadOffsetMismatch(ValueError):
+    """Raised when a resumed upload does not line up with the stored partial file"""
+
+    def __init__(self, expected: int, received: int):
+        super().__init__(f"Upload offset {received} does not match stored offset {expected}")
+        self.expected = expected
+        self.received = received
+
+
+class UploadInProgress(RuntimeError):
+    """Raised when another request is still writing this kind's partial upload"""
+
+
+# Extension of a stored upload by its validated content type
+UPLOAD_EXTENSIONS = {
+    "image/jpeg": ".jpg", "image/png": ".png", "video/mp4": ".mp4", "audio/wav": ".wav", "audio/wave": ".wav",
+}
+
+
+def to_gray_small(frame: np.ndarray, max_width: int = 320) -> np.ndarray:
+    """Grayscale, downscaled copy of a BGR frame for cheap quality scoring"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    h, w = gray.shape[:2]
+    if w > max_width:
+        gray = cv2.resize(gray, (max_width, int(h * max_width / w)), interpolation=cv2.INTER_AREA)
+    return gray
+
+
+def sharpness_score(gray: np.ndarray) -> float:
+    """Variance of the 4-neighbour Laplacian, computed with array slicing"""
+    g = gray.astype(np.float32)
+    lap = (
+        g[:-2, 1:-1] + g[2:, 1:-1] + g[1:-1, :-2] + g[1:-1, 2:]
+        - 4.0 * g[1:-1, 1:-1]
+    )
+    return float(lap.var())
+
+
+def exposure_score(gray: np.ndarray) -> float:
+    """1.0 for a well exposed frame, falling towards 0 when dark, bright or clipped"""
+    mean = float(gray.mean())
+    clipped = float(np.count_nonzero((gray <= 5) | (gray >= 250))) / gray.size
+    balance = 1.0 - abs(mean - 128.0) / 128.0
+    return max(0.0, balance * (1.0 - clipped))
+
+
+def frame_quality(frame: np.ndarray) -> float:
+    """Combined sharpness/exposure score used to rank candidate frames"""
+    gray = to_gray_small(frame)
+    return sharpness_score(gray) * exposure_score(gray)
+
+
+def image_metrics(frame: np.ndarray) -> Dict[str, float]:
+    """Sharpness and exposure of a frame, for the local pre-screen"""
+    gray = to_gray_small(frame)
+    return {"sharpness": sharpness_score(gray), "exposure": exposure_score(gray)}
+
+
+def document_quad_ratio(frame: np.ndarray) -> float:
+    """Area (as a fraction of the image) of the largest convex quadrilateral outline.
+
+    A photographed ID card shows up as a clear four-sided edge contour; 0.0
+    means no plausible document outline was found.
+    """
+    gray = to_gray_small(frame, 480)
+    edges = cv2.Canny(cv2.GaussianBlur(gray, (5, 5), 0), 50, 150)
+    edges = cv2.dilate(edges, None)
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    best = 0.0
+    for contour in sorted(contours, key=cv2.contourArea, reverse=True)[:5]:
+        approx = cv2.approxPolyDP(contour, 0.02 * cv2.arcLength(contour, True), True)
+        if len(approx) == 4 and cv2.isContourConvex(approx):
+            best = max(best, cv2.contourArea(approx) / gray.size)
+    return float(best)
+
+
+def write_atomic(path: Path, data: bytes):
+    """Write via a uniquely named temp file and rename: readers (and a concurrent
+    writer of the same file) never see it half written"""
+    tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+@dataclass
+class MediaArtifact:
+    """An image held in memory: encoded bytes plus, while still needed, decoded pixels"""
+    kind: str
+    data: bytes
+    mime_type: str = "image/jpeg"
+    frame: Optional[np.ndarray] = None
+    width: int = 0
+    height: int = 0
+    # Size and estimated token cost before payload shrinking
+    source_bytes: int = 0
+    source_tokens: int = 0
+    # Local quality measurements (sharpness, exposure, face_count, ...)
+    metrics: Dict[str, float] = field(default_factory=dict)
+
+    def without_frame(self) -> "MediaArtifact":
+        """Drop the decoded pixels, e.g. before handing the artifact across processes"""
+        return replace(self, frame=None)
+
+
+@dataclass
+class UploadResult:
+    path: Path
+    size: int
+    sha256: Optional[str]
+    complete: bool
+    storage_key: Optional[str] = None
+    deduped: bool = False
+
 
 class ArtifactService:
-    def __init__(self, media_root: Path):
+    def __init__(self, media_root: Path, store: Optional[MediaStore] = None):
         self.media_root = media_root
         self.raw_dir = media_root / "raw"
         self.thumbs_dir = media_root / "thumbs"
+        self.store = store or LocalMediaStore(media_root)
+        self._face_cascade = None
+        self._face_detector = None
+        settings = get_settings()
+        self.thumb_max_side = settings.THUMB_MASTER_MAX_SIDE
+        self.thumb_quality = settings.THUMB_MASTER_QUALITY
         
         # Ensure directories exist
         self.raw_dir.mkdir(parents=True, exist_ok=True)
         self.thumbs_dir.mkdir(parents=True, exist_ok=True)
 
-    def extract_keyframes(self, video_path: Path, count: int = 5) -> List[Path]:
-        """Extract keyframes from video for analysis"""
+    @property
+    def face_cascade(self) -> "cv2.CascadeClassifier":
+        """Haar face detector, loaded once per service instance"""
+        if self._face_cascade is None:
+            self._face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        return self._face_cascade
+
+    @property
+    def face_detector(self) -> "FaceDetector":
+        """Downscaled, coarse-to-fine detection with the shared cascade"""
+        if self._face_detector is None:
+            from .faces import FaceDetector
+            self._face_detector = FaceDetector(self.face_cascade)
+        return self._face_detector
+
+    @span("keyframes")
+    def select_keyframes(
+        self,
+        video_path: Path,
+        count: int = 5,
+        candidates_per_second: float = 6.0,
+        per_window: int = 1,
+    ) -> Tuple[List[np.ndarray], Dict[str, float]]:
+        """Select the sharpest, best exposed keyframes from a video in one pass.
+
+        The clip is decoded sequentially: every frame is `grab()`bed, but only
+        sampled candidates are `retrieve()`d and scored. The clip is split into
+        time windows and the best `per_window` candidates of each are kept. When
+        the frame count is unknown, windows start at one second and are merged
+        pairwise whenever there are more than twice as many as needed, so the
+        number of frames held in memory stays bounded.
+
+        Also returns clip stats measured while decoding (frames, fps, duration_s).
+        """
         cap = cv2.VideoCapture(str(video_path))
-        
-        frames = []
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video: {video_path}")
+
+        windows_needed = max(1, -(-count // per_window))
+        windows = {}  # window index -> [(score, timestamp_ms, frame)]
         try:
-            # Get total frames and calculate interval
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            interval = total_frames // (count + 1)
-            
-            current_frame = 0
-            while len(frames) < count and current_frame < total_frames:
-                cap.set(cv2.CAP_PROP_POS_FRAMES, current_frame)
-                ret, frame = cap.read()
-                if ret:
-                    # Save frame
-                    frame_path = video_path.parent / f"keyframe_{len(frames)}.jpg"
-                    cv2.imwrite(str(frame_path), frame)
-                    frames.append(frame_path)
-                current_frame += interval
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            if not fps or fps != fps or fps > 240:
+                fps = 30.0
+            stride = max(1, int(round(fps / candidates_per_second)))
+
+            # The container's frame count is only a hint for the window size
+            estimated_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            if estimated_frames > 0:
+                window_ms = max(1.0, estimated_frames / fps * 1000.0 / windows_needed)
+            else:
+                window_ms = 1000.0
+
+            index = 0
+            while cap.grab():
+                if index % stride == 0:
+                    ok, frame = cap.retrieve()
+                    if ok:
+                        ts = cap.get(cv2.CAP_PROP_POS_MSEC) or index * 1000.0 / fps
+                        bucket = windows.setdefault(int(ts // window_ms), [])
+                        bucket.append((frame_quality(frame), ts, frame))
+                        bucket.sort(key=lambda c: c[0], reverse=True)
+                        del bucket[per_window:]
+
+                        if len(windows) > 2 * windows_needed:
+                            window_ms *= 2
+                            merged = {}
+                            for w, cands in windows.items():
+                                merged.setdefault(w // 2, []).extend(cands)
+                            for cands in merged.values():
+                                cands.sort(key=lambda c: c[0], reverse=True)
+                                del cands[per_window:]
+                            windows = merged
+                index += 1
         finally:
             cap.release()
-            
-        return frames
 
-    def get_best_selfie(self, selfie_path: Path) -> Tuple[Path, float]:
-        """Select best quality selfie frame and score it"""
-        frame = cv2.imread(str(selfie_path))
+        # Spread the picks evenly over the windows that actually had frames
+        keys = sorted(windows)
+        if len(keys) > windows_needed:
+            step = len(keys) / windows_needed
+            keys = [keys[int(i * step + step / 2)] for i in range(windows_needed)]
+        picked = sorted(
+            (c for k in keys for c in windows[k]),
+            key=lambda c: c[1],
+        )[:count]
+
+        clip_stats = {"frames": index, "fps": fps, "duration_s": index / fps}
+        return [frame for score, ts, frame in picked], clip_stats
+
+    def extract_keyframes(self, video_path: Path, count: int = 5) -> List[MediaArtifact]:
+        """Extract keyframes from video for analysis"""
+        frames, _ = self.select_keyframes(video_path, count)
+        return [self.encode_frame(frame, f"keyframe_{i}") for i, frame in enumerate(frames)]
+
+    def count_faces(self, frame: np.ndarray) -> int:
+        """Number of faces found on downscaled grayscale copies of the frame"""
+        return len(self.face_detector.detect(frame))
+
+    @span("decode")
+    def load_image(self, image_path: Path, kind: str) -> MediaArtifact:
+        """Read an uploaded image once, keeping its original bytes and decoded pixels"""
+        data = image_path.read_bytes()
+        frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
         if frame is None:
-            raise ValueError(f"Could not read image: {selfie_path}")
+            raise ValueError(f"Could not read image: {image_path}")
+        mime_type = "image/png" if data[:8] == b"\x89PNG\r\n\x1a\n" else "image/jpeg"
+        h, w = frame.shape[:2]
+        return MediaArtifact(
+            kind=kind, data=data, mime_type=mime_type, frame=frame, width=w, height=h,
+            source_bytes=len(data), source_tokens=estimate_image_tokens(w, h),
+        )
+
+    @span("encode")
+    def encode_frame(self, frame: np.ndarray, kind: str, quality: int = 90) -> MediaArtifact:
+        """Encode decoded pixels to JPEG once, keeping the frame alongside"""
+        ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            raise ValueError(f"Could not encode {kind}")
+        h, w = frame.shape[:2]
+        return MediaArtifact(
+            kind=kind, data=buf.tobytes(), mime_type="image/jpeg", frame=frame, width=w, height=h,
+            source_tokens=estimate_image_tokens(w, h),
+        )
+
+    def shrink_for_llm(self, image: MediaArtifact, max_side: int, quality: int) -> MediaArtifact:
+        """Cap resolution and re-encode for the LLM payload.
+
+        Images that are already small enough JPEGs keep their original bytes,
+        so nothing is encoded twice.
+        """
+        resized = fit_within(image.frame, max_side)
+        if resized is image.frame and image.mime_type == "image/jpeg":
+            return image
+        shrunk = self.encode_frame(resized, image.kind, quality)
+        return replace(shrunk, source_bytes=image.source_bytes, source_tokens=image.source_tokens)
+
+    @span("quality")
+    def get_best_selfie(self, selfie: MediaArtifact) -> Tuple[MediaArtifact, float, Optional["FaceCandidate"]]:
+        """Select best quality selfie frame and score it (with its most prominent face)"""
+        frame = selfie.frame
         
         # Basic quality metrics
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
         blur_score = cv2.Laplacian(gray, cv2.CV_64F).var()
         
-        # Face detection for additional validation
-        face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-        faces = face_cascade.detectMultiScale(gray, 1.3, 5)
-        
-        face_score = len(faces)  # Simple metric: number of faces detected
+        # Face detection for additional validation (on downscaled copies)
+        face_score, face = self.detect_face("selfie", frame)  # Simple metric: number of faces detected
         
         # Combined quality score
         quality_score = (blur_score / 1000) * (1 if face_score == 1 else 0)
         
-        # Save processed selfie
-        output_path = selfie_path.parent / "selfie_processed.jpg"
-        cv2.imwrite(str(output_path), frame)
-        
-        return output_path, float(quality_score)
+        selfie.metrics.update(image_metrics(frame), face_count=face_score)
+        return selfie, float(quality_score), face
 
-    def generate_thumbnail(self, image_path: Path, size: Tuple[int, int] = (256, 256)) -> Path:
-        """Generate a small thumbnail for audit purposes"""
-        img = cv2.imread(str(image_path))
-        if img is None:
-            raise ValueError(f"Could not read image: {image_path}")
-            
-        # Resize maintaining aspect ratio
-        h, w = img.shape[:2]
-        aspect = w/h
-        if aspect > 1:
-            new_w = size[0]
-            new_h = int(size[0]/aspect)
-        else:
-            new_h = size[1]
-            new_w = int(size[1]*aspect)
-            
-        thumb = cv2.resize(img, (new_w, new_h))
-        
-        # Create thumbnail path
-        thumb_path = self.thumbs_dir / image_path.name
-        cv2.imwrite(str(thumb_path), thumb)
-        
+    @span("thumbnail")
+    def generate_thumbnail(self, image: MediaArtifact, name: str) -> Path:
+        """Write the retained audit master of an image: downscaled once, with area
+        interpolation; the served sizes are rendered from it on request"""
+        master = fit_within(image.frame, self.thumb_max_side)
+        ok, buf = cv2.imencode(".jpg", master, [cv2.IMWRITE_JPEG_QUALITY, self.thumb_quality])
+        if not ok:
+            raise ValueError(f"Could not encode thumbnail for {image.kind}")
+
+        thumb_path = self.thumbs_dir / name
+        thumb_path.parent.mkdir(parents=True, exist_ok=True)
+        # Readers may be serving the previous master: swap the file in whole
+        write_atomic(thumb_path, buf.tobytes())
         return thumb_path
+
+    def prepare_image(self, image_path: Path, kind: str, thumb_name: str, max_side: int = 1600,
+                      quality: int = 88) -> Tuple[MediaArtifact, Path]:
+        """Decode an uploaded image once, write its audit thumbnail and shrink it for the LLM"""
+        image = self.load_image(image_path, kind)
+        with span("quality"):
+            image.metrics.update(image_metrics(image.frame), quad_ratio=document_quad_ratio(image.frame))
+        thumb = self.generate_thumbnail(image, thumb_name)
+        return self.shrink_for_llm(image, max_side, quality).without_frame(), thumb
+
+    def prepare_selfie(self, selfie_path: Path, thumb_name: str, max_side: int = 768, quality: int = 85,
+                       face_limits: Optional[Dict] = None
+                       ) -> Tuple[MediaArtifact, float, Path, Optional[MediaArtifact]]:
+        """Decode the selfie once, score it, write its audit thumbnail and shrink it for the LLM.
+
+        With `face_limits` (max_side and quality) the face crop is cut from the
+        full-resolution upload too; otherwise, or without a face, it is None.
+        """
+        selfie, score, face = self.get_best_selfie(self.load_image(selfie_path, "selfie"))
+        thumb = self.generate_thumbnail(selfie, thumb_name)
+        face_crop = self.crop_best_face([face], **face_limits) if face_limits is not None else None
+        return self.shrink_for_llm(selfie, max_side, quality).without_frame(), score, thumb, face_crop
+
+    def detect_face(self, source: str, frame: np.ndarray) -> Tuple[int, Optional["FaceCandidate"]]:
+        """Number of faces in a frame, and its most prominent one scored for matching"""
+        from .faces import score_face
+        boxes = self.face_detector.detect(frame)
+        return len(boxes), score_face(source, frame, boxes[0], len(boxes)) if boxes else None
+
+    @span("face_select")
+    def crop_best_face(self, candidates: Iterable[Optional["FaceCandidate"]], max_side: int = 768,
+                       quality: int = 85) -> Optional[MediaArtifact]:
+        """Crop of the best-scored face, cut from its source-resolution frame and
+        encoded once; its metrics say how good the face is and where it came from"""
+        from .faces import crop_face
+        best = max((c for c in candidates if c is not None), key=lambda c: c.score, default=None)
+        if best is None:
+            return None
+        crop = self.encode_frame(fit_within(crop_face(best.frame, best.box), max_side), "selfie_face", quality)
+        crop.metrics.update(best.metrics, from_clip=float(best.source != "selfie"))
+        return crop.without_frame()
+
+    def prepare_keyframes(self, video_path: Path, count: int = 5, max_side: int = 512, quality: int = 75,
+                          dedupe_distance: int = 6, face_limits: Optional[Dict] = None
+                          ) -> Tuple[List[MediaArtifact], Dict[str, float], Optional[MediaArtifact]]:
+        """Extract keyframes as encoded, in-memory artifacts, plus clip-level metrics.
+
+        Near-duplicate frames (by perceptual hash) are dropped and the rest are
+        downscaled before their one and only JPEG encode. With `face_limits`
+        the best face crop is cut from the keyframes at source resolution.
+        """
+        frames, clip_metrics = self.select_keyframes(video_path, count)
+        frames = [frames[i] for i in dedupe_frames(frames, dedupe_distance)]
+        keyframes, faces = [], []
+        for i, frame in enumerate(frames):
+            h, w = frame.shape[:2]
+            kf = self.encode_frame(fit_within(frame, max_side), f"keyframe_{i}", quality)
+            face_count, face = self.detect_face(kf.kind, frame)
+            kf.metrics.update(image_metrics(frame), face_count=face_count)
+            keyframes.append(replace(kf, frame=None, source_tokens=estimate_image_tokens(w, h)))
+            faces.append(face)
+        face_crop = self.crop_best_face(faces, **face_limits) if face_limits is not None else None
+
+        if keyframes:
+            clip_metrics["face_ratio"] = sum(kf.metrics["face_count"] >= 1 for kf in keyframes) / len(keyframes)
+            clip_metrics["mean_sharpness"] = sum(kf.metrics["sharpness"] for kf in keyframes) / len(keyframes)
+        else:
+            clip_metrics["face_ratio"] = 0.0
+        return keyframes, clip_metrics, face_crop
+
+    @staticmethod
+    @span("artifact_write")
+    def save_artifact(artifact: MediaArtifact, path: Path) -> Dict:
+        """Write an artifact's encoded bytes to disk; returns a JSON-able record of it"""
+        write_atomic(path, artifact.data)
+        return {
+            "kind": artifact.kind,
+            "path": str(path),
+            "mime_type": artifact.mime_type,
+            "width": artifact.width,
+            "height": artifact.height,
+            "source_bytes": artifact.source_bytes,
+            "source_tokens": artifact.source_tokens,
+            "metrics": artifact.metrics,
+        }
+
+    @staticmethod
+    def load_artifact(record: Dict) -> MediaArtifact:
+        """Rebuild an artifact saved by `save_artifact` (no decode, just the bytes)"""
+        fields = {k: v for k, v in record.items() if k != "path"}
+        return MediaArtifact(data=Path(record["path"]).read_bytes(), **fields)
+
+    def derived_dir(self, session_id: str, media_id: int) -> Path:
+        """Where upload-time preprocessing keeps the LLM-ready artifacts of one
+        media row (a retake gets its own, so jobs never overwrite each other)"""
+        return self.raw_dir / session_id / "derived" / str(media_id)
+
+    def preprocess_image(self, image_path: Path, kind: str, thumb_name: str, out_dir: Path,
+                         max_side: int = 1600, quality: int = 88, face_limits: Optional[Dict] = None) -> Dict:
+        """Upload-time work for an image: thumbnail, quality metrics and LLM-ready bytes
+        (plus, for the selfie with `face_limits`, its face crop)"""
+        face = None
+        if kind == "selfie":
+            artifact, score, thumb, face = self.prepare_selfie(image_path, thumb_name, max_side, quality, face_limits)
+            artifact.metrics["quality_score"] = score
+        else:
+            artifact, thumb = self.prepare_image(image_path, kind, thumb_name, max_side, quality)
+        # The session directory is gone once the session was verified or purged
+        out_dir.parent.mkdir(exist_ok=True)
+        out_dir.mkdir(exist_ok=True)
+        return {
+            "thumbnail": str(thumb),
+            "artifacts": [self.save_artifact(artifact, out_dir / f"{kind}.jpg")],
+            "face": self.save_artifact(face, out_dir / f"{face.kind}.jpg") if face is not None else None,
+        }
+
+    def preprocess_clip(self, video_path: Path, out_dir: Path, count: int = 5, max_side: int = 512,
+                        quality: int = 75, dedupe_distance: int = 6, av_sync: Optional[Dict] = None,
+                        face_limits: Optional[Dict] = None) -> Dict:
+        """Upload-time work for a video: probe stats, clip metrics and encoded keyframes.
+
+        With `av_sync` (keyword arguments for `measure_av_sync`) the lip-sync
+        measurement is added to the clip metrics too, and with `face_limits`
+        the best face crop of the keyframes is kept.
+        """
+        keyframes, clip_metrics, face = self.prepare_keyframes(
+            video_path, count, max_side, quality, dedupe_distance, face_limits
+        )
+        if av_sync is not None:
+            clip_metrics.update(self.measure_av_sync(video_path, **av_sync))
+        out_dir.parent.mkdir(exist_ok=True)
+        out_dir.mkdir(exist_ok=True)
+        return {
+            "clip_metrics": clip_metrics,
+            "artifacts": [self.save_artifact(kf, out_dir / f"{kf.kind}.jpg") for kf in keyframes],
+            "face": self.save_artifact(face, out_dir / f"{face.kind}.jpg") if face is not None else None,
+        }
+
+    @span("av_sync")
+    def measure_av_sync(self, video_path: Path, max_seconds: float = 10.0, cpu_budget_ms: float = 1500.0) -> Dict:
+        """Local lip-sync estimate as `av_sync_*` clip metrics; empty when it cannot be measured"""
+        result = score_av_sync(video_path, self.face_cascade, max_seconds=max_seconds, cpu_budget_ms=cpu_budget_ms)
+        if result is None:
+            return {}
+        return {
+            "av_sync_offset_ms": result.offset_ms,
+            "av_sync_confidence": result.confidence,
+            "av_sync_score": result.score,
+        }
+
+    @staticmethod
+    @span("audio")
+    def analyse_audio(audio_path: Path) -> Dict:
+        """Speech timings and spoofing features of the phrase recording"""
+        return analyse_wav(audio_path).as_dict()
         
-    def save_upload(self, file_data: bytes, session_id: str, kind: str) -> Path:
+    def upload_path(self, session_id: str, kind: str, staging: Optional[str] = None,
+                    mime_type: Optional[str] = None) -> Path:
+        """Final on-disk path for an uploaded media kind (or a staged copy of it, named by `staging`)"""
+        # The extension follows the upload's content type, else the kind's usual format
+        ext = UPLOAD_EXTENSIONS.get(mime_type) or (
+            ".jpg" if kind in ["doc_front", "doc_back", "selfie"] else ".mp4" if kind in ["av_clip"] else ".wav"
+        )
+        name = f"{kind}.{staging}{ext}" if staging else f"{kind}{ext}"
+        return self.raw_dir / session_id / name
+
+    def part_path(self, session_id: str, kind: str, staging: Optional[str] = None) -> Path:
+        """The `.part` file an upload is received into; the same for every content type of a kind"""
+        name = f"{kind}.{staging}.part" if staging else f"{kind}.part"
+        return self.raw_dir / session_id / name
+
+    def publish_staged(self, result: UploadResult, session_id: str, kind: str) -> UploadResult:
+        """Move a staged upload to the kind's final path, replacing the previous one"""
+        final = self.raw_dir / session_id / f"{kind}{result.path.suffix}"
+        self.store.move(result.storage_key, result.path, final)
+        return replace(result, path=final)
+
+    def partial_upload_size(self, session_id: str, kind: str) -> int:
+        """Number of bytes already received for an interrupted upload (blocking; call it in a thread)"""
+        try:
+            return self.part_path(session_id, kind).stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    @staticmethod
+    def _lock_part(part_path: Path):
+        """Open (creating, not truncating) a `.part` file under an exclusive lock.
+
+        The lock is an flock, so it also holds between worker processes. A
+        part published by the previous holder while we waited to open it
+        leaves us with a stale inode, so the open is retried until the lock
+        is on the file currently at `part_path`.
+        """
+        while True:
+            f = os.fdopen(os.open(part_path, os.O_RDWR | os.O_CREAT, 0o644), "r+b")
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                f.close()
+                raise UploadInProgress(f"{part_path.stem} is already being uploaded")
+            try:
+                current = os.stat(part_path).st_ino
+            except FileNotFoundError:
+                current = None
+            if current == os.fstat(f.fileno()).st_ino:
+                return f
+            f.close()
+
+    def save_upload(self, file_data: bytes, session_id: str, kind: str) -> UploadResult:
         """Save an uploaded file to the raw directory"""
         # Create session directory
-        session_dir = self.raw_dir / session_id
-        session_dir.mkdir(exist_ok=True)
-        
-        # Determine file extension based on kind
-        ext = ".jpg" if kind in ["doc_front", "doc_back", "selfie"] else ".mp4" if kind in ["av_clip"] else ".wav"
+        file_path = self.upload_path(session_id, kind)
+        file_path.parent.mkdir(exist_ok=True)
         
-        # Save file
-        file_path = session_dir / f"{kind}{ext}"
-        file_path.write_bytes(file_data)
+        # Save file through the content-addressed store
+        part_path = self.part_path(session_id, kind)
+        part_path.write_bytes(file_data)
+        digest = hashlib.sha256(file_data).hexdigest()
+        key, deduped = self.store.put(part_path, digest, file_path)
         
-        return file_path
+        return UploadResult(path=file_path, size=len(file_data), sha256=digest, complete=True,
+                            storage_key=key, deduped=deduped)
+
+    async def save_upload_stream(
+        self,
+        upload,
+        session_id: str,
+        kind: str,
+        offset: int = 0,
+        final: bool = True,
+        max_bytes: Optional[int] = None,
+        chunk_size: int = 1024 * 1024,
+        staging: Optional[str] = None,
+        mime_type: Optional[str] = None,
+    ) -> UploadResult:
+        """Stream an upload to disk in chunks, resuming from `offset`.
+
+        Data is appended to a `.part` file off the event loop and atomically
+        renamed into place once the final chunk arrives; the file is named
+        with the extension of `mime_type`. The `.part` is locked while this
+        runs, so a concurrent upload of the same kind gets UploadInProgress
+        instead of writing into it. With `staging` the file (and its `.part`)
+        get names of their own, leaving the kind's current upload alone until
+        `publish_staged`.
+        """
+        file_path = self.upload_path(session_id, kind, staging, mime_type)
+        part_path = self.part_path(session_id, kind, staging)
+        await asyncio.to_thread(file_path.parent.mkdir, exist_ok=True)
+        if max_bytes is not None and offset > max_bytes:
+            raise UploadTooLarge(f"{kind} exceeds {max_bytes} bytes")
+
+        f = await asyncio.to_thread(self._lock_part, part_path)
+        try:
+            # A resumed upload must start exactly where the stored partial ends
+            stored = (await asyncio.to_thread(os.fstat, f.fileno())).st_size
+            if offset > stored:
+                raise UploadOffsetMismatch(stored, offset)
 
-    def cleanup_session(self, session_id: str):
-        """Remove raw files for a session, keeping only thumbnails"""
+            # Re-seed the digest from the bytes kept by an earlier attempt
+            h = hashlib.sha256()
+            if offset:
+                await asyncio.to_thread(self._hash_into, h, part_path, offset, chunk_size)
+
+            await asyncio.to_thread(f.truncate, offset)
+            await asyncio.to_thread(f.seek, offset)
+            size = offset
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise UploadTooLarge(f"{kind} exceeds {max_bytes} bytes")
+                h.update(chunk)
+                await asyncio.to_thread(f.write, chunk)
+            await asyncio.to_thread(f.flush)
+            if not final:
+                return UploadResult(path=part_path, size=size, sha256=None, complete=False)
+            await asyncio.to_thread(os.fsync, f.fileno())
+
+            # Publish the finished file atomically into the content-addressed
+            # store, still under the lock so no other upload can reopen the part
+            digest = h.hexdigest()
+            key, deduped = await asyncio.to_thread(self.store.put, part_path, digest, file_path)
+        except BaseException as e:
+            # A staged part is never resumed, and an oversized one must not be
+            if staging or isinstance(e, UploadTooLarge):
+                await asyncio.to_thread(part_path.unlink, missing_ok=True)
+            raise
+        finally:
+            await asyncio.to_thread(f.close)
+
+        return UploadResult(path=file_path, size=size, sha256=digest, complete=True,
+                            storage_key=key, deduped=deduped)
+
+    @staticmethod
+    def _hash_into(h, path: Path, limit: int, chunk_size: int):
+        with open(path, "rb") as f:
+            remaining = limit
+            while remaining > 0:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                h.update(chunk)
+                remaining -= len(chunk)
+
+    @staticmethod
+    def thumbnail_name(session_id: str, kind: str, media_id: int) -> str:
+        """Sharded path (relative to thumbs/) of the audit thumbnail master of one media row"""
+        return shard_path(f"{session_id}_{kind}_{media_id}.jpg")
+
+    @staticmethod
+    def thumbnail_render_path(master: Path, etag: str, ext: str) -> Path:
+        """Where a size/format rendered from `master` is kept, next to it"""
+        return master.with_name(f"{master.stem}.{etag}{ext}")
+
+    def thumbnail_paths(self, session_id: str, media: Iterable[Tuple[int, str]]) -> List[Path]:
+        """Audit thumbnail masters of a session's (media id, kind) rows and the renders made from them"""
+        paths = []
+        for media_id, kind in media:
+            master = self.thumbs_dir / self.thumbnail_name(session_id, kind, media_id)
+            paths.append(master)
+            paths.extend(Path(p) for p in glob.glob(glob.escape(str(master.with_suffix(""))) + ".*.*"))
+        return paths
+
+    def cleanup_session(self, session_id: str, stored: Iterable[Tuple[str, str]] = ()) -> int:
+        """Remove raw files for a session, keeping only thumbnails.
+
+        `stored` lists the (storage_key, path) pairs of the session's media so
+        their references in the media store are released. Returns the bytes
+        actually freed: shared (deduplicated) objects only count once the last
+        reference is gone.
+        """
+        reclaimed = 0
+        for key, path in stored:
+            path = Path(path)
+            size = path.stat().st_size if path.exists() else 0
+            if self.store.unlink(key, path):
+                reclaimed += size
         session_dir = self.raw_dir / session_id
         if session_dir.exists():
+            # Whatever is left (e.g. partial uploads) is owned by this session alone
+            reclaimed += sum(f.stat().st_size for f in session_dir.rglob("*") if f.is_file())
             shutil.rmtree(session_dir)
+        return reclaimed
+
+
+@lru_cache()
+def get_artifact_service() -> ArtifactService:
+    """The API process's shared instance (pool workers build their own)"""
+    return ArtifactService(Path(get_settings().MEDIA_ROOT), get_media_store())
@@ -0,0 +1,215 @@
+import struct
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+FRAME_MS = 20
+FRAMES_PER_CHUNK = 50  # one second of 20 ms frames per read
+CLIP_LEVEL = 0.99
+SILENCE_DBFS = -60.0
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+@dataclass
+class AudioAnalysis:
+    """Speech timings and spoofing features of a phrase recording (times in ms)"""
+    duration_ms: int
+    sample_rate: int
+    channels: int
+    speech_start_ms: Optional[int]
+    speech_end_ms: Optional[int]
+    speech_ms: int
+    silence_ratio: float
+    clipping_ratio: float
+    spectral_flatness: float
+    peak_dbfs: float
+    noise_floor_dbfs: float
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def pcm_to_float(raw: bytes, sample_width: int, channels: int, is_float: bool = False) -> np.ndarray:
+    """Decode little-endian PCM (or IEEE float) bytes to float32 samples in [-1, 1], shaped (n, channels)"""
+    if is_float:
+        if sample_width not in (4, 8):
+            raise ValueError(f"Unsupported float sample width: {sample_width} bytes")
+        samples = np.clip(np.frombuffer(raw, dtype=f"<f{sample_width}").astype(np.float32), -1.0, 1.0)
+    elif sample_width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif sample_width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif sample_width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        v = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        samples = np.where(v & 0x800000, v - 0x1000000, v).astype(np.float32) / 8388608.0
+    elif sample_width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"Unsupported sample width: {sample_width} bytes")
+    return samples.reshape(-1, channels)
+
+
+class WavReader:
+    """Minimal RIFF/WAVE reader for PCM, IEEE float and WAVE_FORMAT_EXTENSIBLE
+    files (the stdlib `wave` module only reads plain PCM)"""
+
+    def __init__(self, path: Path):
+        self._file = open(path, "rb")
+        try:
+            self._read_header()
+        except Exception:
+            self._file.close()
+            raise
+
+    def _read_header(self):
+        riff, _, wave_id = struct.unpack("<4sI4s", self._file.read(12))
+        if riff != b"RIFF" or wave_id != b"WAVE":
+            raise ValueError("Not a RIFF/WAVE file")
+        fmt = None
+        while True:
+            header = self._file.read(8)
+            if len(header) < 8:
+                raise ValueError("WAV file has no data chunk")
+            chunk_id, size = struct.unpack("<4sI", header)
+            if chunk_id == b"fmt ":
+                fmt = self._file.read(size + (size & 1))
+            elif chunk_id == b"data":
+                if fmt is None:
+                    raise ValueError("WAV data chunk before fmt chunk")
+                # Streaming writers may leave the size unset: read to the end then
+                self._remaining = size if size not in (0, 0xFFFFFFFF) else None
+                break
+            else:
+                self._file.seek(size + (size & 1), 1)
+
+        if len(fmt) < 16:
+            raise ValueError("WAV fmt chunk too short")
+        tag, self.channels, self.rate, _, _, bits = struct.unpack("<HHIIHH", fmt[:16])
+        if tag == WAVE_FORMAT_EXTENSIBLE:
+            if len(fmt) < 26:
+                raise ValueError("WAV extensible fmt chunk too short")
+            # The sub-format GUID starts with the actual format tag
+            tag = struct.unpack("<H", fmt[24:26])[0]
+        if tag not in (WAVE_FORMAT_PCM, WAVE_FORMAT_IEEE_FLOAT):
+            raise ValueError(f"Unsupported WAV format: {tag}")
+        if not self.channels or not bits:
+            raise ValueError("WAV fmt chunk has no channels or sample size")
+        self.is_float = tag == WAVE_FORMAT_IEEE_FLOAT
+        self.sample_width = (bits + 7) // 8
+
+    def readframes(self, count: int) -> bytes:
+        size = count * self.sample_width * self.channels
+        if self._remaining is not None:
+            size = min(size, self._remaining)
+        raw = self._file.read(size)
+        # Drop a trailing partial frame
+        raw = raw[:len(raw) - len(raw) % (self.sample_width * self.channels)]
+        if self._remaining is not None:
+            self._remaining -= len(raw)
+        return raw
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self) -> "WavReader":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def frame_features(frames: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Energy (dBFS), zero-crossing rate and spectral flatness of each row of `frames`"""
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    energy_db = 20.0 * np.log10(rms + 1e-10)
+    zcr = np.mean(np.signbit(frames[:, 1:]) != np.signbit(frames[:, :-1]), axis=1)
+    power = np.abs(np.fft.rfft(frames * np.hanning(frames.shape[1]), axis=1)) ** 2 + 1e-12
+    flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+    return energy_db, zcr, flatness
+
+
+def _runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Start and (exclusive) end indices of the True runs in a boolean array"""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def detect_speech(energy_db: np.ndarray, zcr: np.ndarray, max_gap_frames: int = 10,
+                  min_speech_frames: int = 3) -> Tuple[np.ndarray, float]:
+    """Energy/zero-crossing voice activity per frame; returns (voiced mask, noise floor dBFS).
+
+    The threshold adapts to the recording's noise floor (10th percentile of
+    frame energy). Pauses shorter than `max_gap_frames` inside speech are
+    bridged and bursts shorter than `min_speech_frames` are dropped.
+    """
+    noise_floor = float(np.percentile(energy_db, 10))
+    threshold = min(max(noise_floor + 10.0, -50.0), float(energy_db.max()) - 20.0)
+    # Very high zero-crossing rates are hiss or clicks rather than voice
+    voiced = (energy_db > max(threshold, SILENCE_DBFS)) & (zcr < 0.45)
+
+    gap_starts, gap_ends = _runs(~voiced)
+    for start, end in zip(gap_starts, gap_ends):
+        if start > 0 and end < len(voiced) and end - start <= max_gap_frames:
+            voiced[start:end] = True
+    starts, ends = _runs(voiced)
+    for start, end in zip(starts, ends):
+        if end - start < min_speech_frames:
+            voiced[start:end] = False
+    return voiced, noise_floor
+
+
+def analyse_wav(path: Path) -> AudioAnalysis:
+    """Stream a WAV file (PCM or float) one second at a time and measure its speech and spoof features.
+
+    Only per-frame features are kept (50 values per second), so memory does
+    not grow with the raw sample count.
+    """
+    energy, zcrs, flatness = [], [], []
+    clipped = peak = total = 0
+    with WavReader(path) as wav:
+        rate, channels, width = wav.rate, wav.channels, wav.sample_width
+        frame_len = max(1, rate * FRAME_MS // 1000)
+        while True:
+            raw = wav.readframes(frame_len * FRAMES_PER_CHUNK)
+            if not raw:
+                break
+            samples = pcm_to_float(raw, width, channels, wav.is_float)
+            total += len(samples)
+            magnitude = np.abs(samples)
+            clipped += int(np.count_nonzero(magnitude.max(axis=1) >= CLIP_LEVEL))
+            peak = max(peak, float(magnitude.max()))
+
+            mono = samples.mean(axis=1)
+            usable = len(mono) // frame_len * frame_len
+            if usable:
+                e, z, f = frame_features(mono[:usable].reshape(-1, frame_len))
+                energy.append(e)
+                zcrs.append(z)
+                flatness.append(f)
+
+    duration_ms = int(round(total * 1000 / rate)) if rate else 0
+    if not energy:
+        return AudioAnalysis(duration_ms, rate, channels, None, None, 0, 1.0, 0.0, 0.0, -200.0, -200.0)
+
+    energy, zcrs, flatness = np.concatenate(energy), np.concatenate(zcrs), np.concatenate(flatness)
+    voiced, noise_floor = detect_speech(energy, zcrs)
+    speech = np.flatnonzero(voiced)
+    return AudioAnalysis(
+        duration_ms=duration_ms,
+        sample_rate=rate,
+        channels=channels,
+        speech_start_ms=int(speech[0] * FRAME_MS) if len(speech) else None,
+        speech_end_ms=int((speech[-1] + 1) * FRAME_MS) if len(speech) else None,
+        speech_ms=int(len(speech) * FRAME_MS),
+        silence_ratio=round(1.0 - len(speech) / len(voiced), 4),
+        clipping_ratio=round(clipped / total, 6),
+        spectral_flatness=round(float(np.mean(flatness[voiced] if len(speech) else flatness)), 4),
+        peak_dbfs=round(20.0 * np.log10(peak + 1e-10), 2),
+        noise_floor_dbfs=round(noise_floor, 2),
+    )
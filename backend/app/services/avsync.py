@@ -0,0 +1,175 @@
+import importlib.util
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+AUDIO_RATE = 16000
+MOUTH_SIZE = (32, 16)  # (w, h) the mouth region is resampled to before differencing
+# Offsets people do not notice are not penalised; beyond that the score decays
+SYNC_TOLERANCE_MS = 80.0
+SYNC_FALLOFF_MS = 200.0
+
+
+@dataclass
+class AVSyncResult:
+    """Measured lip sync of a clip; a positive offset means the audio lags the video"""
+    offset_ms: float
+    confidence: float
+    score: float
+    face_tracked: bool
+    frames: int
+    seconds: float
+    cpu_ms: float
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def mouth_box(face: Tuple[int, int, int, int], shape: Tuple[int, int]) -> Tuple[int, int, int, int]:
+    """Lower-middle part of a face box, where the mouth is; (x0, y0, x1, y1)"""
+    x, y, w, h = face
+    rows, cols = shape[:2]
+    return (
+        max(0, x + w // 4), max(0, y + h * 13 // 20),
+        min(cols, x + w * 3 // 4), min(rows, y + h * 19 // 20),
+    )
+
+
+def default_mouth_box(shape: Tuple[int, int]) -> Tuple[int, int, int, int]:
+    """Where the mouth usually is in a centred selfie video, if no face was found"""
+    rows, cols = shape[:2]
+    return cols * 3 // 8, rows * 9 // 16, cols * 5 // 8, rows * 3 // 4
+
+
+def pyav_available() -> bool:
+    """Whether PyAV (the optional `av` package) can be imported, without importing it"""
+    return importlib.util.find_spec("av") is not None
+
+
+def audio_envelope(samples: np.ndarray, frames: int, fps: float, rate: int = AUDIO_RATE) -> np.ndarray:
+    """RMS of the audio under each video frame (silence where the audio ran out)"""
+    if not len(samples) or not frames:
+        return np.zeros(frames)
+    starts = (np.arange(frames) * rate / fps).astype(np.int64)
+    # Every bin needs samples of its own: reduceat returns a single sample for repeated indices
+    needed = int(starts[-1]) + 1
+    if len(samples) < needed:
+        samples = np.pad(samples, (0, needed - len(samples)))
+    sums = np.add.reduceat(samples.astype(np.float64) ** 2, starts)
+    counts = np.diff(np.append(starts, len(samples)))
+    return np.sqrt(sums / np.maximum(counts, 1))
+
+
+def cross_correlate(a: np.ndarray, b: np.ndarray, max_lag: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Normalised cross-correlation of two equal-length series via FFT.
+
+    Returns (lags, corr) for lags in [-max_lag, max_lag]; corr[k] pairs a[t + k]
+    with b[t], and is about 1.0 for identical shapes.
+    """
+    n = len(a)
+    a = (a - a.mean()) / (a.std() + 1e-9)
+    b = (b - b.mean()) / (b.std() + 1e-9)
+    size = 1 << (2 * n - 1).bit_length()
+    corr = np.fft.irfft(np.fft.rfft(a, size) * np.conj(np.fft.rfft(b, size)), size) / n
+    lags = np.arange(-max_lag, max_lag + 1)
+    return lags, corr[lags]
+
+
+def score_av_sync(
+    video_path: Path,
+    face_cascade: Optional["cv2.CascadeClassifier"] = None,
+    max_seconds: float = 10.0,
+    cpu_budget_ms: float = 1500.0,
+    detect_every_s: float = 0.5,
+    max_offset_ms: float = 500.0,
+) -> Optional[AVSyncResult]:
+    """Estimate lip-sync offset and confidence of a clip.
+
+    Audio and video are demuxed and decoded together in one pass with PyAV.
+    Per frame, motion energy of the mouth region (found by face detection
+    every `detect_every_s`) is compared with the change in audio loudness;
+    their FFT cross-correlation peak gives the offset. Decoding stops after
+    `max_seconds` of video or `cpu_budget_ms` of CPU time, whichever comes
+    first. Returns None when PyAV is not installed, the clip has no audio
+    track or it is too short to judge.
+    """
+    try:
+        import av
+    except ImportError:
+        return None
+
+    started = time.process_time()
+    motion, audio = [], []
+    face_tracked = False
+    audio_start = video_start = None
+    with av.open(str(video_path)) as container:
+        if not container.streams.audio or not container.streams.video:
+            return None
+        video, sound = container.streams.video[0], container.streams.audio[0]
+        fps = float(video.average_rate or 0)
+        if not fps or fps > 240:
+            fps = 30.0
+        detect_every = max(1, int(round(fps * detect_every_s)))
+        width = min(320, video.codec_context.width or 320)
+        height = max(1, (video.codec_context.height or 240) * width // (video.codec_context.width or 320))
+        resampler = av.AudioResampler(format="flt", layout="mono", rate=AUDIO_RATE)
+
+        box, previous = None, None
+        for frame in container.decode(video, sound):
+            if isinstance(frame, av.AudioFrame):
+                if audio_start is None:
+                    audio_start = frame.time or 0.0
+                audio.extend(f.to_ndarray().reshape(-1) for f in resampler.resample(frame))
+                continue
+            if len(motion) >= max_seconds * fps or (time.process_time() - started) * 1000.0 > cpu_budget_ms:
+                break
+            if video_start is None:
+                video_start = frame.time or 0.0
+
+            # Scaling and grayscale conversion happen in swscale, on the decoder's planes
+            gray = frame.reformat(width=width, height=height, format="gray").to_ndarray()
+            if face_cascade is not None and len(motion) % detect_every == 0:
+                faces = face_cascade.detectMultiScale(gray, 1.2, 5)
+                if len(faces):
+                    box = mouth_box(max(faces, key=lambda f: f[2] * f[3]), gray.shape)
+                    face_tracked = True
+            x0, y0, x1, y1 = box or default_mouth_box(gray.shape)
+            roi = cv2.resize(gray[y0:y1, x0:x1], MOUTH_SIZE, interpolation=cv2.INTER_AREA).astype(np.float32)
+            motion.append(float(np.mean(np.abs(roi - previous))) if previous is not None else 0.0)
+            previous = roi
+
+    frames = len(motion)
+    max_lag = int(max_offset_ms / 1000.0 * fps)
+    if frames < max(2 * fps, 4 * max_lag) or not audio:
+        return None
+
+    # Line the audio up with the first video frame
+    samples = np.concatenate(audio)
+    shift = int(round((audio_start - video_start) * AUDIO_RATE))
+    samples = np.concatenate([np.zeros(shift, np.float32), samples]) if shift > 0 else samples[-shift:]
+
+    # Mouth motion follows changes in loudness, not loudness itself
+    envelope = audio_envelope(samples, frames, fps)
+    onsets = np.abs(np.diff(envelope, prepend=envelope[0]))
+    motion = np.asarray(motion)
+    if onsets.std() < 1e-6 or motion.std() < 1e-6:
+        return None
+
+    lags, corr = cross_correlate(onsets, motion, max_lag)
+    best = int(np.argmax(corr))
+    offset_ms = float(lags[best] * 1000.0 / fps)
+    confidence = float(np.clip(corr[best], 0.0, 1.0))
+    excess = max(0.0, abs(offset_ms) - SYNC_TOLERANCE_MS)
+    return AVSyncResult(
+        offset_ms=round(offset_ms, 1),
+        confidence=round(confidence, 4),
+        score=round(confidence * float(np.exp(-(excess / SYNC_FALLOFF_MS) ** 2)), 4),
+        face_tracked=face_tracked,
+        frames=frames,
+        seconds=round(frames / fps, 3),
+        cpu_ms=round((time.process_time() - started) * 1000.0, 1),
+    )
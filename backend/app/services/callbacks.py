@@ -0,0 +1,70 @@
+import asyncio
+import random
+from functools import lru_cache
+from typing import Optional
+
+import httpx
+from loguru import logger
+
+from ..config import get_settings
+
+
+class CallbackClient:
+    """Delivers webhook notifications over a shared, pooled httpx client.
+
+    Network errors, 429s and 5xx responses are retried with exponential
+    backoff and jitter; other 4xx responses are treated as final.
+    """
+
+    def __init__(self, timeout: float = 10.0, max_retries: int = 5, backoff_base: float = 0.5, max_connections: int = 20):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_connections = max_connections
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+        return self._client
+
+    async def deliver(self, url: str, payload: dict) -> bool:
+        """POST `payload` to `url`, returning whether it was accepted"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self.client.post(url, json=payload)
+                if response.status_code < 400:
+                    return True
+                if response.status_code != 429 and response.status_code < 500:
+                    logger.warning(f"Callback to {url} rejected with {response.status_code}")
+                    return False
+                logger.warning(f"Callback to {url} failed with {response.status_code} (attempt {attempt + 1})")
+            except httpx.HTTPError as e:
+                logger.warning(f"Callback to {url} errored: {e!r} (attempt {attempt + 1})")
+
+            if attempt < self.max_retries:
+                delay = self.backoff_base * (2 ** attempt)
+                await asyncio.sleep(delay + random.uniform(0, delay))
+        return False
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+@lru_cache()
+def get_callback_client() -> CallbackClient:
+    settings = get_settings()
+    return CallbackClient(
+        timeout=settings.CALLBACK_TIMEOUT,
+        max_retries=settings.CALLBACK_MAX_RETRIES,
+        backoff_base=settings.CALLBACK_BACKOFF_BASE,
+    )
@@ -0,0 +1,118 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+
+from ..config import get_settings
+from .metrics import StageTimings, current_timings, record_stage
+
+# Per-worker state, populated once by the pool initializer
+_worker_artifacts = None
+
+
+def _init_worker(media_root: str):
+    """Warm up a pool worker: import cv2, pin its threads and load the face detector"""
+    global _worker_artifacts
+    import cv2
+    from .artifact import ArtifactService
+
+    # One process per core already; keep OpenCV from oversubscribing
+    cv2.setNumThreads(1)
+    _worker_artifacts = ArtifactService(Path(media_root))
+    _worker_artifacts.face_cascade
+
+
+def _run_artifact_method(method: str, args: tuple, kwargs: dict) -> Tuple[Any, List[Tuple[str, float]], float]:
+    """Run the method, returning its result, the stage spans it recorded and its run time"""
+    timings = StageTimings()
+    current_timings.set(timings)
+    started = time.perf_counter()
+    result = getattr(_worker_artifacts, method)(*args, **kwargs)
+    return result, timings.items(), time.perf_counter() - started
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+class ExecutorBusy(RuntimeError):
+    """Raised when the media queue stays full past the configured timeout"""
+
+
+class MediaExecutor:
+    """Runs CPU-bound ArtifactService calls on a process pool.
+
+    A semaphore bounds the number of queued plus running jobs so callers get
+    backpressure instead of an unbounded backlog inside the pool.
+    """
+
+    def __init__(self, media_root: Path, workers: int = 0, queue_depth: int = 64, queue_timeout: float = 5.0):
+        self.media_root = media_root
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_depth = queue_depth
+        self.queue_timeout = queue_timeout
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.pending = 0
+
+    def start(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(str(self.media_root),),
+            )
+            self._slots = asyncio.Semaphore(self.queue_depth)
+
+    async def warm_up(self) -> int:
+        """Start the workers (running their initializers) ahead of the first job;
+        returns how many distinct workers answered"""
+        self.start()
+        loop = asyncio.get_running_loop()
+        pids = await asyncio.gather(*(loop.run_in_executor(self._pool, _ping) for _ in range(self.workers)))
+        return len(set(pids))
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+            self._slots = None
+
+    async def run(self, method: str, *args, **kwargs) -> Any:
+        """Run `ArtifactService.<method>(*args, **kwargs)` in a pool worker"""
+        self.start()
+        queued = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            record_stage("media_queue", time.perf_counter() - queued)
+            raise ExecutorBusy(f"Media queue full ({self.queue_depth} jobs)")
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result, stages, ran = await loop.run_in_executor(self._pool, _run_artifact_method, method, args, kwargs)
+        finally:
+            self.pending -= 1
+            self._slots.release()
+
+        # Spans recorded in the worker process are replayed here, where they are
+        # exported; whatever the worker did not spend running counts as queueing
+        for stage, seconds in stages:
+            record_stage(stage, seconds)
+        record_stage("media_queue", max(0.0, time.perf_counter() - queued - ran))
+        return result
+
+
+@lru_cache()
+def get_media_executor() -> MediaExecutor:
+    settings = get_settings()
+    return MediaExecutor(
+        Path(settings.MEDIA_ROOT),
+        workers=settings.MEDIA_WORKERS,
+        queue_depth=settings.MEDIA_QUEUE_DEPTH,
+        queue_timeout=settings.MEDIA_QUEUE_TIMEOUT,
+    )
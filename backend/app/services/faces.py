@@ -0,0 +1,89 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from .artifact import exposure_score, sharpness_score, to_gray_small
+
+Box = Tuple[int, int, int, int]
+
+# Detection widths, coarse to fine: a selfie-sized face is found on the first
+# level; the larger copy is only searched when it finds nothing
+DETECT_WIDTHS = (320, 640)
+# Side the face region is scaled to before its quality is measured, so
+# candidates from differently sized images compare fairly
+QUALITY_SIDE = 128
+# A face this wide (in source pixels) or wider counts as full resolution
+GOOD_FACE_WIDTH = 160
+SHARPNESS_CEILING = 150.0
+
+
+@dataclass
+class FaceCandidate:
+    """The most prominent face in one image, with its quality measurements"""
+    source: str
+    frame: np.ndarray
+    box: Box
+    face_count: int
+    metrics: Dict[str, float] = field(default_factory=dict)
+    score: float = 0.0
+
+
+class FaceDetector:
+    """Haar face detector run coarse to fine on downscaled grayscale copies.
+
+    The cascade is loaded once by its owner (once per pool worker). Boxes are
+    scaled back to the full-size frame.
+    """
+
+    def __init__(self, cascade: "cv2.CascadeClassifier", widths: Sequence[int] = DETECT_WIDTHS,
+                 scale_factor: float = 1.2, min_neighbors: int = 5):
+        self.cascade = cascade
+        self.widths = tuple(widths)
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+
+    def detect(self, frame: np.ndarray) -> List[Box]:
+        """Face boxes (x, y, w, h) in full-frame pixels, largest first"""
+        width = frame.shape[1]
+        for level in self.widths:
+            gray = to_gray_small(frame, level)
+            faces = self.cascade.detectMultiScale(gray, self.scale_factor, self.min_neighbors)
+            if len(faces):
+                scale = width / gray.shape[1]
+                boxes = [tuple(int(round(v * scale)) for v in face) for face in faces]
+                return sorted(boxes, key=lambda b: b[2] * b[3], reverse=True)
+            if level >= width:
+                # Already searched at full resolution
+                break
+        return []
+
+
+def score_face(source: str, frame: np.ndarray, box: Box, face_count: int) -> FaceCandidate:
+    """Rate a face for matching: sharp, well exposed, large and alone in the frame"""
+    x, y, w, h = box
+    face = cv2.cvtColor(frame[y:y + h, x:x + w], cv2.COLOR_BGR2GRAY)
+    face = cv2.resize(face, (QUALITY_SIDE, QUALITY_SIDE), interpolation=cv2.INTER_AREA)
+    sharpness = sharpness_score(face)
+    exposure = exposure_score(face)
+    size = min(1.0, w / GOOD_FACE_WIDTH)
+    score = min(1.0, sharpness / SHARPNESS_CEILING) * exposure * size * (1.0 if face_count == 1 else 0.5)
+    return FaceCandidate(
+        source=source, frame=frame, box=box, face_count=face_count, score=score,
+        metrics={
+            "face_score": score,
+            "face_sharpness": sharpness,
+            "face_exposure": exposure,
+            "face_width": float(w),
+            "face_count": float(face_count),
+        },
+    )
+
+
+def crop_face(frame: np.ndarray, box: Box, margin: float = 0.4) -> np.ndarray:
+    """The face plus `margin` (a fraction of its size) on each side, clamped to the frame"""
+    x, y, w, h = box
+    dx, dy = int(w * margin), int(h * margin)
+    frame_h, frame_w = frame.shape[:2]
+    return frame[max(0, y - dy):min(frame_h, y + h + dy), max(0, x - dx):min(frame_w, x + w + dx)]
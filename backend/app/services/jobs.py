@@ -0,0 +1,244 @@
+import asyncio
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import List, Optional
+
+from loguru import logger
+from sqlalchemy import or_, select, update, func
+
+from ..config import get_settings
+from ..db import async_session
+from ..models.session import Session
+from ..models.verification_job import VerificationJob
+from ..queries import get_session_result
+from .callbacks import CallbackClient, get_callback_client
+from .llm import transient_errors
+from .resilience import CircuitOpen, RateLimited
+from .verification import SessionNotReady, VerificationInProgress, get_verification_service, stored_verdict
+
+
+class QueueFull(RuntimeError):
+    """Raised when the number of queued verification jobs hits the configured depth"""
+
+
+class JobQueue:
+    """Background verification workers draining a DB-backed job table.
+
+    Jobs are claimed with a conditional UPDATE (queued -> running), so several
+    uvicorn processes can share the same table without running a job twice.
+    Workers are woken immediately on enqueue and otherwise poll. Jobs left
+    running by a process that died are put back on the queue periodically.
+    A busy session or an unavailable provider requeues the job with backoff;
+    it fails for good after `max_attempts` runs.
+    """
+
+    def __init__(self, callback_client: CallbackClient, default_callback_url: Optional[str], workers: int = 4,
+                 max_queued: int = 1000, poll_interval: float = 1.0, stale_after: float = 900.0,
+                 max_attempts: int = 5, retry_backoff: float = 10.0):
+        self.callback_client = callback_client
+        self.default_callback_url = default_callback_url
+        self.workers = workers
+        self.max_queued = max_queued
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        self.running = 0
+
+    async def start(self):
+        if self._tasks:
+            return
+        await self.requeue_stale()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._reaper()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def requeue_stale(self) -> int:
+        """Put jobs left running by a crashed process back on the queue"""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_after)
+        async with async_session() as db:
+            requeued = await db.execute(
+                update(VerificationJob)
+                .where(VerificationJob.status == "running", VerificationJob.updated_at < cutoff)
+                .values(status="queued")
+            )
+            await db.commit()
+        return requeued.rowcount
+
+    async def _reaper(self):
+        # Other processes may die while this one keeps running, so not only at startup
+        while True:
+            await asyncio.sleep(self.stale_after / 2)
+            try:
+                if await self.requeue_stale():
+                    self._wakeup.set()
+            except Exception:
+                logger.exception("Requeueing stale verification jobs failed")
+
+    async def queued_count(self, db) -> int:
+        result = await db.execute(
+            select(func.count()).select_from(VerificationJob).where(VerificationJob.status == "queued")
+        )
+        return result.scalar_one()
+
+    async def enqueue(self, db, session: Session, expected_phrase: str = "") -> VerificationJob:
+        """Queue a verification for `session`, reusing an already pending job"""
+        result = await db.execute(
+            select(VerificationJob)
+            .where(VerificationJob.session_id == session.id)
+            .where(VerificationJob.status.in_(["queued", "running"]))
+        )
+        job = result.scalars().first()
+        if job:
+            return job
+
+        if await self.queued_count(db) >= self.max_queued:
+            raise QueueFull(f"Verification queue full ({self.max_queued} jobs)")
+
+        job = VerificationJob(
+            session_id=session.id,
+            status="queued",
+            expected_phrase=expected_phrase,
+            attempts=0,
+            callback_url=session.callback_url or self.default_callback_url,
+        )
+        db.add(job)
+        await db.commit()
+        self._wakeup.set()
+        return job
+
+    async def _claim(self, db) -> Optional[int]:
+        result = await db.execute(
+            select(VerificationJob.id)
+            .where(VerificationJob.status == "queued")
+            .where(or_(VerificationJob.not_before.is_(None), VerificationJob.not_before <= datetime.utcnow()))
+            .order_by(VerificationJob.id)
+            .limit(1)
+        )
+        job_id = result.scalar()
+        if job_id is None:
+            return None
+        claimed = await db.execute(
+            update(VerificationJob)
+            .where(VerificationJob.id == job_id, VerificationJob.status == "queued")
+            .values(status="running", attempts=VerificationJob.attempts + 1)
+        )
+        await db.commit()
+        return job_id if claimed.rowcount == 1 else None
+
+    async def _worker(self, index: int):
+        while True:
+            try:
+                async with async_session() as db:
+                    job_id = await self._claim(db)
+                if job_id is None:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                self.running += 1
+                try:
+                    await self._run(job_id)
+                finally:
+                    self.running -= 1
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(f"Verification worker {index} crashed; restarting loop")
+                await asyncio.sleep(self.poll_interval)
+
+    async def _run(self, job_id: int):
+        async with async_session() as db:
+            job = await db.get(VerificationJob, job_id)
+            if job.attempts > self.max_attempts:
+                # Requeued as stale (or retried) more often than allowed
+                job.status = "failed"
+                job.error = f"Gave up after {self.max_attempts} attempts" + (f": {job.error}" if job.error else "")
+            else:
+                try:
+                    try:
+                        result = await get_verification_service().verify(
+                            db, str(job.session_id), job.expected_phrase or ""
+                        )
+                    except SessionNotReady:
+                        # A synchronous verify took the session after this job was queued
+                        result = await self.finished_result(db, str(job.session_id))
+                        if result is None:
+                            raise
+                    job.status = "succeeded"
+                    job.result = result.model_dump()
+                    job.error = None
+                except Exception as e:
+                    if retryable(e) and job.attempts < self.max_attempts:
+                        delay = self.retry_backoff * 2 ** (job.attempts - 1)
+                        logger.warning(f"Verification job {job_id} hit {e!r}; retrying in {delay:.0f}s")
+                        job.status = "queued"
+                        job.error = str(e)
+                        job.not_before = datetime.utcnow() + timedelta(seconds=delay)
+                        await db.commit()
+                        return
+                    logger.exception(f"Verification job {job_id} failed")
+                    job.status = "failed"
+                    job.error = str(e)
+            job.callback_status = "pending" if job.callback_url else "skipped"
+            await db.commit()
+
+            if job.callback_url:
+                delivered = await self.callback_client.deliver(job.callback_url, job_payload(job))
+                job.callback_status = "delivered" if delivered else "failed"
+                await db.commit()
+
+    async def finished_result(self, db, session_id: str):
+        """The verdict of a session that has already been verified, if it has"""
+        session = await db.get(Session, session_id)
+        if session is None or session.status not in ("verified", "rejected"):
+            return None
+        row = await get_session_result(db, session_id)
+        return stored_verdict(row) if row is not None else None
+
+
+def retryable(error: Exception) -> bool:
+    """Errors that mean "not now" (a busy session, an unavailable provider)"""
+    if isinstance(error, (VerificationInProgress, CircuitOpen, RateLimited, asyncio.TimeoutError)):
+        return True
+    try:
+        return isinstance(error, transient_errors())
+    except ImportError:
+        # No provider SDK, so no provider errors either
+        return False
+
+
+def job_payload(job: VerificationJob) -> dict:
+    return {
+        "job_id": job.id,
+        "session_id": job.session_id,
+        "status": job.status,
+        "attempts": job.attempts,
+        "result": job.result,
+        "error": job.error,
+        "callback_status": job.callback_status,
+    }
+
+
+@lru_cache()
+def get_job_queue() -> JobQueue:
+    settings = get_settings()
+    return JobQueue(
+        get_callback_client(),
+        settings.DEFAULT_CALLBACK_URL,
+        workers=settings.VERIFY_WORKERS,
+        max_queued=settings.VERIFY_QUEUE_DEPTH,
+        poll_interval=settings.VERIFY_POLL_INTERVAL,
+        stale_after=settings.VERIFY_JOB_STALE_SECONDS,
+        max_attempts=settings.VERIFY_JOB_MAX_ATTEMPTS,
+        retry_backoff=settings.VERIFY_JOB_RETRY_BACKOFF,
+    )
@@ -1,83 +1,340 @@
-import google.generativeai as genai
-from google.generativeai.types import GenerationConfig
+import asyncio
+import hashlib
 import json
+import random
+import time
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List
-from PIL import Image
-from io import BytesIO
-import base64
+from typing import Dict, List, Optional
+from loguru import logger
 
 from ..schemas import VerificationResult
 from ..config import get_settings
+from .artifact import MediaArtifact
+from .payload import payload_report
+from .llm_cache import LLMResultCache, get_llm_cache
+from .metrics import span, LLM_IMAGE_TOKENS, LLM_REQUEST_BYTES, LLM_REQUESTS, LLM_TOKENS
+from .resilience import TokenBucket, CircuitBreaker, CircuitOpen, RateLimited
+
+
+class LLMNotConfigured(RuntimeError):
+    """Raised when a model call is attempted without LLM_API_KEY / LLM_MODEL"""
+
+
+@lru_cache()
+def transient_errors() -> tuple:
+    """Provider errors worth retrying; anything else is returned to the caller as-is"""
+    # google.api_core pulls in grpc: only import it once a call has been made
+    from google.api_core import exceptions as google_exceptions
+    return (
+        asyncio.TimeoutError,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.TooManyRequests,
+        google_exceptions.ResourceExhausted,
+        google_exceptions.InternalServerError,
+        google_exceptions.DeadlineExceeded,
+    )
 
 class LLMService:
-    def __init__(self):
+    def __init__(self, cache: Optional[LLMResultCache] = None):
         settings = get_settings()
         self.api_key = settings.LLM_API_KEY
         self.model = settings.LLM_MODEL
-        genai.configure(api_key=self.api_key)
+        self.cache = cache
+        
+        # One shared client, guarded by a concurrency cap, rate limiter and breaker;
+        # built on first use (or at warm-up) since the SDK is slow to import
+        self.client = None
+        self.generation_config = {"max_output_tokens": 1000, "temperature": 0.1}
+        self.max_concurrency = settings.LLM_MAX_CONCURRENCY
+        self._slots = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+        self.in_flight = 0
+        self.rate_limiter = TokenBucket(settings.LLM_RATE_PER_MINUTE / 60.0, settings.LLM_RATE_BURST)
+        self.breaker = CircuitBreaker(settings.LLM_BREAKER_FAILURES, settings.LLM_BREAKER_RESET_SECONDS)
+        self.call_timeout = settings.LLM_CALL_TIMEOUT
+        self.deadline = settings.LLM_DEADLINE
+        self.max_retries = settings.LLM_MAX_RETRIES
+        self.retry_backoff = settings.LLM_RETRY_BACKOFF
+        self.hedge_after = settings.LLM_HEDGE_AFTER
+        self.counters = {"calls": 0, "retries": 0, "timeouts": 0, "hedges": 0, "hedge_wins": 0, "rejected": 0}
         
         # Load prompt templates
-        prompts_dir = Path(__file__).parent.parent / "config" / "prompts"
-        with open(prompts_dir / "system.txt") as f:
+        self.prompts_dir = Path(__file__).parent.parent / "config" / "prompts"
+        self._prompt_mtimes = None
+        self.prompt_version = None
+        self._load_prompts()
+
+    def open_client(self):
+        """Import the Gemini SDK and build the shared model client, once"""
+        if self.client is None:
+            if not self.api_key or not self.model:
+                raise LLMNotConfigured("LLM_API_KEY and LLM_MODEL must be set")
+            started = time.perf_counter()
+            import google.generativeai as genai
+            genai.configure(api_key=self.api_key)
+            self.client = genai.GenerativeModel(self.model)
+            logger.info(f"Gemini client for {self.model} ready in {(time.perf_counter() - started) * 1000:.0f} ms")
+        return self.client
+
+    def _load_prompts(self) -> bool:
+        """(Re)load the prompt templates if they changed on disk; returns True on reload"""
+        paths = (self.prompts_dir / "system.txt", self.prompts_dir / "user_template.md")
+        mtimes = tuple(p.stat().st_mtime_ns for p in paths)
+        if mtimes == self._prompt_mtimes:
+            return False
+        with open(paths[0]) as f:
             self.system_prompt = f.read()
-        with open(prompts_dir / "user_template.md") as f:
+        with open(paths[1]) as f:
             self.user_template = f.read()
+        self._prompt_mtimes = mtimes
+        self.prompt_version = hashlib.sha256(
+            (self.system_prompt + "\0" + self.user_template).encode()
+        ).hexdigest()[:16]
+        return True
+
+    def cache_key(self, images: Dict[str, MediaArtifact], transcript: str, expected_phrase: str, timings: Dict,
+                  audio: Optional[Dict] = None) -> str:
+        """Content hash of everything that determines the LLM's answer"""
+        h = hashlib.sha256()
+        for part in (self.model, self.prompt_version, expected_phrase, transcript,
+                     json.dumps(timings, sort_keys=True, default=str),
+                     json.dumps(audio, sort_keys=True, default=str)):
+            h.update(part.encode())
+            h.update(b"\0")
+        for kind, image in images.items():
+            h.update(f"{kind}:{image.mime_type}:".encode())
+            h.update(hashlib.sha256(image.data).digest())
+        return h.hexdigest()
+
+    async def _call_model(self, prompt_parts: List):
+        """Single provider call under the concurrency cap and per-call timeout"""
+        async with self._slots:
+            self.in_flight += 1
+            try:
+                self.counters["calls"] += 1
+                return await asyncio.wait_for(
+                    self.open_client().generate_content_async(prompt_parts, generation_config=self.generation_config),
+                    timeout=self.call_timeout,
+                )
+            except asyncio.TimeoutError:
+                self.counters["timeouts"] += 1
+                raise
+            finally:
+                self.in_flight -= 1
+
+    async def _hedged_call(self, prompt_parts: List):
+        """Call the model, firing a second identical request if the first is slow"""
+        primary = asyncio.ensure_future(self._call_model(prompt_parts))
+        if not self.hedge_after:
+            return await primary
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_after)
+        # Only hedge when it fits in the rate budget right now
+        if done or not self.rate_limiter.try_acquire():
+            return await primary
+
+        self.counters["hedges"] += 1
+        hedge = asyncio.ensure_future(self._call_model(prompt_parts))
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.counters["hedge_wins"] += 1
+                        return task.result()
+            # Both failed: surface the primary's error
+            return primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def generate(self, prompt_parts: List):
+        """Rate-limited, retried and circuit-broken model call.
+
+        The breaker sees one outcome per call, however many attempts it took:
+        success, or a failure once the retries for transient errors run out.
+        Other errors (bad request, auth, config) say nothing about the
+        provider's health and leave it as it was.
+        """
+        started = time.monotonic()
+        try:
+            trial = self.breaker.before_call()
+        except CircuitOpen:
+            self.counters["rejected"] += 1
+            raise
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    # Waiting for a token counts against the deadline too
+                    await self.rate_limiter.acquire(timeout=max(0.0, self.deadline - (time.monotonic() - started)))
+                    response = await self._hedged_call(prompt_parts)
+                except transient_errors() as e:
+                    delay = self.retry_backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+                    out_of_time = time.monotonic() - started + delay + self.call_timeout > self.deadline
+                    if attempt == self.max_retries or out_of_time:
+                        self.breaker.record_failure()
+                        raise
+                    logger.warning(f"Transient LLM error ({e!r}); retrying in {delay:.2f}s")
+                    self.counters["retries"] += 1
+                    await asyncio.sleep(delay)
+                    continue
+                self.breaker.record_success()
+                return response
+        except RateLimited:
+            # Not the provider's fault: leave the breaker as it was
+            if trial:
+                self.breaker.abandon_trial()
+            self.counters["rejected"] += 1
+            raise
+        except BaseException:
+            # No verdict on the provider (or cancelled mid-call): free the trial slot
+            if trial:
+                self.breaker.abandon_trial()
+            raise
+
+    def render_user_prompt(self, kinds: List[str], transcript: str, expected_phrase: str, timings: Dict,
+                           audio: Optional[Dict] = None) -> str:
+        """Fill the user template; unknown timings are spelled out rather than guessed"""
+        def attached(prefixes) -> str:
+            names = [f"image {i} ({kind})" for i, kind in enumerate(kinds, 1) if kind.startswith(prefixes)]
+            return ", ".join(names) or "none"
+
+        def ms(key) -> str:
+            value = timings.get(key)
+            if value is None:
+                return "not measured"
+            if isinstance(value, (list, tuple)):
+                return ", ".join(f"{v} ms" for v in value) or "none"
+            return f"{value} ms"
+
+        return self.user_template.format(
+            doc_images=attached(("doc_",)),
+            selfie_images=attached(("selfie",)),
+            keyframes=attached(("keyframe",)),
+            expected_phrase=expected_phrase or "(none)",
+            transcript=transcript or "(not available)",
+            audio_analysis=json.dumps(audio, indent=2) if audio else "(no phrase recording)",
+            prompt_time=ms("prompt_shown_ms"),
+            speech_start=ms("speech_start_ms"),
+            speech_end=ms("speech_end_ms"),
+            head_turn_left=ms("head_turn_left_ms"),
+            head_turn_right=ms("head_turn_right_ms"),
+            blink_times=ms("blink_times_ms"),
+        )
+
+    def snapshot(self) -> dict:
+        return {
+            "model": self.model,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "rate_limiter": self.rate_limiter.snapshot(),
+            "circuit_breaker": self.breaker.snapshot(),
+            "call_timeout": self.call_timeout,
+            "deadline": self.deadline,
+            "hedge_after": self.hedge_after,
+            **self.counters,
+        }
 
     async def verify_session(
         self,
         session_id: str,
-        images: Dict[str, Path],
+        images: Dict[str, MediaArtifact],
         transcript: str,
         expected_phrase: str,
-        timings: Dict
+        timings: Dict,
+        audio: Optional[Dict] = None
     ) -> VerificationResult:
-        # Prepare the images
-        image_parts = []
-        for kind, path in images.items():
-            with open(path, "rb") as f:
-                content = f.read()
-                image = Image.open(BytesIO(content))
-                image_parts.append(image)
-
-        # Format the user prompt with context
-        user_prompt = self.user_template.format(
-            session_id=session_id,
-            transcript=transcript,
-            expected_phrase=expected_phrase,
-            timings=json.dumps(timings, indent=2)
-        )
+        # Pick up edited prompt templates; results from the old version are stale
+        if self._load_prompts() and self.cache is not None:
+            await self.cache.invalidate_prompt_versions(self.prompt_version)
+
+        images = {kind: image for kind, image in images.items() if image is not None}
+        cache_key = None
+        if self.cache is not None:
+            with span("llm_cache_lookup"):
+                cache_key = self.cache_key(images, transcript, expected_phrase, timings, audio)
+                cached = await self.cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"LLM cache hit for session {session_id}")
+                LLM_REQUESTS.inc(1, "cache_hit")
+                return VerificationResult(**cached)
+
+        with span("payload_build"):
+            # Prepare the images: already-encoded bytes go straight into the request
+            image_parts = [
+                {"mime_type": image.mime_type, "data": image.data}
+                for image in images.values()
+            ]
+            report = payload_report(images.values())
+            logger.info(
+                f"LLM payload for session {session_id}: {report['images']} images, "
+                f"{report['payload_bytes']} bytes ({report['bytes_saved']} saved), "
+                f"~{report['payload_tokens']} image tokens ({report['tokens_saved']} saved)"
+            )
 
-        # Construct the full prompt
-        prompt_parts = [self.system_prompt, user_prompt, *image_parts]
+            # Format the user prompt with context; images are numbered in the order they are attached
+            user_prompt = self.render_user_prompt(list(images), transcript, expected_phrase, timings, audio)
+
+            # Construct the full prompt
+            prompt_parts = [self.system_prompt, user_prompt, *image_parts]
+        LLM_REQUEST_BYTES.inc(report["payload_bytes"])
+        LLM_IMAGE_TOKENS.inc(report["payload_tokens"])
 
         # Make API call
-        model = genai.GenerativeModel(self.model)
-        generation_config = GenerationConfig(
-            max_output_tokens=1000,
-            temperature=0.1,
-        )
-        response = await model.generate_content_async(
-            prompt_parts,
-            generation_config=generation_config
-        )
-        
-        # The response text may be enclosed in ```json ... ```, so we need to extract it.
-        response_text = response.text
-        if response_text.strip().startswith("```json"):
-            response_text = response_text.strip()[7:-3]
+        try:
+            with span("llm_call"):
+                response = await self.generate(prompt_parts)
+        except (CircuitOpen, RateLimited):
+            LLM_REQUESTS.inc(1, "rejected")
+            raise
+        except Exception:
+            LLM_REQUESTS.inc(1, "error")
+            raise
+        self._count_tokens(response)
 
-        # Parse LLM response
-        verification_data = json.loads(response_text)
-        
-        # Convert to VerificationResult
-        return VerificationResult(
-            status=verification_data["overall"]["status"],
-            score=verification_data["overall"]["score"],
-            ocr_data=verification_data["ocr"],
-            face_match_score=verification_data["face_match"],
-            liveness_score=verification_data["liveness_active"]["score"],
-            av_sync_score=verification_data["av_sync"],
-            audio_spoof_score=verification_data["audio_spoof_guess"],
-            explanations=verification_data["explanations"]
-        )
+        with span("llm_parse"):
+            # The response text may be enclosed in ```json ... ```, so we need to extract it.
+            response_text = response.text
+            if response_text.strip().startswith("```json"):
+                response_text = response_text.strip()[7:-3]
+
+            try:
+                # Parse LLM response
+                verification_data = json.loads(response_text)
+
+                # Convert to VerificationResult
+                result = VerificationResult(
+                    status=verification_data["overall"]["status"],
+                    score=verification_data["overall"]["score"],
+                    ocr_data=verification_data["ocr"],
+                    face_match_score=verification_data["face_match"],
+                    liveness_score=verification_data["liveness_active"]["score"],
+                    av_sync_score=verification_data["av_sync"],
+                    audio_spoof_score=verification_data["audio_spoof_guess"],
+                    explanations=verification_data["explanations"]
+                )
+            except Exception:
+                LLM_REQUESTS.inc(1, "invalid_response")
+                raise
+        LLM_REQUESTS.inc(1, "ok")
+
+        if self.cache is not None:
+            await self.cache.set(cache_key, result.model_dump(), self.prompt_version)
+        return result
+
+    @staticmethod
+    def _count_tokens(response):
+        """Add the provider's reported token usage (when it sends any) to the metrics"""
+        usage = getattr(response, "usage_metadata", None)
+        if usage is None:
+            return
+        for kind, field in (("prompt", "prompt_token_count"), ("completion", "candidates_token_count")):
+            count = getattr(usage, field, 0) or 0
+            if count:
+                LLM_TOKENS.inc(count, kind)
+
+
+@lru_cache()
+def get_llm_service() -> LLMService:
+    return LLMService(cache=get_llm_cache())
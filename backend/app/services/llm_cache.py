@@ -0,0 +1,119 @@
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import select, delete
+from sqlalchemy.exc import IntegrityError
+
+from ..config import get_settings
+from ..db import async_session
+from ..models.llm_cache_entry import LLMCacheEntry
+
+
+class LLMResultCache:
+    """Two-tier cache of LLM verification results keyed by content hash.
+
+    An in-process LRU answers repeat requests without I/O; the persistent tier
+    (a table in the app database) survives restarts and is shared between
+    worker processes. Entries expire after `ttl_seconds` in both tiers.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self.stats: Dict[str, int] = {
+            "memory_hits": 0,
+            "persistent_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+        }
+
+    def _remember(self, key: str, value: dict, expires_at: float):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    async def get(self, key: str) -> Optional[dict]:
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.time():
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return value
+            del self._memory[key]
+
+        async with async_session() as db:
+            result = await db.execute(
+                select(LLMCacheEntry.value, LLMCacheEntry.expires_at)
+                .where(LLMCacheEntry.key == key, LLMCacheEntry.expires_at > datetime.utcnow())
+            )
+            row = result.first()
+        if row is None:
+            self.stats["misses"] += 1
+            return None
+
+        self.stats["persistent_hits"] += 1
+        expires_in = (row.expires_at - datetime.utcnow()).total_seconds()
+        self._remember(key, row.value, time.time() + expires_in)
+        return row.value
+
+    async def set(self, key: str, value: dict, prompt_version: str):
+        self._remember(key, value, time.time() + self.ttl_seconds)
+        self.stats["stores"] += 1
+
+        async with async_session() as db:
+            await db.execute(delete(LLMCacheEntry).where(LLMCacheEntry.key == key))
+            db.add(LLMCacheEntry(
+                key=key,
+                prompt_version=prompt_version,
+                value=value,
+                expires_at=datetime.utcnow() + timedelta(seconds=self.ttl_seconds),
+            ))
+            try:
+                await db.commit()
+            except IntegrityError:
+                # Another worker stored the same result first
+                await db.rollback()
+
+    async def invalidate_prompt_versions(self, current_version: str):
+        """Drop entries produced by any other prompt template version"""
+        self._memory.clear()
+        async with async_session() as db:
+            await db.execute(delete(LLMCacheEntry).where(LLMCacheEntry.prompt_version != current_version))
+            await db.commit()
+
+    async def purge_expired(self) -> int:
+        now = time.time()
+        for key in [k for k, (expires_at, _) in self._memory.items() if expires_at <= now]:
+            del self._memory[key]
+        async with async_session() as db:
+            result = await db.execute(delete(LLMCacheEntry).where(LLMCacheEntry.expires_at <= datetime.utcnow()))
+            await db.commit()
+        return result.rowcount
+
+    def snapshot(self) -> dict:
+        hits = self.stats["memory_hits"] + self.stats["persistent_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "memory_entries": len(self._memory),
+            "hit_ratio": hits / lookups if lookups else 0.0,
+        }
+
+
+@lru_cache()
+def get_llm_cache() -> Optional[LLMResultCache]:
+    settings = get_settings()
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    return LLMResultCache(
+        ttl_seconds=settings.RAW_TTL_HOURS * 3600,
+        max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+    )
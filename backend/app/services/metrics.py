@@ -0,0 +1,207 @@
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Latency buckets in seconds, from sub-millisecond stages up to slow LLM calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        super().__init__(name, help, labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, *labels: str):
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def set(self, value: float, *labels: str):
+        """Mirror a value kept elsewhere (read at scrape time)"""
+        self.values[labels] = value
+
+    def render(self) -> List[str]:
+        return self.header() + [
+            f"{self.name}{_labels(self.label_names, k)} {v}" for k, v in self.values.items()
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+
+class Histogram(Metric):
+    """Cumulative-bucket histogram; one observation is a bisect and two adds"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum]
+        self.series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, (counts, total) in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="%s"' % ("+Inf" if bound == float("inf") else repr(bound))
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)"""
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "ds_stage_seconds", "Time spent in each pipeline stage", ("stage",)))
+HTTP_SECONDS = REGISTRY.register(Histogram(
+    "ds_http_request_seconds", "HTTP request latency", ("method", "route", "status")))
+LLM_REQUEST_BYTES = REGISTRY.register(Counter(
+    "ds_llm_request_bytes_total", "Image bytes sent to the LLM"))
+LLM_IMAGE_TOKENS = REGISTRY.register(Counter(
+    "ds_llm_image_tokens_total", "Estimated image tokens sent to the LLM"))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "ds_llm_tokens_total", "Tokens reported by the LLM provider", ("type",)))
+LLM_REQUESTS = REGISTRY.register(Counter(
+    "ds_llm_requests_total", "LLM verification requests by outcome", ("outcome",)))
+THUMB_REQUESTS = REGISTRY.register(Counter(
+    "ds_thumbnail_requests_total", "Thumbnail requests by outcome: cached path, render found on disk, or rendered", ("outcome",)))
+
+# Read from the services when /metrics is scraped
+LLM_EVENTS = REGISTRY.register(Counter(
+    "ds_llm_events_total", "LLM client calls, retries, timeouts, hedges and rejections", ("event",)))
+LLM_IN_FLIGHT = REGISTRY.register(Gauge("ds_llm_in_flight", "LLM calls in flight"))
+LLM_MAX_CONCURRENCY = REGISTRY.register(Gauge("ds_llm_max_concurrency", "LLM concurrency cap"))
+MEDIA_PENDING = REGISTRY.register(Gauge("ds_media_jobs_pending", "Media pool jobs queued or running"))
+MEDIA_WORKERS = REGISTRY.register(Gauge("ds_media_workers", "Media pool worker processes"))
+MEDIA_QUEUE_DEPTH = REGISTRY.register(Gauge("ds_media_queue_depth", "Media pool queue capacity"))
+MEDIA_UTILIZATION = REGISTRY.register(Gauge("ds_media_utilization", "Fraction of media pool workers busy"))
+PREPROCESS_PENDING = REGISTRY.register(Gauge("ds_preprocess_pending", "Upload-time preprocessing tasks in flight"))
+JOBS = REGISTRY.register(Gauge("ds_verification_jobs", "Verification jobs by state", ("state",)))
+DB_POOL = REGISTRY.register(Gauge("ds_db_pool_connections", "Database pool connections by state", ("state",)))
+DB_POOL_SIZE = REGISTRY.register(Gauge("ds_db_pool_size", "Database pool size (before overflow)"))
+THUMB_CACHE_ENTRIES = REGISTRY.register(Gauge("ds_thumbnail_cache_entries", "Thumbnail render paths held in the LRU"))
+
+
+class StageTimings:
+    """Stage durations of one request, for its Server-Timing header"""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float):
+        # Stages that run several times (or concurrently) add up
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def items(self) -> List[Tuple[str, float]]:
+        return list(self.stages.items())
+
+    def header(self, total: Optional[float] = None) -> str:
+        parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages.items()]
+        if total is not None:
+            parts.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+
+# Set per request by the timing middleware (and per job in pool workers);
+# tasks started with asyncio.gather share their parent's collector
+current_timings: ContextVar[Optional[StageTimings]] = ContextVar("current_timings", default=None)
+
+
+def record_stage(stage: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, stage)
+    timings = current_timings.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+@contextmanager
+def span(stage: str):
+    """Time a block as a pipeline stage (histogram + the current request's Server-Timing)"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+
+class TimingMiddleware:
+    """ASGI middleware: collects stage spans per request, adds a Server-Timing
+    header and records request latency by route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        timings = StageTimings()
+        token = current_timings.set(timings)
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                header = timings.header(time.perf_counter() - started).encode()
+                message = {**message, "headers": [*message.get("headers", []), (b"server-timing", header)]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_timings.reset(token)
+            # The route template keeps label cardinality bounded (no session ids)
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_SECONDS.observe(time.perf_counter() - started, scope["method"], route, str(status[0]))
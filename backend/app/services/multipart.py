@@ -0,0 +1,126 @@
+from collections import deque
+from typing import AsyncIterator, Dict, Optional
+
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
+
+
+class MultipartError(ValueError):
+    """Raised for a malformed or truncated multipart/form-data body"""
+
+
+class MultipartPart:
+    """One part of a streamed multipart body; read it like an upload file"""
+
+    def __init__(self, reader: "MultipartReader", headers: Dict[bytes, bytes]):
+        self._reader = reader
+        self._buffer = bytearray()
+        self._ended = False
+        disposition, options = parse_options_header(headers.get(b"content-disposition", b""))
+        if disposition != b"form-data":
+            raise MultipartError("Part without a form-data Content-Disposition")
+        self.name = options.get(b"name", b"").decode("latin-1")
+        filename = options.get(b"filename")
+        self.filename: Optional[str] = filename.decode("latin-1") if filename is not None else None
+        content_type = headers.get(b"content-type")
+        self.content_type: Optional[str] = content_type.decode("latin-1") if content_type else None
+
+    async def read(self, size: int = -1) -> bytes:
+        """Up to `size` bytes of the part's body (all of it when negative); b"" at its end"""
+        while not self._ended and (size < 0 or len(self._buffer) < size):
+            event, data = await self._reader.next_event()
+            if event == "end":
+                self._ended = True
+            else:
+                self._buffer += data
+        if size < 0:
+            size = len(self._buffer)
+        chunk = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return chunk
+
+    async def drain(self):
+        while not self._ended:
+            await self.read(64 * 1024)
+        self._buffer.clear()
+
+
+class MultipartReader:
+    """Incremental multipart/form-data parser over a request body stream.
+
+    Parts are yielded as their headers arrive and their bodies are pulled
+    from the stream as they are read, so nothing is spooled to memory or
+    temp files. A part not read to the end is skipped.
+    """
+
+    def __init__(self, content_type: str, stream: AsyncIterator[bytes]):
+        media_type, options = parse_options_header(content_type)
+        if media_type != b"multipart/form-data" or not options.get(b"boundary"):
+            raise MultipartError("Expected a multipart/form-data body with a boundary")
+        self._stream = stream.__aiter__()
+        self._events = deque()
+        self._headers: Dict[bytes, bytes] = {}
+        self._field = self._value = b""
+        self._finished = self._exhausted = False
+        self._parser = MultipartParser(options[b"boundary"], {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": lambda: self._events.append(("end", b"")),
+            "on_end": self._on_end,
+        })
+
+    def _on_part_begin(self):
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._field.lower()] = self._value
+        self._field = self._value = b""
+
+    def _on_headers_finished(self):
+        self._events.append(("headers", self._headers))
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        self._events.append(("data", bytes(data[start:end])))
+
+    def _on_end(self):
+        self._finished = True
+
+    async def next_event(self):
+        """The next parser event, feeding it more of the body as needed"""
+        while not self._events:
+            if self._exhausted:
+                raise MultipartError("Multipart body ended before its closing boundary")
+            try:
+                chunk = await self._stream.__anext__()
+            except StopAsyncIteration:
+                self._exhausted = True
+                if self._finished:
+                    return None
+                continue
+            try:
+                self._parser.write(chunk)
+            except MultipartParseError as e:
+                raise MultipartError(f"Malformed multipart body: {e}") from e
+        return self._events.popleft()
+
+    async def __aiter__(self) -> AsyncIterator[MultipartPart]:
+        while True:
+            event = await self.next_event()
+            if event is None:
+                return
+            kind, headers = event
+            if kind != "headers":
+                raise MultipartError(f"Unexpected multipart {kind} event")
+            part = MultipartPart(self, headers)
+            yield part
+            await part.drain()
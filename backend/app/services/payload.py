@@ -0,0 +1,67 @@
+import math
+from typing import Dict, Iterable, List
+
+import cv2
+import numpy as np
+
+# Images are grouped by role for resolution/quality limits
+KIND_ROLES = {
+    "doc_front": "document",
+    "doc_back": "document",
+    "selfie": "face",
+}
+
+
+def role_for_kind(kind: str) -> str:
+    return KIND_ROLES.get(kind, "keyframe" if kind.startswith("keyframe") else "face")
+
+
+def estimate_image_tokens(width: int, height: int) -> int:
+    """Rough Gemini image token cost: 258 for small images, else 258 per 768px tile"""
+    if width <= 0 or height <= 0:
+        return 0
+    if width <= 384 and height <= 384:
+        return 258
+    return 258 * math.ceil(width / 768) * math.ceil(height / 768)
+
+
+def fit_within(frame: np.ndarray, max_side: int) -> np.ndarray:
+    """Downscale with area interpolation so the longest side is at most `max_side`"""
+    h, w = frame.shape[:2]
+    scale = max_side / max(h, w)
+    if scale >= 1.0:
+        return frame
+    return cv2.resize(frame, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+
+
+def dhash(frame: np.ndarray) -> int:
+    """64-bit difference hash; near-identical frames differ in only a few bits"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def dedupe_frames(frames: List[np.ndarray], max_distance: int) -> List[int]:
+    """Indices of frames to keep, dropping any within `max_distance` bits of a kept one"""
+    kept, hashes = [], []
+    for i, frame in enumerate(frames):
+        h = dhash(frame)
+        if all((h ^ other).bit_count() > max_distance for other in hashes):
+            kept.append(i)
+            hashes.append(h)
+    return kept
+
+
+def payload_report(images: Iterable) -> Dict[str, int]:
+    """Bytes and estimated tokens before and after payload shrinking"""
+    report = {"images": 0, "source_bytes": 0, "payload_bytes": 0, "source_tokens": 0, "payload_tokens": 0}
+    for image in images:
+        report["images"] += 1
+        report["source_bytes"] += image.source_bytes or len(image.data)
+        report["payload_bytes"] += len(image.data)
+        report["source_tokens"] += image.source_tokens
+        report["payload_tokens"] += estimate_image_tokens(image.width, image.height)
+    report["bytes_saved"] = report["source_bytes"] - report["payload_bytes"]
+    report["tokens_saved"] = report["source_tokens"] - report["payload_tokens"]
+    return report
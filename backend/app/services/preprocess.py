@@ -0,0 +1,210 @@
+import asyncio
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from loguru import logger
+from sqlalchemy import update
+
+from ..config import get_settings
+from ..db import async_session
+from ..models.media import Media
+from .artifact import ArtifactService, MediaArtifact, get_artifact_service
+from .executor import get_media_executor
+from .metrics import current_timings
+from .payload import role_for_kind
+
+IMAGE_KINDS = ("doc_front", "doc_back", "selfie")
+AUDIO_KINDS = ("phrase_audio",)
+
+
+async def _no_metrics() -> Dict:
+    return {}
+
+
+def best_face(*crops: Optional[MediaArtifact]) -> Optional[MediaArtifact]:
+    """The best-scored of the available face crops"""
+    return max((c for c in crops if c is not None), key=lambda c: c.metrics["face_score"], default=None)
+
+
+class Preprocessor:
+    """Upload-time media preprocessing, so verify only gathers finished artifacts.
+
+    Each completed upload schedules its own job on the media executor: the
+    thumbnail, quality metrics and LLM-ready bytes of an image, the probe
+    stats and encoded keyframes of a clip, or the speech analysis of audio. Results land on the Media
+    row (`preprocess_status`, `thumbnail_path`, `derived`). Verify waits for
+    this process's in-flight jobs and redoes inline only what is missing,
+    e.g. after a failure or when the upload was handled by another process.
+    """
+
+    def __init__(self, artifact_service: ArtifactService, media_executor, wait_seconds: float = 30.0):
+        self.artifact_service = artifact_service
+        self.media_executor = media_executor
+        self.wait_seconds = wait_seconds
+        self.settings = get_settings()
+        self._tasks: Dict[str, Set[asyncio.Task]] = {}
+
+    def av_sync_limits(self) -> Optional[dict]:
+        """Budget for the local lip-sync scorer; None when only the LLM judges sync"""
+        if self.settings.AV_SYNC_MODE == "llm":
+            return None
+        return {"max_seconds": self.settings.AV_SYNC_MAX_SECONDS, "cpu_budget_ms": self.settings.AV_SYNC_CPU_BUDGET_MS}
+
+    def face_limits(self) -> Optional[dict]:
+        """Payload caps for the best face crop; None when no crop is sent"""
+        return self.payload_limits("selfie") if self.settings.FACE_CROP_ENABLED else None
+
+    def payload_limits(self, kind: str) -> dict:
+        """Resolution and JPEG quality caps for an image kind's role"""
+        role = role_for_kind(kind)
+        return {
+            "max_side": self.settings.LLM_IMAGE_MAX_SIDE[role],
+            "quality": self.settings.LLM_JPEG_QUALITY[role],
+        }
+
+    @staticmethod
+    def handles(kind: str) -> bool:
+        return kind in IMAGE_KINDS or kind in AUDIO_KINDS or kind == "av_clip"
+
+    def schedule(self, media: Media) -> bool:
+        """Start preprocessing a freshly uploaded media row; False if its kind needs none"""
+        if not self.handles(media.kind):
+            return False
+        task = asyncio.create_task(self._run(media.id, media.session_id, media.kind, Path(media.path)))
+        tasks = self._tasks.setdefault(media.session_id, set())
+        tasks.add(task)
+        task.add_done_callback(lambda t, sid=media.session_id: self._forget(sid, t))
+        return True
+
+    def _forget(self, session_id: str, task: asyncio.Task):
+        tasks = self._tasks.get(session_id)
+        if tasks is not None:
+            tasks.discard(task)
+            if not tasks:
+                del self._tasks[session_id]
+
+    def pending(self, session_id: str) -> int:
+        return len(self._tasks.get(session_id, ()))
+
+    def in_flight(self) -> int:
+        return sum(len(tasks) for tasks in self._tasks.values())
+
+    async def wait_for_session(self, session_id: str):
+        """Wait (bounded) for this process's in-flight preprocessing of a session"""
+        tasks = list(self._tasks.get(session_id, ()))
+        if tasks:
+            await asyncio.wait(tasks, timeout=self.wait_seconds)
+
+    async def _run(self, media_id: int, session_id: str, kind: str, path: Path):
+        # Runs past the upload's response: its spans go to the histograms only
+        current_timings.set(None)
+        out_dir = self.artifact_service.derived_dir(session_id, media_id)
+        try:
+            if kind == "av_clip":
+                derived = await self.media_executor.run(
+                    "preprocess_clip", path, out_dir,
+                    dedupe_distance=self.settings.KEYFRAME_DEDUPE_DISTANCE,
+                    av_sync=self.av_sync_limits(),
+                    face_limits=self.face_limits(),
+                    **self.payload_limits("keyframe")
+                )
+            elif kind in AUDIO_KINDS:
+                derived = {"audio": await self.media_executor.run("analyse_audio", path)}
+            else:
+                derived = await self.media_executor.run(
+                    "preprocess_image", path, kind,
+                    self.artifact_service.thumbnail_name(session_id, kind, media_id), out_dir,
+                    face_limits=self.face_limits() if kind == "selfie" else None,
+                    **self.payload_limits(kind)
+                )
+            values = {"preprocess_status": "done", "thumbnail_path": derived.pop("thumbnail", None), "derived": derived}
+        except Exception as e:
+            # Not fatal: verify prepares this media inline instead
+            logger.warning(f"Preprocessing {kind} for session {session_id} failed: {e!r}")
+            values = {"preprocess_status": "failed"}
+
+        async with async_session() as db:
+            await db.execute(update(Media).where(Media.id == media_id).values(**values))
+            await db.commit()
+
+    async def prepare_image(self, session_id: str, media: Media) -> Tuple[MediaArtifact, Path]:
+        """LLM-ready image and its thumbnail: precomputed if available, else made now"""
+        if media.preprocess_status == "done":
+            record = media.derived["artifacts"][0]
+            artifact = await asyncio.to_thread(self.artifact_service.load_artifact, record)
+            return artifact, Path(media.thumbnail_path)
+
+        thumb_name = self.artifact_service.thumbnail_name(session_id, media.kind, media.id)
+        return await self.media_executor.run(
+            "prepare_image", Path(media.path), media.kind, thumb_name, **self.payload_limits(media.kind)
+        )
+
+    async def prepare_selfie(self, session_id: str, media: Media) -> Tuple[MediaArtifact, Optional[MediaArtifact]]:
+        """LLM-ready selfie and its face crop (None without one): precomputed if
+        available, else made now"""
+        if media.preprocess_status == "done":
+            return await asyncio.to_thread(
+                lambda: (self.artifact_service.load_artifact(media.derived["artifacts"][0]), self._load_face(media))
+            )
+
+        thumb_name = self.artifact_service.thumbnail_name(session_id, media.kind, media.id)
+        artifact, score, _, face = await self.media_executor.run(
+            "prepare_selfie", Path(media.path), thumb_name, face_limits=self.face_limits(),
+            **self.payload_limits("selfie")
+        )
+        artifact.metrics["quality_score"] = score
+        return artifact, face
+
+    def _load_face(self, media: Media) -> Optional[MediaArtifact]:
+        # Rows preprocessed without a face crop (none found, or crops disabled) have none
+        record = media.derived.get("face") if self.settings.FACE_CROP_ENABLED else None
+        return self.artifact_service.load_artifact(record) if record else None
+
+    async def prepare_clip(self, media: Media) -> Tuple[List[MediaArtifact], Dict[str, float], Optional[MediaArtifact]]:
+        """Encoded keyframes, clip metrics and the keyframes' best face crop:
+        precomputed if available, else made now"""
+        if media.preprocess_status == "done":
+            records = media.derived["artifacts"]
+            keyframes, face = await asyncio.to_thread(
+                lambda: ([self.artifact_service.load_artifact(r) for r in records], self._load_face(media))
+            )
+            return keyframes, dict(media.derived["clip_metrics"]), face
+
+        # Keyframes and lip sync decode the clip independently, so run them side by side
+        limits = self.av_sync_limits()
+        (keyframes, clip_metrics, face), av_sync = await asyncio.gather(
+            self.media_executor.run(
+                "prepare_keyframes", Path(media.path),
+                dedupe_distance=self.settings.KEYFRAME_DEDUPE_DISTANCE,
+                face_limits=self.face_limits(),
+                **self.payload_limits("keyframe")
+            ),
+            self.media_executor.run("measure_av_sync", Path(media.path), **limits) if limits else _no_metrics(),
+        )
+        clip_metrics.update(av_sync)
+        return keyframes, clip_metrics, face
+
+    async def prepare_audio(self, media: Optional[Media]) -> Optional[Dict]:
+        """Speech timings and spoof features: precomputed if available, else measured
+        now; None when there is no recording or it cannot be analysed"""
+        if media is None:
+            return None
+        if media.preprocess_status == "done":
+            return dict(media.derived["audio"])
+        try:
+            return await self.media_executor.run("analyse_audio", Path(media.path))
+        except Exception as e:
+            # The recording is optional: verify without its analysis
+            logger.warning(f"Audio analysis of {media.path} failed: {e!r}")
+            return None
+
+
+@lru_cache()
+def get_preprocessor() -> Preprocessor:
+    settings = get_settings()
+    return Preprocessor(
+        get_artifact_service(),
+        get_media_executor(),
+        wait_seconds=settings.PREPROCESS_WAIT_SECONDS,
+    )
@@ -0,0 +1,73 @@
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import yaml
+
+PRESCREEN_CONFIG = Path(__file__).parent.parent / "config" / "prescreen.yaml"
+
+# Higher wins when several rules trigger
+ACTION_SEVERITY = {"pass": 0, "review": 1, "reject": 2}
+
+
+@dataclass
+class PrescreenResult:
+    decision: str  # pass, review, reject
+    reasons: List[str] = field(default_factory=list)
+    metrics: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def passed(self) -> bool:
+        return self.decision == "pass"
+
+
+class Prescreen:
+    """Threshold rules over locally measured media metrics.
+
+    Cheap enough to run on every session; sessions it rejects or flags for
+    review never reach the LLM.
+    """
+
+    def __init__(self, rules: List[dict]):
+        for rule in rules:
+            if rule.get("action") not in ("review", "reject"):
+                raise ValueError(f"Invalid pre-screen action in rule {rule}")
+            if "below" not in rule and "above" not in rule:
+                raise ValueError(f"Pre-screen rule needs 'below' or 'above': {rule}")
+        self.rules = rules
+
+    @classmethod
+    def from_yaml(cls, path: Path = PRESCREEN_CONFIG) -> "Prescreen":
+        with open(path) as f:
+            return cls(yaml.safe_load(f).get("rules", []))
+
+    def evaluate(self, metrics: Dict[str, float]) -> PrescreenResult:
+        decision, reasons = "pass", []
+        for rule in self.rules:
+            value = metrics.get(rule["metric"])
+            if value is None:
+                continue
+            if ("below" in rule and value < rule["below"]) or ("above" in rule and value > rule["above"]):
+                reasons.append(rule["reason"])
+                if ACTION_SEVERITY[rule["action"]] > ACTION_SEVERITY[decision]:
+                    decision = rule["action"]
+        return PrescreenResult(decision=decision, reasons=reasons, metrics=metrics)
+
+
+def collect_metrics(images: Dict, clip_metrics: Dict[str, float],
+                    audio: Optional[Dict] = None) -> Dict[str, float]:
+    """Flatten per-image, clip and audio metrics into `<kind>.<metric>` keys"""
+    metrics = {f"clip.{name}": value for name, value in clip_metrics.items()}
+    for name, value in (audio or {}).items():
+        if value is not None:
+            metrics[f"audio.{name}"] = value
+    for kind, image in images.items():
+        if image is not None and not kind.startswith("keyframe"):
+            metrics.update({f"{kind}.{name}": value for name, value in image.metrics.items()})
+    return metrics
+
+
+@lru_cache()
+def get_prescreen() -> Prescreen:
+    return Prescreen.from_yaml()
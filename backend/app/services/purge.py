@@ -0,0 +1,183 @@
+import asyncio
+import random
+from datetime import datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, List
+
+from loguru import logger
+from sqlalchemy import select, update, or_, and_
+
+from ..config import get_settings
+from ..db import async_session
+from ..models.session import Session
+from ..models.media import Media
+from ..models.purge_run import PurgeRun
+from .artifact import ArtifactService, get_artifact_service
+from .llm_cache import get_llm_cache
+
+# Sessions that never reached cleanup_session still own raw media
+UNFINISHED_STATUSES = ("created", "uploading", "media_complete")
+
+
+def _tree_size(paths: Iterable[Path]) -> int:
+    total = 0
+    for path in paths:
+        if path.is_dir():
+            total += sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+        elif path.is_file():
+            total += path.stat().st_size
+    return total
+
+
+def _remove_files(paths: List[Path]) -> int:
+    size = _tree_size(paths)
+    for path in paths:
+        path.unlink(missing_ok=True)
+    return size
+
+
+class MediaPurger:
+    """Deletes expired raw media and thumbnails, driven by indexed DB queries.
+
+    Work is done in batches of `batch_size` sessions. Each session is claimed
+    with a conditional UPDATE before its files are touched, so several worker
+    processes can run the purge at the same time without double work. File
+    deletion runs in a thread and the loop yields between batches.
+    """
+
+    def __init__(self, artifact_service: ArtifactService, raw_ttl_hours: float, thumb_ttl_hours: float,
+                 batch_size: int = 100, stale_claim_seconds: float = 900.0):
+        self.artifact_service = artifact_service
+        self.raw_ttl = timedelta(hours=raw_ttl_hours)
+        self.thumb_ttl = timedelta(hours=thumb_ttl_hours)
+        self.batch_size = batch_size
+        self.stale_claim = timedelta(seconds=stale_claim_seconds)
+
+    async def _purge_raw_batch(self, cutoff: datetime) -> List[int]:
+        """Purge one batch of abandoned sessions; returns [seen, purged, bytes]"""
+        async with async_session() as db:
+            result = await db.execute(
+                select(Session.id, Session.status)
+                .where(Session.created_at < cutoff)
+                .where(or_(
+                    Session.status.in_(UNFINISHED_STATUSES),
+                    # Claimed by a purge or verification that died before finishing
+                    and_(Session.status.in_(("purging", "verifying")),
+                         Session.updated_at < datetime.utcnow() - self.stale_claim),
+                ))
+                .order_by(Session.created_at)
+                .limit(self.batch_size)
+            )
+            candidates = result.all()
+
+            purged, reclaimed = 0, 0
+            for session_id, status in candidates:
+                claimed = await db.execute(
+                    update(Session)
+                    .where(Session.id == session_id, Session.status == status)
+                    .values(status="purging")
+                )
+                await db.commit()
+                if claimed.rowcount != 1:
+                    continue  # another worker got it
+
+                stored = await db.execute(
+                    select(Media.storage_key, Media.path)
+                    .where(Media.session_id == session_id, Media.storage_key.is_not(None))
+                )
+                reclaimed += await asyncio.to_thread(
+                    self.artifact_service.cleanup_session, str(session_id), stored.all()
+                )
+                await db.execute(update(Session).where(Session.id == session_id).values(status="expired"))
+                await db.commit()
+                purged += 1
+        return [len(candidates), purged, reclaimed]
+
+    def _remove_thumbnails(self, session_id: str, media) -> int:
+        # Listing the renders touches the disk too, so it runs with the deletes
+        return _remove_files(self.artifact_service.thumbnail_paths(session_id, media))
+
+    async def _purge_thumbs_batch(self, cutoff: datetime) -> List[int]:
+        async with async_session() as db:
+            result = await db.execute(
+                select(Session.id)
+                .where(Session.thumbs_purged == False)  # noqa: E712
+                .where(Session.created_at < cutoff)
+                .order_by(Session.created_at)
+                .limit(self.batch_size)
+            )
+            candidates = result.scalars().all()
+
+            purged, reclaimed = 0, 0
+            for session_id in candidates:
+                claimed = await db.execute(
+                    update(Session)
+                    .where(Session.id == session_id, Session.thumbs_purged == False)  # noqa: E712
+                    .values(thumbs_purged=True)
+                )
+                await db.commit()
+                if claimed.rowcount != 1:
+                    continue
+                media = await db.execute(select(Media.id, Media.kind).where(Media.session_id == session_id))
+                reclaimed += await asyncio.to_thread(self._remove_thumbnails, str(session_id), media.all())
+                purged += 1
+        return [len(candidates), purged, reclaimed]
+
+    async def run_once(self) -> PurgeRun:
+        """One full purge pass, recorded as a PurgeRun row"""
+        run = PurgeRun(sessions_purged=0, thumbnails_purged=0, cache_entries_purged=0, bytes_reclaimed=0)
+        now = datetime.utcnow()
+
+        for batch, field, cutoff in (
+            (self._purge_raw_batch, "sessions_purged", now - self.raw_ttl),
+            (self._purge_thumbs_batch, "thumbnails_purged", now - self.thumb_ttl),
+        ):
+            while True:
+                seen, purged, reclaimed = await batch(cutoff)
+                setattr(run, field, getattr(run, field) + purged)
+                run.bytes_reclaimed += reclaimed
+                if seen < self.batch_size:
+                    break
+                # Let request handlers run between batches
+                await asyncio.sleep(0)
+
+        cache = get_llm_cache()
+        if cache is not None:
+            run.cache_entries_purged = await cache.purge_expired()
+
+        run.finished_at = datetime.utcnow()
+        async with async_session() as db:
+            db.add(run)
+            await db.commit()
+        logger.info(
+            f"Purge reclaimed {run.bytes_reclaimed} bytes: {run.sessions_purged} sessions, "
+            f"{run.thumbnails_purged} thumbnail sets, {run.cache_entries_purged} cache entries"
+        )
+        return run
+
+
+@lru_cache()
+def get_media_purger() -> MediaPurger:
+    settings = get_settings()
+    return MediaPurger(
+        get_artifact_service(),
+        raw_ttl_hours=settings.RAW_TTL_HOURS,
+        thumb_ttl_hours=settings.THUMB_TTL_HOURS,
+        batch_size=settings.PURGE_BATCH_SIZE,
+    )
+
+
+async def scheduled_purge():
+    """Run the media purge forever, every PURGE_INTERVAL_SECONDS (with jitter)"""
+    settings = get_settings()
+    purger = get_media_purger()
+    while True:
+        # Jitter keeps several workers from waking in lockstep
+        await asyncio.sleep(settings.PURGE_INTERVAL_SECONDS * random.uniform(0.9, 1.1))
+        try:
+            await purger.run_once()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Media purge run failed")
@@ -0,0 +1,105 @@
+import asyncio
+import time
+from typing import Optional
+
+
+class CircuitOpen(RuntimeError):
+    """Raised instead of calling a dependency whose circuit breaker is open"""
+
+
+class RateLimited(RuntimeError):
+    """Raised when no rate-limit token frees up within the caller's time budget"""
+
+
+class TokenBucket:
+    """Async token-bucket rate limiter: `rate` tokens per second, up to `burst` banked"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self) -> bool:
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    async def acquire(self, timeout: Optional[float] = None):
+        """Wait for a token; raises RateLimited if none is free within `timeout` seconds"""
+        try:
+            await asyncio.wait_for(self._acquire(), timeout)
+        except asyncio.TimeoutError:
+            raise RateLimited(f"No rate-limit token within {timeout:.1f}s")
+
+    async def _acquire(self):
+        # The lock keeps waiters in FIFO order instead of all waking at once
+        async with self._lock:
+            while not self.try_acquire():
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def snapshot(self) -> dict:
+        self._refill()
+        return {"rate_per_second": self.rate, "burst": self.burst, "tokens": round(self.tokens, 2)}
+
+
+class CircuitBreaker:
+    """Fails fast after `failure_threshold` consecutive failures.
+
+    After `reset_timeout` seconds one trial call is let through (half-open);
+    its outcome closes the circuit again or re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    def before_call(self) -> bool:
+        """Admit a call or raise CircuitOpen; True when it is the half-open trial"""
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                raise CircuitOpen("LLM circuit breaker is open")
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self._trial_in_flight:
+                raise CircuitOpen("LLM circuit breaker is half-open; trial call in flight")
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def abandon_trial(self):
+        """The trial call ended without an outcome (e.g. cancelled): let the next call try"""
+        self._trial_in_flight = False
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "failure_threshold": self.failure_threshold,
+            "open_for_seconds": round(time.monotonic() - self.opened_at, 1) if self.opened_at else None,
+        }
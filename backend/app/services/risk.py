@@ -0,0 +1,193 @@
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import yaml
+from loguru import logger
+
+RISK_CONFIG = Path(__file__).parent.parent / "config" / "risk.yaml"
+
+# Feature order shared by the weight vector and the batch feature matrix
+FEATURES = (
+    "impossible_travel",
+    "geo_change",
+    "no_webauthn",
+    "kyc_failed",
+    "kyc_review",
+    "new_account",
+    "failed_logins",
+    "new_ip",
+)
+REASON_CODES = tuple(name.upper() for name in FEATURES)
+
+
+@dataclass(frozen=True)
+class RiskModel:
+    """risk.yaml compiled into plain numbers for fast scoring"""
+    weights: np.ndarray
+    weight_list: Tuple[float, ...]
+    bounds: np.ndarray  # upper score bound per action, ascending
+    actions: Tuple[str, ...]  # len(bounds) + 1, last is the fallback
+    kyc_verified: float
+    kyc_review: float
+    impossible_travel_mins: float
+    new_account_days: float
+    failed_logins_cap: float
+
+    @classmethod
+    def compile(cls, config: dict) -> "RiskModel":
+        signals = config["signals"]
+        unknown = set(signals["weights"]) - set(FEATURES)
+        if unknown:
+            raise ValueError(f"Unknown risk features: {', '.join(sorted(unknown))}")
+        weights = tuple(float(signals["weights"].get(name, 0.0)) for name in FEATURES)
+
+        rules = signals["actions"]
+        if not rules or "below" in rules[-1]:
+            raise ValueError("Risk actions need a final fallback entry without 'below'")
+        bounds = [float(rule["below"]) for rule in rules[:-1]]
+        if bounds != sorted(bounds):
+            raise ValueError("Risk action bounds must be ascending")
+
+        params = signals.get("params", {})
+        return cls(
+            weights=np.array(weights, dtype=np.float64),
+            weight_list=weights,
+            bounds=np.array(bounds, dtype=np.float64),
+            actions=tuple(rule["action"] for rule in rules),
+            kyc_verified=float(signals["kyc_bounds"]["verified"]),
+            kyc_review=float(signals["kyc_bounds"]["review"]),
+            impossible_travel_mins=float(params.get("impossible_travel_mins", 120)),
+            new_account_days=float(params.get("new_account_days", 7)),
+            failed_logins_cap=float(params.get("failed_logins_cap", 5)),
+        )
+
+    def features(self, signals) -> List[float]:
+        """Feature vector (in FEATURES order) for one RiskSignals record"""
+        geo, device, kyc, recent = signals.geo, signals.device, signals.kyc, signals.recentSignals
+        moved = geo.get("prev") is not None and geo.get("now") is not None and geo["prev"] != geo["now"]
+        fast = moved and float(geo.get("mins_since_prev", float("inf"))) < self.impossible_travel_mins
+        kyc_score = kyc.get("score")
+        kyc_failed = kyc_score is None or kyc_score < self.kyc_review
+        kyc_review = not kyc_failed and kyc_score < self.kyc_verified
+        age_days = kyc.get("age_days")
+        failed = float(recent.get("failedLogins", 0) or 0)
+        return [
+            1.0 if fast else 0.0,
+            1.0 if moved and not fast else 0.0,
+            0.0 if device.get("webauthn_present") else 1.0,
+            1.0 if kyc_failed else 0.0,
+            1.0 if kyc_review else 0.0,
+            1.0 if age_days is not None and age_days < self.new_account_days else 0.0,
+            min(failed / self.failed_logins_cap, 1.0) if self.failed_logins_cap > 0 else 0.0,
+            1.0 if recent.get("newIp") else 0.0,
+        ]
+
+    def decide(self, signals) -> dict:
+        x = self.features(signals)
+        score = min(max(sum(w * v for w, v in zip(self.weight_list, x)), 0.0), 1.0)
+        action = self.actions[-1]
+        for bound, candidate in zip(self.bounds, self.actions):
+            if score < bound:
+                action = candidate
+                break
+        codes = [code for code, v, w in zip(REASON_CODES, x, self.weight_list) if v > 0 and w > 0]
+        return decision_payload(action, score, codes)
+
+    def feature_matrix(self, records: Sequence) -> np.ndarray:
+        """`features` for many records at once: each signal is pulled out into a
+        column and the rules run as array comparisons (missing numbers are NaN)"""
+        def column(group: str, key: str, default=None) -> np.ndarray:
+            return np.array([getattr(r, group).get(key, default) for r in records], dtype=np.float64)
+
+        prev = [r.geo.get("prev") for r in records]
+        now = [r.geo.get("now") for r in records]
+        moved = np.array([p is not None and n is not None and p != n for p, n in zip(prev, now)])
+        fast = moved & (column("geo", "mins_since_prev", np.inf) < self.impossible_travel_mins)
+        webauthn = np.array([bool(r.device.get("webauthn_present")) for r in records])
+        kyc_score = column("kyc", "score")
+        kyc_failed = np.isnan(kyc_score) | (kyc_score < self.kyc_review)
+        kyc_review = ~kyc_failed & (kyc_score < self.kyc_verified)
+        new_account = column("kyc", "age_days") < self.new_account_days
+        failed = np.nan_to_num(column("recentSignals", "failedLogins", 0), nan=0.0)
+        failed = np.minimum(failed / self.failed_logins_cap, 1.0) if self.failed_logins_cap > 0 else np.zeros(len(records))
+        new_ip = np.array([bool(r.recentSignals.get("newIp")) for r in records])
+        return np.column_stack([
+            fast, moved & ~fast, ~webauthn, kyc_failed, kyc_review, new_account, failed, new_ip,
+        ]).astype(np.float64)
+
+    def decide_batch(self, records: Sequence) -> List[dict]:
+        """Score many records with one matrix product"""
+        if not records:
+            return []
+        X = self.feature_matrix(records)
+        scores = np.clip(X @ self.weights, 0.0, 1.0)
+        action_idx = np.searchsorted(self.bounds, scores, side="right")
+        # Each record's set of firing signals as a bitmask; the reason codes are
+        # built once per distinct mask rather than once per record
+        active = (X > 0) & (self.weights > 0)
+        masks = (active.astype(np.int64) @ (1 << np.arange(len(FEATURES), dtype=np.int64))).tolist()
+        codes = {
+            mask: [code for j, code in enumerate(REASON_CODES) if mask >> j & 1]
+            for mask in set(masks)
+        }
+        return [
+            decision_payload(self.actions[a], score, list(codes[mask]))
+            for a, score, mask in zip(action_idx.tolist(), scores.tolist(), masks)
+        ]
+
+
+def decision_payload(action: str, score: float, codes: List[str]) -> dict:
+    return {
+        "action": action,
+        "reason": ", ".join(codes) if codes else "NO_RISK_SIGNALS",
+        "reason_codes": codes,
+        "score": round(score, 4),
+    }
+
+
+class RiskEngine:
+    """Holds the compiled risk model and swaps in a new one when risk.yaml changes.
+
+    The file's mtime is checked at most every `reload_interval` seconds, so the
+    hot path costs one clock read. A config that fails to compile is logged and
+    the previous model stays active.
+    """
+
+    def __init__(self, path: Path = RISK_CONFIG, reload_interval: float = 2.0):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._mtime: Optional[int] = None
+        self._checked = 0.0
+        self.model = self._load()
+        self.loaded_at = time.time()
+
+    def _load(self) -> RiskModel:
+        mtime = self.path.stat().st_mtime_ns
+        with open(self.path) as f:
+            model = RiskModel.compile(yaml.safe_load(f))
+        self._mtime = mtime
+        return model
+
+    def current(self) -> RiskModel:
+        now = time.monotonic()
+        if now - self._checked >= self.reload_interval:
+            self._checked = now
+            mtime = self.path.stat().st_mtime_ns
+            if mtime != self._mtime:
+                try:
+                    self.model = self._load()
+                    self.loaded_at = time.time()
+                    logger.info(f"Reloaded risk model from {self.path}")
+                except Exception:
+                    self._mtime = mtime
+                    logger.exception(f"Invalid risk config {self.path}; keeping previous model")
+        return self.model
+
+
+@lru_cache()
+def get_risk_engine() -> RiskEngine:
+    return RiskEngine()
@@ -0,0 +1,177 @@
+import hashlib
+import os
+import shutil
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from pathlib import Path
+from typing import Tuple
+
+from ..config import get_settings
+
+
+def shard_path(name: str, levels: int = 2, width: int = 2) -> str:
+    """Fan a hex name out into nested directories: 'abcdef...' -> 'ab/cd/abcdef...'"""
+    parts = [name[i * width:(i + 1) * width] for i in range(levels)]
+    return "/".join([*parts, name])
+
+
+class MediaStore(ABC):
+    """Content-addressed storage for uploaded media.
+
+    Objects are keyed by their SHA-256 and stored once. Each session gets a
+    local working path (`dest`) that references the object, so OpenCV can
+    keep reading plain files. `put` and `unlink` maintain the reference
+    count; an object is deleted when its last reference goes away.
+    """
+
+    def object_key(self, sha256: str) -> str:
+        return f"objects/{shard_path(sha256)}"
+
+    @abstractmethod
+    def put(self, src: Path, sha256: str, dest: Path) -> Tuple[str, bool]:
+        """Store `src` (consumed) under its hash and reference it at `dest`.
+
+        Returns the storage key and whether the content was already stored.
+        """
+
+    @abstractmethod
+    def move(self, key: str, src: Path, dest: Path):
+        """Move the reference at `src` to `dest`, replacing whatever `dest` was"""
+
+    @abstractmethod
+    def unlink(self, key: str, dest: Path) -> bool:
+        """Drop the reference at `dest`; returns True if that deleted the object itself"""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """Whether the object is stored"""
+
+
+class LocalMediaStore(MediaStore):
+    """Objects under `<root>/objects/ab/cd/<sha256>`; references are hardlinks.
+
+    The filesystem link count is the reference count, so dedupe and release
+    need no extra bookkeeping. An object is published with `os.link`, which
+    fails if the name exists, so concurrent puts of the same content never
+    swap out an inode that references already point at.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def _object_path(self, key: str) -> Path:
+        return self.root / key
+
+    def put(self, src: Path, sha256: str, dest: Path) -> Tuple[str, bool]:
+        key = self.object_key(sha256)
+        obj = self._object_path(key)
+        obj.parent.mkdir(parents=True, exist_ok=True)
+        dest.unlink(missing_ok=True)
+        while True:
+            try:
+                os.link(src, obj)
+                deduped = False
+            except FileExistsError:
+                # Already stored (possibly by a concurrent put): reference that copy
+                deduped = True
+            except OSError:
+                # Filesystems without hardlinks: the object and each reference are copies
+                deduped = obj.exists()
+                if not deduped:
+                    shutil.copy2(src, obj)
+                os.replace(src, dest)
+                return key, deduped
+            try:
+                os.link(obj, dest)
+                break
+            except FileNotFoundError:
+                # Its last reference was released in between: publish ours
+                continue
+        src.unlink(missing_ok=True)
+        return key, deduped
+
+    def move(self, key: str, src: Path, dest: Path):
+        # The link itself is the reference
+        os.replace(src, dest)
+
+    def unlink(self, key: str, dest: Path) -> bool:
+        dest.unlink(missing_ok=True)
+        obj = self._object_path(key)
+        try:
+            if obj.stat().st_nlink <= 1:
+                obj.unlink()
+                return True
+        except FileNotFoundError:
+            pass
+        return False
+
+    def exists(self, key: str) -> bool:
+        return self._object_path(key).exists()
+
+
+class S3MediaStore(MediaStore):
+    """Objects in an S3-compatible bucket (AWS, MinIO, or a local stand-in via `endpoint_url`).
+
+    Each reference is a small marker object under `refs/<key>/`, and the
+    object is deleted once no markers remain. The session path `dest` keeps a
+    local working copy for processing.
+    """
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: str = None, client=None):
+        if client is None:
+            try:
+                import boto3
+            except ImportError as e:
+                raise RuntimeError("MEDIA_STORE=s3 requires the boto3 package") from e
+            client = boto3.client("s3", endpoint_url=endpoint_url)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+
+    def _ref_key(self, key: str, dest: Path) -> str:
+        return f"{self.prefix}refs/{key}/{hashlib.sha1(str(dest).encode()).hexdigest()}"
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.prefix + key)
+            return True
+        except Exception as e:
+            # botocore's ClientError (or a stand-in's) carries the S3 error code
+            code = getattr(e, "response", {}).get("Error", {}).get("Code")
+            if code in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def put(self, src: Path, sha256: str, dest: Path) -> Tuple[str, bool]:
+        key = self.object_key(sha256)
+        deduped = self.exists(key)
+        if not deduped:
+            self.client.upload_file(str(src), self.bucket, self.prefix + key)
+        self.client.put_object(Bucket=self.bucket, Key=self._ref_key(key, dest), Body=str(dest).encode())
+        os.replace(src, dest)
+        return key, deduped
+
+    def move(self, key: str, src: Path, dest: Path):
+        # Marker for the new path first, so the object is never left unreferenced
+        self.client.put_object(Bucket=self.bucket, Key=self._ref_key(key, dest), Body=str(dest).encode())
+        os.replace(src, dest)
+        self.client.delete_object(Bucket=self.bucket, Key=self._ref_key(key, src))
+
+    def unlink(self, key: str, dest: Path) -> bool:
+        dest.unlink(missing_ok=True)
+        self.client.delete_object(Bucket=self.bucket, Key=self._ref_key(key, dest))
+        refs = self.client.list_objects_v2(Bucket=self.bucket, Prefix=f"{self.prefix}refs/{key}/", MaxKeys=1)
+        if refs.get("KeyCount", 0) == 0:
+            self.client.delete_object(Bucket=self.bucket, Key=self.prefix + key)
+            return True
+        return False
+
+
+@lru_cache()
+def get_media_store() -> MediaStore:
+    settings = get_settings()
+    if settings.MEDIA_STORE == "s3":
+        return S3MediaStore(settings.S3_BUCKET, settings.S3_PREFIX, settings.S3_ENDPOINT_URL)
+    if settings.MEDIA_STORE != "local":
+        raise ValueError(f"Unknown MEDIA_STORE {settings.MEDIA_STORE!r}")
+    return LocalMediaStore(Path(settings.MEDIA_ROOT))
@@ -0,0 +1,119 @@
+import asyncio
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Tuple
+
+import cv2
+import numpy as np
+
+from ..config import get_settings
+from . import metrics
+from .artifact import ArtifactService, get_artifact_service, write_atomic
+from .metrics import span
+from .payload import fit_within
+
+# format -> (extension, MIME type)
+THUMBNAIL_FORMATS = {"webp": (".webp", "image/webp"), "jpeg": (".jpg", "image/jpeg")}
+
+
+class ThumbnailNotFound(LookupError):
+    """No master for this session and kind (never uploaded, or purged)"""
+
+
+@dataclass
+class Thumbnail:
+    path: Path
+    mime_type: str
+    etag: str
+
+
+class ThumbnailService:
+    """Audit thumbnails rendered on request from each image's retained master.
+
+    Only the master (downscaled once when the image is processed) is written
+    eagerly. A requested size and format is resized from it with area
+    interpolation on first use and written next to the master, named by its
+    ETag, so it is served from disk from then on. Renders are keyed by the
+    master's mtime and size, so a rewritten master never serves stale ones.
+    An LRU of up to `cache_entries` ETag -> render path entries saves the
+    existence check for hot thumbnails; no image bytes are held in memory.
+    """
+
+    def __init__(self, artifact_service: ArtifactService, sizes: Iterable[int],
+                 quality: Dict[str, int], cache_entries: int = 4096):
+        self.artifact_service = artifact_service
+        self.sizes = tuple(sizes)
+        self.quality = quality
+        self.cache_entries = cache_entries
+        self._cache: "OrderedDict[str, Path]" = OrderedDict()
+
+    async def locate(self, session_id: str, kind: str, media_id: int, size: int, fmt: str) -> Tuple[Path, str]:
+        """Master path and ETag of a render, without rendering it"""
+        path = self.artifact_service.thumbs_dir / self.artifact_service.thumbnail_name(session_id, kind, media_id)
+        try:
+            stat = await asyncio.to_thread(path.stat)
+        except FileNotFoundError:
+            raise ThumbnailNotFound(f"No thumbnail for {kind}")
+        digest = hashlib.md5(
+            f"{path}:{stat.st_mtime_ns}:{stat.st_size}:{size}:{fmt}".encode(), usedforsecurity=False
+        ).hexdigest()
+        return path, f'"{digest}"'
+
+    async def get(self, session_id: str, kind: str, media_id: int, size: int, fmt: str) -> Thumbnail:
+        """The render for `size` and `fmt` on disk, rendering it on first use"""
+        master, etag = await self.locate(session_id, kind, media_id, size, fmt)
+        mime_type = THUMBNAIL_FORMATS[fmt][1]
+        rendered = self._cache.get(etag)
+        if rendered is not None:
+            self._cache.move_to_end(etag)
+            metrics.THUMB_REQUESTS.inc(1, "hit")
+            return Thumbnail(path=rendered, mime_type=mime_type, etag=etag)
+
+        rendered = self.artifact_service.thumbnail_render_path(master, etag.strip('"'), THUMBNAIL_FORMATS[fmt][0])
+        try:
+            if await asyncio.to_thread(rendered.exists):
+                metrics.THUMB_REQUESTS.inc(1, "disk")
+            else:
+                metrics.THUMB_REQUESTS.inc(1, "miss")
+                await asyncio.to_thread(self.render, master, rendered, size, fmt)
+        except FileNotFoundError:
+            # Purged between the stat and the read
+            raise ThumbnailNotFound(f"No thumbnail for {kind}")
+        self._remember(etag, rendered)
+        return Thumbnail(path=rendered, mime_type=mime_type, etag=etag)
+
+    @span("thumbnail_render")
+    def render(self, master: Path, dest: Path, size: int, fmt: str):
+        """Fit the master within `size` (never upscaling), encode it and write it to `dest`"""
+        frame = cv2.imdecode(np.frombuffer(master.read_bytes(), dtype=np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError(f"Could not read thumbnail master: {master}")
+        flag = cv2.IMWRITE_WEBP_QUALITY if fmt == "webp" else cv2.IMWRITE_JPEG_QUALITY
+        ok, buf = cv2.imencode(THUMBNAIL_FORMATS[fmt][0], fit_within(frame, size), [flag, self.quality[fmt]])
+        if not ok:
+            raise ValueError(f"Could not encode {fmt} thumbnail")
+        write_atomic(dest, buf.tobytes())
+
+    @property
+    def cached_entries(self) -> int:
+        return len(self._cache)
+
+    def _remember(self, etag: str, path: Path):
+        self._cache[etag] = path
+        self._cache.move_to_end(etag)
+        while len(self._cache) > self.cache_entries:
+            self._cache.popitem(last=False)
+
+
+@lru_cache()
+def get_thumbnail_service() -> ThumbnailService:
+    settings = get_settings()
+    return ThumbnailService(
+        get_artifact_service(),
+        settings.THUMB_SIZES,
+        quality={"webp": settings.THUMB_WEBP_QUALITY, "jpeg": settings.THUMB_JPEG_QUALITY},
+        cache_entries=settings.THUMB_CACHE_ENTRIES,
+    )
@@ -0,0 +1,367 @@
+import asyncio
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import AsyncIterator, Dict, Iterable, Optional, Tuple, Union
+
+from loguru import logger
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings
+from ..db import async_session
+from ..models.idempotency_key import IdempotencyKey
+from ..models.session import Session
+from ..queries import get_session_with_media
+from ..models.verification_result import VerificationResult as DBVerificationResult
+from ..schemas import VerificationResult
+from .artifact import ArtifactService, get_artifact_service
+from .llm import LLMService, get_llm_service
+from .metrics import span
+from .preprocess import Preprocessor, best_face, get_preprocessor
+from .prescreen import Prescreen, PrescreenResult, collect_metrics, get_prescreen
+
+
+# Timings only the capturing client knows, read from session metadata
+CLIENT_TIMINGS = ("prompt_shown_ms", "head_turn_left_ms", "head_turn_right_ms", "blink_times_ms")
+
+
+class SessionNotFound(LookupError):
+    """Raised when verification is requested for an unknown session"""
+
+
+class SessionNotReady(ValueError):
+    """Raised when a session's media is not complete yet"""
+
+
+class VerificationInProgress(RuntimeError):
+    """Raised when another process is already verifying the session"""
+
+
+class IdempotencyKeyReused(ValueError):
+    """Raised when an idempotency key is replayed for a different session"""
+
+
+class VerificationService:
+    """The verify pipeline: media preparation, LLM call and persistence.
+
+    Shared by the synchronous verify endpoint and the background job workers.
+    """
+
+    def __init__(self, llm_service: LLMService, artifact_service: ArtifactService, preprocessor: Preprocessor,
+                 prescreen: Prescreen = None):
+        self.llm_service = llm_service
+        self.artifact_service = artifact_service
+        self.preprocessor = preprocessor
+        self.prescreen = prescreen
+        self.settings = get_settings()
+        # session id -> the verification running for it in this process
+        self._in_flight: Dict[str, asyncio.Task] = {}
+
+    def apply_local_av_sync(self, result: VerificationResult, clip_metrics: Dict) -> VerificationResult:
+        """Use the measured lip sync alongside or instead of the LLM's av_sync guess"""
+        local = clip_metrics.get("av_sync_score")
+        if self.settings.AV_SYNC_MODE == "llm" or local is None:
+            return result
+        if self.settings.AV_SYNC_MODE == "local":
+            result.av_sync_score = local
+        elif clip_metrics["av_sync_confidence"] >= self.settings.AV_SYNC_MIN_CONFIDENCE:
+            result.av_sync_score = (result.av_sync_score + local) / 2
+        result.explanations = [
+            *result.explanations,
+            f"Local AV sync: audio offset {clip_metrics['av_sync_offset_ms']:+.0f} ms, "
+            f"confidence {clip_metrics['av_sync_confidence']:.2f}",
+        ]
+        return result
+
+    async def get_ready_session(self, db: AsyncSession, session_id: str) -> Session:
+        """Get session (with its media, in one query) and validate media is complete"""
+        session = await get_session_with_media(db, session_id)
+        if not session:
+            raise SessionNotFound("Session not found")
+        if session.status == "verifying":
+            raise VerificationInProgress("Session is already being verified")
+        if session.status != "media_complete":
+            raise SessionNotReady("Session media not complete")
+        return session
+
+    async def verify(self, db: AsyncSession, session_id: str, expected_phrase: str = "",
+                     idempotency_key: Optional[str] = None) -> VerificationResult:
+        """Verify a session once, however many callers ask for it at the same time.
+
+        Callers in this process share the one in-flight verification; across
+        processes the `media_complete -> verifying` claim lets only one run.
+        A replayed idempotency key returns the stored result without re-running.
+        """
+        if idempotency_key:
+            stored = await self.stored_result(db, session_id, idempotency_key)
+            if stored is not None:
+                return stored
+
+        flight = self._in_flight.get(session_id)
+        if flight is None:
+            flight = asyncio.create_task(self._verify_once(session_id, expected_phrase, idempotency_key))
+            self._in_flight[session_id] = flight
+            flight.add_done_callback(lambda task: self._land(session_id, task))
+        # A caller that goes away (client disconnect) must not cancel the others' verification
+        result_id, result = await asyncio.shield(flight)
+
+        if idempotency_key:
+            await self.remember_key(db, idempotency_key, session_id, result_id)
+        return result
+
+    def _land(self, session_id: str, task: asyncio.Task):
+        if self._in_flight.get(session_id) is task:
+            del self._in_flight[session_id]
+        if not task.cancelled():
+            task.exception()  # retrieved here in case every caller went away
+
+    async def stored_result(self, db: AsyncSession, session_id: str, key: str) -> Optional[VerificationResult]:
+        """The result an idempotency key was answered with, if any"""
+        row = (await db.execute(
+            select(IdempotencyKey.session_id, DBVerificationResult)
+            .join(DBVerificationResult, DBVerificationResult.id == IdempotencyKey.result_id)
+            .where(IdempotencyKey.key == key)
+        )).first()
+        if row is None:
+            return None
+        if row.session_id != session_id:
+            raise IdempotencyKeyReused("Idempotency key was already used for another session")
+        return stored_verdict(row[1])
+
+    async def remember_key(self, db: AsyncSession, key: str, session_id: str, result_id: int):
+        """Record that `key` was answered with this result (the first writer wins)"""
+        exists = await db.execute(select(IdempotencyKey.id).where(IdempotencyKey.key == key))
+        if exists.first() is not None:
+            return
+        db.add(IdempotencyKey(key=key, session_id=session_id, result_id=result_id))
+        try:
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+
+    async def add_key(self, db: AsyncSession, key: str, session_id: str, result_id: int):
+        """Add the key in a savepoint of the caller's transaction; a key taken
+        meanwhile by another request must not roll the rest of it back"""
+        try:
+            async with db.begin_nested():
+                db.add(IdempotencyKey(key=key, session_id=session_id, result_id=result_id))
+        except IntegrityError:
+            logger.warning(f"Idempotency key for session {session_id} was already used; result stored without it")
+
+    async def claim(self, db: AsyncSession, session_id: str):
+        """Move the session to `verifying`, or raise why it cannot be verified now"""
+        stale = datetime.utcnow() - timedelta(seconds=self.settings.VERIFY_CLAIM_STALE_SECONDS)
+        claimed = await db.execute(
+            update(Session)
+            .where(Session.id == session_id)
+            .where(or_(
+                Session.status == "media_complete",
+                # Claimed by a process that died mid-verification
+                and_(Session.status == "verifying", Session.updated_at < stale),
+            ))
+            .values(status="verifying")
+        )
+        await db.commit()
+        if claimed.rowcount != 1:
+            await self.get_ready_session(db, session_id)
+            # Released again between the UPDATE and the read
+            raise VerificationInProgress("Session is already being verified")
+
+    async def _verify_once(self, session_id: str, expected_phrase: str,
+                           idempotency_key: Optional[str]) -> Tuple[int, VerificationResult]:
+        """Claim the session and run the pipeline on a DB session of its own (its
+        callers may come and go); the claim is released again if it fails"""
+        async with async_session() as db:
+            await self.claim(db, session_id)
+            try:
+                return await self._run_pipeline(db, session_id, expected_phrase, idempotency_key)
+            except Exception:
+                await db.rollback()
+                await db.execute(
+                    update(Session)
+                    .where(Session.id == session_id, Session.status == "verifying")
+                    .values(status="media_complete")
+                )
+                await db.commit()
+                raise
+
+    async def _run_pipeline(self, db: AsyncSession, session_id: str, expected_phrase: str,
+                            idempotency_key: Optional[str]) -> Tuple[int, VerificationResult]:
+        # 1. Let this process's upload-time preprocessing finish, then load the
+        # (claimed) session with its media
+        with span("preprocess_wait"):
+            await self.preprocessor.wait_for_session(session_id)
+        with span("db_load"):
+            session = await get_session_with_media(db, session_id)
+        
+        # 2. Get media rows (already loaded with the session); latest upload wins
+        media_dict = {m.kind: m for m in sorted(session.media, key=lambda m: m.id)}
+        
+        # 3. Gather prepared media: precomputed at upload time where possible,
+        # otherwise decoded now in a pool worker (which also writes the thumbnail)
+        try:
+            doc_kinds = [k for k in ("doc_front", "doc_back") if k in media_dict]
+            with span("prepare_media"):
+                (selfie, selfie_face), (keyframes, clip_metrics, clip_face), audio, *docs = await asyncio.gather(
+                    self.preprocessor.prepare_selfie(session_id, media_dict["selfie"]),
+                    self.preprocessor.prepare_clip(media_dict["av_clip"]),
+                    self.preprocessor.prepare_audio(media_dict.get("phrase_audio")),
+                    *(self.preprocessor.prepare_image(session_id, media_dict[k]) for k in doc_kinds)
+                )
+            
+            # Best face crop, cut at source resolution from the selfie or a clip frame
+            face = best_face(selfie_face, clip_face)
+            
+            images = {
+                **{k: image for k, (image, _) in zip(doc_kinds, docs)},
+                "selfie": selfie,
+                **({"selfie_face": face} if face is not None else {}),
+                **{kf.kind: kf for kf in keyframes}
+            }
+            
+            # 4. Local pre-screen: unusable captures never reach the LLM
+            prescreen = None
+            if self.prescreen is not None:
+                with span("prescreen"):
+                    prescreen = self.prescreen.evaluate(collect_metrics(images, clip_metrics, audio))
+            
+            # 5. Call LLM for verification
+            if prescreen is not None and not prescreen.passed:
+                logger.info(f"Session {session_id} stopped by pre-screen ({prescreen.decision}): {prescreen.metrics}")
+                verification_result = prescreen_verdict(prescreen)
+            else:
+                verification_result = await self.llm_service.verify_session(
+                    session_id=session_id,
+                    images=images,
+                    transcript="",  # TODO: Implement speech-to-text
+                    expected_phrase=expected_phrase,
+                    timings=session_timings(audio, session.session_metadata or {}),
+                    audio=audio
+                )
+                verification_result = self.apply_local_av_sync(verification_result, clip_metrics)
+            verification_result.audio_analysis = audio
+            
+            # 6. Save results to database
+            db_result = DBVerificationResult(
+                session_id=session_id,
+                status=verification_result.status,
+                score=verification_result.score,
+                ocr_data=verification_result.ocr_data,
+                face_match_score=verification_result.face_match_score,
+                liveness_score=verification_result.liveness_score,
+                av_sync_score=verification_result.av_sync_score,
+                audio_spoof_score=verification_result.audio_spoof_score,
+                explanations=verification_result.explanations,
+                audio_analysis=audio
+            )
+            db.add(db_result)
+            
+            # Update session status
+            session.status = "verified" if verification_result.status == "verified" else "rejected"
+            
+            with span("db_commit"):
+                await db.flush()
+                if idempotency_key:
+                    # Stored with the result, so a retry after a lost response finds it
+                    await self.add_key(db, idempotency_key, session_id, db_result.id)
+                await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        
+        # 7. Cleanup raw files (keep thumbnails); the verdict is already stored
+        with span("cleanup"):
+            try:
+                self.artifact_service.cleanup_session(
+                    session_id, [(m.storage_key, m.path) for m in session.media if m.storage_key]
+                )
+            except Exception as e:
+                logger.warning(f"Cleanup of session {session_id} failed: {e!r}")
+        
+        return db_result.id, verification_result
+
+    async def verify_many(
+        self, session_ids: Iterable[str], expected_phrase: str = "", concurrency: int = 4
+    ) -> AsyncIterator[Tuple[str, Union[VerificationResult, Exception]]]:
+        """Verify sessions `concurrency` at a time, yielding (session_id, result or error)
+        in completion order.
+
+        Each verification runs in its own DB session and a failure is yielded,
+        not raised, so one bad session does not stop the rest. Closing the
+        generator starts no further sessions; verifications already running
+        are shared (see `verify`) and still finish and store their results.
+        """
+        ids = list(dict.fromkeys(session_ids))
+        remaining = iter(ids)
+        finished = asyncio.Queue()
+
+        async def worker():
+            # Workers share the id iterator, so at most `concurrency` sessions are in flight
+            for session_id in remaining:
+                try:
+                    async with async_session() as db:
+                        outcome = await self.verify(db, session_id, expected_phrase)
+                except Exception as e:
+                    outcome = e
+                await finished.put((session_id, outcome))
+
+        workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(ids)))]
+        try:
+            for _ in ids:
+                yield await finished.get()
+        finally:
+            for task in workers:
+                task.cancel()
+
+
+def session_timings(audio: Optional[Dict], metadata: Dict) -> Dict:
+    """Liveness timings in ms from the start of the capture.
+
+    Speech comes from the local audio analysis; prompt, head-turn and blink
+    times are whatever the client reported in the session metadata.
+    """
+    timings = {key: metadata.get(key) for key in CLIENT_TIMINGS}
+    timings["speech_start_ms"] = audio.get("speech_start_ms") if audio else None
+    timings["speech_end_ms"] = audio.get("speech_end_ms") if audio else None
+    return timings
+
+
+def stored_verdict(row: DBVerificationResult) -> VerificationResult:
+    """API result from a stored verification row"""
+    return VerificationResult(
+        status=row.status,
+        score=row.score,
+        ocr_data=row.ocr_data,
+        face_match_score=row.face_match_score,
+        liveness_score=row.liveness_score,
+        av_sync_score=row.av_sync_score,
+        audio_spoof_score=row.audio_spoof_score,
+        explanations=row.explanations,
+        audio_analysis=row.audio_analysis,
+    )
+
+
+def prescreen_verdict(prescreen: PrescreenResult) -> VerificationResult:
+    """Verification result for a session stopped by the local pre-screen"""
+    return VerificationResult(
+        status="rejected" if prescreen.decision == "reject" else "review",
+        score=0.0,
+        ocr_data={},
+        face_match_score=0.0,
+        liveness_score=0.0,
+        av_sync_score=0.0,
+        audio_spoof_score=0.0,
+        explanations=[f"Pre-screen: {reason}" for reason in prescreen.reasons],
+    )
+
+
+@lru_cache()
+def get_verification_service() -> VerificationService:
+    settings = get_settings()
+    return VerificationService(
+        get_llm_service(),
+        get_artifact_service(),
+        get_preprocessor(),
+        prescreen=get_prescreen() if settings.PRESCREEN_ENABLED else None,
+    )
@@ -0,0 +1,40 @@
+import asyncio
+import time
+from typing import Dict
+
+from loguru import logger
+
+from ..config import get_settings
+from ..db import prime_pool
+from .artifact import get_artifact_service
+from .executor import get_media_executor
+from .llm import LLMNotConfigured, get_llm_service
+
+
+async def warm_up() -> Dict[str, float]:
+    """Ready the slow-to-initialise services; returns each step's duration in ms.
+
+    Steps that fail are logged and skipped: a cold service still works, it is
+    just slower on its first request.
+    """
+    settings = get_settings()
+    steps = {
+        "media_pool": get_media_executor().warm_up,
+        # Inline fallbacks detect faces in this process too
+        "face_cascade": lambda: asyncio.to_thread(lambda: get_artifact_service().face_cascade),
+        "llm_client": lambda: asyncio.to_thread(get_llm_service().open_client),
+        "db_pool": lambda: prime_pool(settings.WARMUP_DB_CONNECTIONS),
+    }
+    timings = {}
+    for name, step in steps.items():
+        started = time.perf_counter()
+        try:
+            await step()
+        except LLMNotConfigured as e:
+            logger.warning(f"Warm-up: skipping {name}: {e}")
+            continue
+        except Exception as e:
+            logger.warning(f"Warm-up: {name} failed: {e!r}")
+            continue
+        timings[name] = round((time.perf_counter() - started) * 1000, 1)
+    return timings
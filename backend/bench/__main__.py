@@ -0,0 +1,92 @@
+"""Benchmark runner: python -m bench [micro|load|all] (run from backend/)"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+BASELINE = Path(__file__).parent / "baseline.json"
+
+
+def configure_env(workdir: Path):
+    """Point the app at throwaway storage before any app module reads its settings"""
+    os.environ["MEDIA_ROOT"] = str(workdir / "media")
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{workdir / 'bench.sqlite3'}"
+    os.environ.setdefault("LLM_API_KEY", "bench")
+    os.environ.setdefault("LLM_MODEL", "gemini-bench")
+    # Synthetic selfies have no detectable face, and identical answers would
+    # be served from the cache: measure the full pipeline instead
+    os.environ.setdefault("PRESCREEN_ENABLED", "false")
+    os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+    # The provider's quota is not what is being measured
+    os.environ.setdefault("LLM_RATE_PER_MINUTE", "1000000")
+    os.environ.setdefault("LLM_RATE_BURST", "1000")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench", description=__doc__)
+    parser.add_argument("suite", nargs="?", choices=("micro", "load", "all"), default="all")
+    parser.add_argument("--iterations", type=int, default=20, help="runs per micro-benchmark")
+    parser.add_argument("--sessions", type=int, default=20, help="end-to-end flows in the load test")
+    parser.add_argument("--concurrency", type=int, default=4, help="flows in flight at once")
+    parser.add_argument("--media-sets", type=int, default=4, help="distinct synthetic sessions to cycle through")
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="fake Gemini mean latency (s)")
+    parser.add_argument("--llm-jitter", type=float, default=0.2, help="fake Gemini latency std dev (s)")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="fraction of fake calls that fail")
+    parser.add_argument("--baseline", type=Path,
+                        help=f"compare against this results file and exit 1 on regressions (e.g. {BASELINE.name})")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed regression, as a fraction")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0, help="ignore latency changes below this")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help=f"store these results as the baseline (--baseline, or {BASELINE.name})")
+    parser.add_argument("--output", type=Path, help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    workdir = Path(tempfile.mkdtemp(prefix="ds-bench-"))
+    configure_env(workdir)
+
+    # App modules read settings at import time, so import only now
+    from . import synthetic
+    from .fake_gemini import FakeGemini
+    from .load import run_load
+    from .micro import run_micro
+    from .report import calibrate, compare, load_baseline, peak_rss_mb, print_table, save_results
+
+    results = {"calibration": {"cpu_ms": calibrate()}}
+    if args.suite in ("micro", "all"):
+        print(f"micro-benchmarks ({args.iterations} iterations)...", file=sys.stderr)
+        results["micro"] = run_micro(workdir, args.iterations)
+    if args.suite in ("load", "all"):
+        print(f"load test ({args.sessions} sessions, concurrency {args.concurrency})...", file=sys.stderr)
+        media_dir = workdir / "inputs"
+        media_dir.mkdir(exist_ok=True)
+        media_sets = [synthetic.media_set(seed, media_dir) for seed in range(args.media_sets)]
+        fake = FakeGemini(args.llm_latency, args.llm_jitter, args.llm_error_rate)
+        results["load"] = asyncio.run(run_load(media_sets, args.sessions, args.concurrency, fake))
+    results["memory"] = {"self": {"peak_rss_mb": peak_rss_mb()}, "workers": {"peak_rss_mb": peak_rss_mb(children=True)}}
+
+    print_table(results)
+    if "load" in results:
+        load = results["load"]
+        print(f"  load: {load['succeeded']}/{load['sessions']} flows ok in {load['elapsed_s']}s, "
+              f"fake gemini {load['fake_gemini']}")
+    if args.output:
+        save_results(results, args.output)
+    if args.save_baseline:
+        save_results(results, args.baseline or BASELINE)
+        print(f"baseline saved to {args.baseline or BASELINE}")
+        return 0
+    if args.baseline is None:
+        return 0
+
+    regressions = compare(results, load_baseline(args.baseline), args.tolerance, args.min_delta_ms)
+    for path, before, now, change in regressions:
+        print(f"REGRESSION {path}: {before:.3f} -> {now:.3f} ({change:+.0%})")
+    if not regressions:
+        print(f"no regressions beyond {args.tolerance:.0%} against {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+"""Local stand-in for the Gemini model used by LLMService"""
+import asyncio
+import json
+import random
+
+from google.api_core import exceptions as google_exceptions
+
+FAKE_VERDICT = {
+    "overall": {"status": "verified", "score": 0.91},
+    "ocr": {"name": "JANE DOE", "document_number": "X1234567", "date_of_birth": "1990-01-01"},
+    "face_match": 0.88,
+    "liveness_active": {"score": 0.83},
+    "av_sync": 0.8,
+    "audio_spoof_guess": 0.1,
+    "explanations": ["Synthetic benchmark verdict"],
+}
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGemini:
+    """Answers `generate_content_async` like `genai.GenerativeModel`, offline.
+
+    Each call sleeps for a normally distributed latency and fails with a
+    transient provider error at `error_rate`, so LLMService's retries,
+    breaker, rate limiter and hedging all run as they would in production.
+    """
+
+    def __init__(self, latency: float = 0.8, jitter: float = 0.2, error_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.errors = 0
+
+    async def generate_content_async(self, prompt_parts, generation_config=None):
+        self.calls += 1
+        await asyncio.sleep(max(0.0, self.rng.gauss(self.latency, self.jitter)))
+        if self.rng.random() < self.error_rate:
+            self.errors += 1
+            raise google_exceptions.ServiceUnavailable("fake gemini: overloaded")
+        return FakeResponse("```json\n" + json.dumps(FAKE_VERDICT) + "\n```")
+
+    def install(self, llm_service) -> "FakeGemini":
+        """Swap this fake in for the service's shared model client"""
+        llm_service.client = self
+        return self
+
+    def snapshot(self) -> dict:
+        return {"latency": self.latency, "jitter": self.jitter, "error_rate": self.error_rate,
+                "calls": self.calls, "errors": self.errors}
@@ -0,0 +1,75 @@
+"""End-to-end load test of the FastAPI app against the fake Gemini model"""
+import asyncio
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import httpx
+
+from .fake_gemini import FakeGemini
+from .report import summarize
+
+UPLOAD_ORDER = ("doc_front", "doc_back", "selfie", "phrase_audio", "av_clip")
+
+
+async def run_flow(client: httpx.AsyncClient, media: Dict, timings: Dict[str, List[float]]) -> bool:
+    """create session -> uploads -> complete -> verify; True if every step succeeded"""
+    async def step(name: str, request) -> httpx.Response:
+        started = time.perf_counter()
+        response = await request
+        timings[name].append(time.perf_counter() - started)
+        response.raise_for_status()
+        return response
+
+    flow_started = time.perf_counter()
+    try:
+        created = await step("create_session", client.post("/api/v1/sessions", json={}))
+        session_id = created.json()["session_id"]
+        for kind in UPLOAD_ORDER:
+            data, mime_type = media[kind]
+            await step(f"upload.{kind}", client.post(
+                f"/api/v1/sessions/{session_id}/upload", params={"kind": kind},
+                files={"file": (kind, data, mime_type)},
+            ))
+        await step("media_complete", client.post(f"/api/v1/sessions/{session_id}/media/complete"))
+        await step("verify", client.post(
+            f"/api/v1/sessions/{session_id}/verify", json={"expected_phrase": "my voice is my password"},
+        ))
+    except httpx.HTTPError:
+        return False
+    timings["flow"].append(time.perf_counter() - flow_started)
+    return True
+
+
+async def run_load(media_sets: List[Dict], sessions: int = 20, concurrency: int = 4,
+                   fake: FakeGemini = None) -> Dict:
+    """Drive `sessions` full flows, `concurrency` at a time, through the ASGI app in-process"""
+    from app.main import app
+    from app.services.llm import get_llm_service
+
+    fake = (fake or FakeGemini()).install(get_llm_service())
+    timings: Dict[str, List[float]] = defaultdict(list)
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> bool:
+        async with slots:
+            return await run_flow(client, media_sets[i % len(media_sets)], timings)
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120.0) as client:
+            started = time.perf_counter()
+            outcomes = await asyncio.gather(*(one(i) for i in range(sessions)))
+            elapsed = time.perf_counter() - started
+
+    ok = sum(outcomes)
+    return {
+        "sessions": sessions,
+        "concurrency": concurrency,
+        "succeeded": ok,
+        "failed": sessions - ok,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_s": round(ok / elapsed, 3) if elapsed else 0.0,
+        "steps": {name: summarize(samples) for name, samples in sorted(timings.items())},
+        "fake_gemini": fake.snapshot(),
+    }
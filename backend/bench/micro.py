@@ -0,0 +1,76 @@
+"""Micro-benchmarks of ArtifactService methods and LLM payload preparation"""
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict
+
+from app.services.artifact import ArtifactService
+from app.services.llm import LLMService
+from app.services.payload import payload_report
+
+from . import synthetic
+from .report import summarize
+
+
+def timeit(fn: Callable, iterations: int, warmup: int = 1) -> Dict[str, float]:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def run_micro(workdir: Path, iterations: int = 20) -> Dict[str, Dict[str, float]]:
+    """Time each stage on one synthetic session's media, in this process"""
+    media_root = workdir / "micro"
+    artifacts = ArtifactService(media_root)
+    inputs = workdir / "inputs"
+    inputs.mkdir(parents=True, exist_ok=True)
+
+    doc = inputs / "doc_front.jpg"
+    doc.write_bytes(synthetic.document_image(1))
+    selfie = inputs / "selfie.jpg"
+    selfie.write_bytes(synthetic.selfie_image(1))
+    clip = synthetic.av_clip(inputs / "av_clip.mp4", 1)
+    audio = inputs / "phrase_audio.wav"
+    audio.write_bytes(synthetic.phrase_wav(1))
+    doc_bytes = doc.read_bytes()
+    loaded_doc = artifacts.load_image(doc, "doc_front")
+
+    results = {
+        "artifact.load_image": timeit(lambda: artifacts.load_image(doc, "doc_front"), iterations),
+        "artifact.generate_thumbnail": timeit(lambda: artifacts.generate_thumbnail(loaded_doc, "bench.jpg"), iterations),
+        "artifact.prepare_image": timeit(
+            lambda: artifacts.prepare_image(doc, "doc_front", "bench_doc.jpg", 1600, 88), iterations),
+        "artifact.prepare_selfie": timeit(lambda: artifacts.prepare_selfie(selfie, "bench_selfie.jpg", 768, 85), iterations),
+        "artifact.select_keyframes": timeit(lambda: artifacts.select_keyframes(clip, 5), iterations),
+        "artifact.prepare_keyframes": timeit(lambda: artifacts.prepare_keyframes(clip, 5, 512, 75, 6), iterations),
+        "artifact.measure_av_sync": timeit(lambda: artifacts.measure_av_sync(clip), iterations),
+        "artifact.analyse_audio": timeit(lambda: artifacts.analyse_audio(audio), iterations),
+        "artifact.save_upload": timeit(lambda: artifacts.save_upload(doc_bytes, str(uuid.uuid4()), "doc_front"), iterations),
+    }
+
+    # Everything LLMService does to a session's artifacts before the network call
+    llm = LLMService()
+    selfie_artifact, _, _, _ = artifacts.prepare_selfie(selfie, "bench_selfie.jpg", 768, 85)
+    doc_artifact, _ = artifacts.prepare_image(doc, "doc_front", "bench_doc.jpg", 1600, 88)
+    keyframes, _, _ = artifacts.prepare_keyframes(clip, 5, 512, 75, 6)
+    images = {"doc_front": doc_artifact, "selfie": selfie_artifact, **{kf.kind: kf for kf in keyframes}}
+    audio_analysis = artifacts.analyse_audio(audio)
+    timings = {"speech_start_ms": audio_analysis["speech_start_ms"], "speech_end_ms": audio_analysis["speech_end_ms"]}
+
+    def prepare_payload():
+        llm.cache_key(images, "", "my voice is my password", timings, audio_analysis)
+        [{"mime_type": image.mime_type, "data": image.data} for image in images.values()]
+        payload_report(images.values())
+        llm.render_user_prompt(list(images), "", "my voice is my password", timings, audio_analysis)
+
+    results["llm.cache_key"] = timeit(
+        lambda: llm.cache_key(images, "", "my voice is my password", timings, audio_analysis), iterations)
+    results["llm.render_user_prompt"] = timeit(
+        lambda: llm.render_user_prompt(list(images), "", "my voice is my password", timings, audio_analysis), iterations)
+    results["llm.prepare_payload"] = timeit(prepare_payload, iterations)
+    return results
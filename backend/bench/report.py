@@ -0,0 +1,116 @@
+"""Latency statistics, peak memory and baseline comparison"""
+import json
+import resource
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+import cv2
+import numpy as np
+
+# Metrics compared against the baseline; throughput is the only higher-is-better one
+COMPARED = ("p50_ms", "p95_ms", "throughput_per_s", "peak_rss_mb")
+HIGHER_IS_BETTER = ("throughput_per_s",)
+# With fewer samples p95 is just the slowest run or two: too noisy to gate on
+MIN_SAMPLES_FOR_P95 = 50
+
+
+def summarize(seconds: Iterable[float]) -> Dict[str, float]:
+    """p50/p95/p99 and mean in milliseconds for a list of durations in seconds"""
+    ms = np.asarray(list(seconds), dtype=np.float64) * 1000.0
+    if not len(ms):
+        return {"n": 0}
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "n": int(len(ms)),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+    }
+
+
+def calibrate(rounds: int = 15) -> float:
+    """Milliseconds for a fixed decode/resize/encode/FFT workload, best of `rounds`.
+
+    Stored with the results, it puts runs from differently fast (or busy)
+    machines on one scale: baseline timings are scaled by the ratio of the
+    two calibrations before they are compared.
+    """
+    rng = np.random.default_rng(0)
+    image = cv2.GaussianBlur(rng.integers(0, 256, (960, 1280, 3), dtype=np.uint8), (0, 0), 3)
+    signal = rng.standard_normal(1 << 16)
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        ok, buf = cv2.imencode(".jpg", cv2.resize(image, (640, 480), interpolation=cv2.INTER_AREA))
+        cv2.imdecode(buf, cv2.IMREAD_COLOR)
+        np.fft.irfft(np.fft.rfft(signal) ** 2)
+        best = min(best, time.perf_counter() - started)
+    return round(best * 1000.0, 3)
+
+
+def peak_rss_mb(children: bool = False) -> float:
+    """Peak resident set size of this process (or its reaped children, e.g. pool workers)"""
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(usage.ru_maxrss / scale, 1)
+
+
+def flatten(results: Dict, prefix: str = "") -> Dict[str, float]:
+    """`section.name.metric` -> value for every compared metric in a results tree"""
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, path))
+        elif key in COMPARED and isinstance(value, (int, float)):
+            if key == "p95_ms" and results.get("n", 0) < MIN_SAMPLES_FOR_P95:
+                continue
+            flat[path] = float(value)
+    return flat
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float,
+            min_delta_ms: float = 2.0) -> List[Tuple[str, float, float, float]]:
+    """Metrics worse than the baseline by more than `tolerance` (a fraction): (path, base, now, change).
+
+    When both runs carry a calibration, baseline timings and throughput are
+    first scaled to this machine's speed, so the gate compares ratios rather
+    than absolute milliseconds. Latency changes smaller than `min_delta_ms`
+    are timer noise and never count.
+    """
+    current, base = flatten(results), flatten(baseline)
+    calibration = results.get("calibration", {}).get("cpu_ms"), baseline.get("calibration", {}).get("cpu_ms")
+    speed = calibration[0] / calibration[1] if all(calibration) else 1.0
+    regressions = []
+    for path, before in base.items():
+        now = current.get(path)
+        if now is None or before <= 0:
+            continue
+        if path.endswith("_ms"):
+            before *= speed
+        elif path.endswith(HIGHER_IS_BETTER):
+            before /= speed
+        if path.endswith("_ms") and abs(now - before) < min_delta_ms:
+            continue
+        change = (now - before) / before
+        worse = -change if path.endswith(HIGHER_IS_BETTER) else change
+        if worse > tolerance:
+            regressions.append((path, before, now, change))
+    return regressions
+
+
+def load_baseline(path: Path) -> Dict:
+    return json.loads(path.read_text()) if path.exists() else {}
+
+
+def save_results(results: Dict, path: Path):
+    path.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+
+
+def print_table(results: Dict):
+    for path, value in sorted(flatten(results).items()):
+        print(f"  {path:<60} {value:>12.3f}")
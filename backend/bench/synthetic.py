@@ -0,0 +1,129 @@
+"""Deterministic synthetic media for the benchmarks: documents, selfies, clips and WAVs"""
+import io
+import wave
+from pathlib import Path
+from typing import Dict, Tuple
+
+import cv2
+import numpy as np
+
+
+def _jpeg(image: np.ndarray, quality: int = 92) -> bytes:
+    ok, buf = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("Could not encode synthetic image")
+    return buf.tobytes()
+
+
+def document_image(seed: int, size: Tuple[int, int] = (2000, 1300)) -> bytes:
+    """Photo of an ID card on a desk: card outline, portrait box and text lines"""
+    rng = np.random.default_rng(seed)
+    w, h = size
+    image = np.full((h, w, 3), rng.integers(60, 110), np.uint8)
+    image = cv2.add(image, rng.integers(0, 25, image.shape, dtype=np.uint8))
+    x0, y0, x1, y1 = w // 10, h // 8, w * 9 // 10, h * 7 // 8
+    cv2.rectangle(image, (x0, y0), (x1, y1), (235, 232, 225), -1)
+    cv2.rectangle(image, (x0, y0), (x1, y1), (40, 40, 40), 6)
+    cv2.rectangle(image, (x0 + 60, y0 + 120), (x0 + 460, y0 + 640), (150, 135, 125), -1)
+    for i in range(7):
+        text = "".join(chr(c) for c in rng.integers(65, 91, 14))
+        cv2.putText(image, text, (x0 + 540, y0 + 160 + i * 95), cv2.FONT_HERSHEY_SIMPLEX, 1.6, (30, 30, 30), 3)
+    return _jpeg(image)
+
+
+def selfie_image(seed: int, size: Tuple[int, int] = (1080, 1440)) -> bytes:
+    """Front-camera style portrait: background gradient, head, eyes and mouth"""
+    rng = np.random.default_rng(seed)
+    w, h = size
+    ramp = np.linspace(80, 170, h, dtype=np.float32)[:, None, None]
+    image = np.broadcast_to(ramp, (h, w, 3)).astype(np.uint8).copy()
+    image = cv2.add(image, rng.integers(0, 20, image.shape, dtype=np.uint8))
+    cx, cy = w // 2, h * 9 // 20
+    cv2.ellipse(image, (cx, cy), (w // 4, h // 4), 0, 0, 360, (150, 170, 215), -1)
+    for dx in (-w // 10, w // 10):
+        cv2.circle(image, (cx + dx, cy - h // 20), w // 40, (50, 40, 40), -1)
+    cv2.ellipse(image, (cx, cy + h // 9), (w // 12, h // 60), 0, 0, 360, (70, 60, 140), -1)
+    return _jpeg(image)
+
+
+def _mouth_opening(t: np.ndarray, syllables: np.ndarray) -> np.ndarray:
+    """0..1 mouth opening over time, shared by the clip's video and audio"""
+    return np.clip(np.exp(-((t[:, None] - syllables[None, :]) / 0.08) ** 2).sum(axis=1), 0.0, 1.0)
+
+
+def _clip_frames(rng, syllables: np.ndarray, count: int, fps: int, size: Tuple[int, int]):
+    w, h = size
+    for opening in _mouth_opening(np.arange(count) / fps, syllables):
+        frame = np.full((h, w, 3), 110, np.uint8)
+        sx, sy = (int(v) for v in rng.integers(-4, 5, 2))
+        cx, cy = w // 2 + sx, h // 2 + sy
+        cv2.ellipse(frame, (cx, cy), (w // 6, h // 4), 0, 0, 360, (150, 170, 215), -1)
+        cv2.ellipse(frame, (cx, cy + h // 7), (w // 20, int(4 + 14 * opening)), 0, 0, 360, (60, 40, 90), -1)
+        yield frame
+
+
+def av_clip(path: Path, seed: int, seconds: float = 4.0, fps: int = 25, size: Tuple[int, int] = (640, 480)) -> Path:
+    """Talking-head style MP4: a face whose mouth opens and closes, with slight camera shake.
+
+    With PyAV installed the clip also gets a matching AAC voice track (so the
+    lip-sync scorer has work to do); otherwise it is video only.
+    """
+    rng = np.random.default_rng(seed)
+    count = int(seconds * fps)
+    syllables = rng.uniform(0.3, seconds - 0.3, int(seconds * 3))
+    try:
+        import av
+    except ImportError:
+        writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+        try:
+            for frame in _clip_frames(rng, syllables, count, fps, size):
+                writer.write(frame)
+        finally:
+            writer.release()
+        return path
+
+    rate = 16000
+    t = np.arange(int(seconds * rate)) / rate
+    voice = 0.4 * _mouth_opening(t, syllables) * np.sin(2 * np.pi * 150 * t) + 0.003 * rng.standard_normal(len(t))
+    with av.open(str(path), "w") as container:
+        video = container.add_stream("mpeg4", rate=fps)
+        video.width, video.height, video.pix_fmt = size[0], size[1], "yuv420p"
+        audio = container.add_stream("aac", rate=rate, layout="mono")
+        for frame in _clip_frames(rng, syllables, count, fps, size):
+            container.mux(video.encode(av.VideoFrame.from_ndarray(frame, format="bgr24")))
+        sound = av.AudioFrame.from_ndarray(voice.astype(np.float32)[None, :], format="fltp", layout="mono")
+        sound.sample_rate = rate
+        container.mux(audio.encode(sound))
+        container.mux(video.encode(None))
+        container.mux(audio.encode(None))
+    return path
+
+
+def phrase_wav(seed: int, seconds: float = 4.0, rate: int = 16000) -> bytes:
+    """Mono 16-bit WAV: room noise with a few voiced, syllable-like bursts"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * rate)) / rate
+    envelope = np.zeros_like(t)
+    for centre in rng.uniform(0.6, seconds - 0.6, 8):
+        envelope += np.exp(-((t - centre) / 0.09) ** 2)
+    voice = np.sin(2 * np.pi * rng.uniform(110, 220) * t) + 0.4 * np.sin(2 * np.pi * 3 * 170 * t)
+    samples = 0.3 * np.clip(envelope, 0, 1) * voice + 0.004 * rng.standard_normal(len(t))
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes((np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes())
+    return buf.getvalue()
+
+
+def media_set(seed: int, workdir: Path) -> Dict[str, Tuple[bytes, str]]:
+    """One session's uploads, keyed by media kind: (bytes, mime type)"""
+    clip = av_clip(workdir / f"clip_{seed}.mp4", seed)
+    return {
+        "doc_front": (document_image(seed), "image/jpeg"),
+        "doc_back": (document_image(seed + 10_000), "image/jpeg"),
+        "selfie": (selfie_image(seed), "image/jpeg"),
+        "av_clip": (clip.read_bytes(), "video/mp4"),
+        "phrase_audio": (phrase_wav(seed), "audio/wav"),
+    }
@@ -0,0 +1,55 @@
+"""Streaming multipart parsing, fed in small chunks as a request body would arrive"""
+import asyncio
+
+import pytest
+
+from app.services.multipart import MultipartError, MultipartReader
+
+BOUNDARY = "b0undary"
+
+
+def body(*parts) -> bytes:
+    out = b""
+    for name, filename, content_type, data in parts:
+        out += (
+            f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode() + data + b"\r\n"
+    return out + f"--{BOUNDARY}--\r\n".encode()
+
+
+async def chunks(data: bytes, size: int = 7):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def read_parts(data: bytes, skip=()):
+    async def run():
+        reader = MultipartReader(f"multipart/form-data; boundary={BOUNDARY}", chunks(data))
+        out = []
+        async for part in reader:
+            content = b"" if part.name in skip else await part.read(5) + await part.read()
+            out.append((part.name, part.filename, part.content_type, content))
+        return out
+    return asyncio.run(run())
+
+
+def test_parts_stream_in_order():
+    selfie, clip = bytes(range(256)) * 40, b"\r\n--not-a-boundary\r\n" * 10
+    parts = read_parts(body(("selfie", "s.jpg", "image/jpeg", selfie), ("av_clip", "c.mp4", "video/mp4", clip)))
+    assert parts == [("selfie", "s.jpg", "image/jpeg", selfie), ("av_clip", "c.mp4", "video/mp4", clip)]
+
+
+def test_unread_part_is_skipped():
+    parts = read_parts(body(("a", "a", "text/plain", b"x" * 1000), ("b", "b", "text/plain", b"y")), skip={"a"})
+    assert [(name, content) for name, _, _, content in parts] == [("a", b""), ("b", b"y")]
+
+
+def test_truncated_body_is_an_error():
+    with pytest.raises(MultipartError):
+        read_parts(body(("a", "a", "text/plain", b"x" * 100))[:80])
+
+
+def test_requires_multipart_content_type():
+    with pytest.raises(MultipartError):
+        MultipartReader("application/json", chunks(b""))
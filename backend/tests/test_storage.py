@@ -0,0 +1,178 @@
+"""Media store reference counting, for the local store and S3 (against an in-memory stand-in)"""
+import asyncio
+import hashlib
+import threading
+from pathlib import Path
+
+import pytest
+
+from app.services.artifact import ArtifactService, UploadInProgress
+from app.services.storage import LocalMediaStore, MediaStore, S3MediaStore
+
+
+class FakeS3Error(Exception):
+    def __init__(self, code: str):
+        super().__init__(code)
+        self.response = {"Error": {"Code": code}}
+
+
+class FakeS3Client:
+    """The subset of the boto3 S3 client that S3MediaStore calls, kept in a dict"""
+
+    def __init__(self):
+        self.objects = {}
+
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise FakeS3Error("404")
+        return {"ContentLength": len(self.objects[Bucket, Key])}
+
+    def upload_file(self, Filename, Bucket, Key):
+        self.objects[Bucket, Key] = Path(Filename).read_bytes()
+
+    def put_object(self, Bucket, Key, Body):
+        self.objects[Bucket, Key] = Body
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+    def list_objects_v2(self, Bucket, Prefix, MaxKeys=1000):
+        keys = sorted(k for b, k in self.objects if b == Bucket and k.startswith(Prefix))[:MaxKeys]
+        return {"KeyCount": len(keys), "Contents": [{"Key": k} for k in keys]}
+
+
+def upload(tmp_path: Path, name: str, data: bytes):
+    src = tmp_path / f"{name}.part"
+    src.write_bytes(data)
+    return src, hashlib.sha256(data).hexdigest()
+
+
+def test_media_store_is_abstract():
+    with pytest.raises(TypeError):
+        MediaStore()
+
+
+def test_local_store_dedupes_and_counts_references(tmp_path):
+    store = LocalMediaStore(tmp_path)
+    src, sha = upload(tmp_path, "a", b"same bytes")
+    key, deduped = store.put(src, sha, tmp_path / "s1.jpg")
+    assert not deduped and not src.exists()
+    src, _ = upload(tmp_path, "b", b"same bytes")
+    assert store.put(src, sha, tmp_path / "s2.jpg") == (key, True)
+
+    assert not store.unlink(key, tmp_path / "s1.jpg")
+    assert (tmp_path / "s2.jpg").read_bytes() == b"same bytes"
+    assert store.unlink(key, tmp_path / "s2.jpg")
+    assert not store.exists(key)
+
+
+def test_local_store_concurrent_puts_share_one_object(tmp_path):
+    store = LocalMediaStore(tmp_path)
+    data = b"x" * 4096
+    sha = hashlib.sha256(data).hexdigest()
+    sources = [upload(tmp_path, f"u{i}", data)[0] for i in range(16)]
+    results = []
+    barrier = threading.Barrier(len(sources))
+
+    def put(i, src):
+        barrier.wait()
+        results.append(store.put(src, sha, tmp_path / f"dest{i}.jpg"))
+
+    threads = [threading.Thread(target=put, args=(i, src)) for i, src in enumerate(sources)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sum(not deduped for _, deduped in results) == 1
+    key = results[0][0]
+    # Every reference is a link to the one object, so releasing all but one keeps it
+    assert (tmp_path / key).stat().st_nlink == len(sources) + 1
+    for i in range(len(sources) - 1):
+        assert not store.unlink(key, tmp_path / f"dest{i}.jpg")
+    assert (tmp_path / f"dest{len(sources) - 1}.jpg").read_bytes() == data
+    assert store.exists(key)
+
+
+def test_s3_store_dedupes_and_counts_references(tmp_path):
+    client = FakeS3Client()
+    store = S3MediaStore("bucket", prefix="media", client=client)
+    src, sha = upload(tmp_path, "a", b"clip bytes")
+    key, deduped = store.put(src, sha, tmp_path / "s1.mp4")
+    assert not deduped and store.exists(key)
+    assert client.objects["bucket", f"media/{key}"] == b"clip bytes"
+    assert (tmp_path / "s1.mp4").read_bytes() == b"clip bytes"
+
+    src, _ = upload(tmp_path, "b", b"clip bytes")
+    assert store.put(src, sha, tmp_path / "s2.mp4") == (key, True)
+
+    assert not store.unlink(key, tmp_path / "s1.mp4")
+    assert store.exists(key) and not (tmp_path / "s1.mp4").exists()
+    assert store.unlink(key, tmp_path / "s2.mp4")
+    assert not store.exists(key)
+    assert not client.objects
+
+
+def test_s3_store_surfaces_other_errors():
+    class Denied(FakeS3Client):
+        def head_object(self, Bucket, Key):
+            raise FakeS3Error("403")
+
+    with pytest.raises(FakeS3Error):
+        S3MediaStore("bucket", client=Denied()).exists("objects/ab/cd/abcd")
+
+
+class FakeUpload:
+    def __init__(self, data: bytes):
+        self.data = data
+
+    async def read(self, size: int) -> bytes:
+        chunk, self.data = self.data[:size], self.data[size:]
+        return chunk
+
+
+def test_s3_staged_bulk_upload_releases_every_ref_on_cleanup(tmp_path):
+    client = FakeS3Client()
+    service = ArtifactService(tmp_path, S3MediaStore("bucket", client=client))
+
+    async def bulk_upload():
+        staged = {
+            kind: await service.save_upload_stream(FakeUpload(data), "s1", kind, staging="req1")
+            for kind, data in (("selfie", b"face"), ("doc_front", b"card"))
+        }
+        return [service.publish_staged(result, "s1", kind) for kind, result in staged.items()]
+
+    results = asyncio.run(bulk_upload())
+    assert all(r.path == service.upload_path("s1", kind) for r, kind in zip(results, ("selfie", "doc_front")))
+    assert sum(key.startswith("refs/") for _, key in client.objects) == 2
+
+    service.cleanup_session("s1", [(r.storage_key, r.path) for r in results])
+    assert not client.objects
+
+
+def test_concurrent_upload_of_a_kind_is_refused_not_interleaved(tmp_path):
+    service = ArtifactService(tmp_path, LocalMediaStore(tmp_path / "store"))
+
+    class SlowUpload(FakeUpload):
+        def __init__(self, data: bytes, release: asyncio.Event):
+            super().__init__(data)
+            self.release = release
+
+        async def read(self, size: int) -> bytes:
+            await self.release.wait()
+            return await super().read(size)
+
+    async def race():
+        release = asyncio.Event()
+        first = asyncio.create_task(service.save_upload_stream(
+            SlowUpload(b"first " * 1000, release), "s1", "selfie", chunk_size=64, mime_type="image/png"))
+        await asyncio.sleep(0.1)
+        with pytest.raises(UploadInProgress):
+            await service.save_upload_stream(FakeUpload(b"second"), "s1", "selfie", mime_type="image/png")
+        release.set()
+        return await first
+
+    result = asyncio.run(race())
+    assert result.path == tmp_path / "raw" / "s1" / "selfie.png"
+    assert result.path.read_bytes() == b"first " * 1000
+    assert not service.part_path("s1", "selfie").exists()